@@ -19,6 +19,7 @@ import sys
 from ocr_processor import OCRProcessor
 from sheets_integration import SheetsIntegration
 from data_parser import DataParser
+from record_store import get_store, record_key_for
 
 # Configuration
 CONFIG = {
@@ -592,17 +593,11 @@ class PalletTicketApp:
             self.is_processing = False
     
     def save_local_record(self, record):
-        """Save record locally as JSON"""
-        records_dir = Path('local_records')
-        records_dir.mkdir(exist_ok=True)
+        """Save record to the local record store"""
+        store = get_store('local_records')
+        key = store.save(record, key=record_key_for(datetime.now()))
         
-        filename = f"record_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-        filepath = records_dir / filename
-        
-        with open(filepath, 'w') as f:
-            json.dump(record, f, indent=2)
-        
-        self.log(f"Saved local record: {filename}")
+        self.log(f"Saved local record: {key}")
     
     def update_status(self, message, color="black"):
         """Update status label"""
@@ -7,7 +7,6 @@ import cv2
 import numpy as np
 import time
 import os
-import json
 from datetime import datetime
 from pathlib import Path
 import threading
@@ -20,6 +19,7 @@ try:
     from ocr_processor import OCRProcessor
     from sheets_integration import SheetsIntegration
     from data_parser import DataParser
+    from record_store import get_store, record_key_for
 except ImportError as e:
     print(f"Import error: {e}")
     print("Make sure all files are in the same directory")
@@ -331,13 +331,9 @@ class SimplePalletApp:
             }
             
             # Save locally
-            records_dir = Path('local_records')
-            records_dir.mkdir(exist_ok=True)
-            record_file = records_dir / f"record_{timestamp.strftime('%Y%m%d_%H%M%S')}.json"
-            with open(record_file, 'w') as f:
-                json.dump(record, f, indent=2)
+            record_key = get_store('local_records').save(record, key=record_key_for(timestamp))
             
-            self.log(f"✓ Record saved: {record_file.name}")
+            self.log(f"✓ Record saved: {record_key}")
             self.root.after(0, lambda: self.status_label.config(text="Saved! Ready for next ticket", bg="lightgreen"))
             
             time.sleep(3)
@@ -6,7 +6,6 @@ Flask-based web app for online deployment
 from flask import Flask, render_template, request, jsonify, send_from_directory
 from flask_cors import CORS
 import os
-import json
 import base64
 from datetime import datetime
 from pathlib import Path
@@ -17,6 +16,7 @@ import numpy as np
 from ocr_processor import OCRProcessor
 from sheets_integration import SheetsIntegration
 from data_parser import DataParser
+from record_store import get_store, record_key_for
 
 app = Flask(__name__, static_folder='static', template_folder='templates')
 CORS(app)
@@ -137,10 +137,7 @@ def submit_ticket():
             result = sheets.add_pending_record(record)
         
         # Also save locally
-        records_dir = Path('local_records')
-        record_file = records_dir / f"record_{timestamp.strftime('%Y%m%d_%H%M%S')}.json"
-        with open(record_file, 'w') as f:
-            json.dump(record, f, indent=2)
+        get_store('local_records').save(record, key=record_key_for(timestamp))
         
         if result.get('success'):
             return jsonify({
@@ -170,17 +167,8 @@ def get_pending():
             return jsonify({'records': records})
         else:
             # Return local records
-            records_dir = Path('local_records')
-            records = []
-            if records_dir.exists():
-                for json_file in records_dir.glob('record_*.json'):
-                    try:
-                        with open(json_file, 'r') as f:
-                            record = json.load(f)
-                            if record.get('status') == 'PENDING':
-                                records.append(record)
-                    except:
-                        pass
+            records = [record for _, _, record in get_store('local_records').iter_records()
+                       if record.get('status') == 'PENDING']
             return jsonify({'records': records})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
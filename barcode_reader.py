@@ -0,0 +1,168 @@
+"""
+Barcode Reader
+Decodes the GS1-128 / GS1 DataMatrix barcodes on a pallet label and maps the GS1 Application
+Identifiers onto record fields, so a capture whose SSCC barcode reads cleanly needs no OCR round
+trip for the key fields:
+    (00) SSCC -> sscc, (02)/(01) GTIN -> ean_number, (10) batch -> batch_no,
+    (37) count -> quantity, (11) production date -> date (DD/MM/YYYY)
+
+Optional dependency: pip install zxing-cpp (Code 128 + DataMatrix), or pyzbar (Code 128 only,
+needs the zbar library). Without either, read_label() returns None and OCR runs as before.
+"""
+
+import calendar
+import re
+import time
+
+# Group separator: FNC1 inside GS1 data (ends a variable-length element)
+GS = '\x1d'
+
+# AI -> (value length, fixed). Variable-length values run to GS / end of data (at most length)
+_AIS = {
+    '00': (18, True), '01': (14, True), '02': (14, True),
+    '10': (20, False), '11': (6, True), '13': (6, True), '15': (6, True), '17': (6, True),
+    '20': (2, True), '21': (20, False), '37': (8, False), '400': (30, False),
+}
+# Measures (310n-369n): 4-digit AI with a fixed 6-digit value
+_MEASURE_AI = re.compile(r'3[1-6]\d\d')
+
+# Symbology identifiers some decoders prefix: ]C1 = GS1-128, ]d2 = GS1 DataMatrix, ]Q3 = GS1 QR
+_SYMBOLOGY_PREFIX = re.compile(r'^\](C1|d2|Q3|e0)')
+
+
+def gs1_check_digit(digits):
+    """GS1 mod-10 check digit for the digits that precede it (weights 3,1,3,... from the right)."""
+    total = sum(int(d) * (3 if i % 2 == 0 else 1) for i, d in enumerate(reversed(digits)))
+    return str((10 - total % 10) % 10)
+
+
+def valid_sscc(sscc):
+    return bool(sscc) and len(sscc) == 18 and sscc.isdigit() and gs1_check_digit(sscc[:-1]) == sscc[-1]
+
+
+def parse_gs1(data):
+    """
+    GS1 element string -> {AI: value}. Accepts raw data (FNC1 / GS separated, optional ]C1 prefix)
+    and the human-readable form "(00)123...(02)...". Stops at the first unknown AI.
+    """
+    if not data:
+        return {}
+    data = _SYMBOLOGY_PREFIX.sub('', data.strip())
+    if data.startswith('('):
+        return {ai: value.strip() for ai, value in re.findall(r'\((\d{2,4})\)([^(]*)', data)}
+    elements = {}
+    pos = 0
+    while pos < len(data):
+        if data[pos] == GS:
+            pos += 1
+            continue
+        ai = next((a for a in (data[pos:pos + 2], data[pos:pos + 3]) if a in _AIS), None)
+        if ai is None and _MEASURE_AI.match(data[pos:pos + 4]):
+            ai, (length, fixed) = data[pos:pos + 4], (6, True)
+        elif ai is None:
+            break
+        else:
+            length, fixed = _AIS[ai]
+        pos += len(ai)
+        if fixed:
+            value = data[pos:pos + length]
+            pos += length
+        else:
+            end = data.find(GS, pos)
+            end = len(data) if end == -1 else end
+            value = data[pos:min(end, pos + length)]
+            pos += len(value)
+        elements[ai] = value
+    return elements
+
+
+def _gs1_date(yymmdd):
+    """GS1 YYMMDD -> DD/MM/YYYY (day 00 = last day of the month), or '' if invalid."""
+    if not re.match(r'^\d{6}$', yymmdd or ''):
+        return ''
+    year, month, day = 2000 + int(yymmdd[:2]), int(yymmdd[2:4]), int(yymmdd[4:])
+    if not 1 <= month <= 12:
+        return ''
+    last = calendar.monthrange(year, month)[1]
+    day = day or last
+    if day > last:
+        return ''
+    return f"{day:02d}/{month:02d}/{year}"
+
+
+def fields_from_gs1(elements):
+    """Map GS1 elements onto record fields (only those present and well-formed)."""
+    fields = {}
+    sscc = elements.get('00', '')
+    if valid_sscc(sscc):
+        fields['sscc'] = sscc
+    gtin = elements.get('02') or elements.get('01') or ''
+    if len(gtin) == 14 and gtin.isdigit() and gs1_check_digit(gtin[:-1]) == gtin[-1]:
+        fields['ean_number'] = gtin[1:] if gtin.startswith('0') else gtin  # GTIN-13 (EAN) when it fits
+    if elements.get('10'):
+        fields['batch_no'] = elements['10']
+    if elements.get('37', '').isdigit():
+        fields['quantity'] = str(int(elements['37']))
+    date = _gs1_date(elements.get('11'))
+    if date:
+        fields['date'] = date
+    return fields
+
+
+def _decode_zxing(img):
+    import zxingcpp
+    results = zxingcpp.read_barcodes(img, formats=zxingcpp.BarcodeFormat.Code128 | zxingcpp.BarcodeFormat.DataMatrix)
+    return [r.symbology_identifier + r.text if r.symbology_identifier in (']C1', ']d2') else r.text for r in results]
+
+
+def _decode_zbar(img):
+    from pyzbar import pyzbar
+    return [r.data.decode('latin-1') for r in pyzbar.decode(img.convert('L'), symbols=[pyzbar.ZBarSymbol.CODE128])]
+
+
+_decoder = None
+
+
+def _get_decoder():
+    global _decoder
+    if _decoder is None:
+        _decoder = False
+        for name, fn in (('zxingcpp', _decode_zxing), ('pyzbar.pyzbar', _decode_zbar)):
+            try:
+                __import__(name)
+                _decoder = fn
+                break
+            except ImportError:
+                continue
+    return _decoder or None
+
+
+def decoder_available():
+    return _get_decoder() is not None
+
+
+def read_label(img):
+    """
+    Decode every GS1 barcode on the label image (PIL) and merge their elements.
+
+    Returns:
+        (fields, info) when the SSCC decoded with a valid check digit, else (None, info).
+        info has decode_ms, barcodes (count) and elements ({AI: value}).
+    """
+    decoder = _get_decoder()
+    info = {'decode_ms': 0.0, 'barcodes': 0, 'elements': {}}
+    if decoder is None:
+        return None, info
+    started = time.perf_counter()
+    try:
+        texts = decoder(img)
+    except Exception as e:
+        print(f"[Barcode] Decode error: {e}")
+        texts = []
+    elements = {}
+    for text in texts:
+        for ai, value in parse_gs1(text).items():
+            elements.setdefault(ai, value)
+    info.update(decode_ms=round((time.perf_counter() - started) * 1000, 1), barcodes=len(texts), elements=elements)
+    fields = fields_from_gs1(elements)
+    return (fields if 'sscc' in fields else None), info
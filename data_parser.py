@@ -1,13 +1,164 @@
 """
 Data Parser
 Extracts data from Brix & Co / Recorp labels - only the headings that appear on the label
+
+Compiled single scan: normalization is one regex pass, and one lookahead alternation over the
+normalized text finds every position where a field pattern could start (its literal heading).
+Field patterns are then only tried anchored at those positions - the same first match as
+re.search over the whole text, without rescanning it per pattern. Lines are split once and
+shared by the "Heading: Value" fallback and the unstructured pass.
+
+SSCC-18 and EAN-13 / GTIN-14 values are checked against their GS1 mod-10 check digit. A failing
+read gets one substitution over the usual OCR confusions (0/O/D/8/B, 1/I/7, 5/S); a unique fix is
+kept at 'medium' confidence, otherwise the value stays at 'low' (re-OCR / review picks it up).
+
+With an item catalog (item_catalog.ItemCatalog), the item number is corrected to the nearest
+catalog code and the description, EAN and customer item number come from the catalog - the
+description heuristics only run for items the catalog doesn't know.
+
+Label layouts come from a label_templates.TemplateRegistry: the text is classified first (one
+Aho-Corasick pass over the template fingerprints) and only that template's patterns run. The
+field_configs below are the built-in Brix & Co / Recorp template and the default.
 """
 
 import re
+import time
+
+from barcode_reader import gs1_check_digit
+from label_templates import BUILTIN_FINGERPRINTS, DEFAULT_TEMPLATE, LabelTemplate, TemplateRegistry
+
+# normalize_text: upper-case, collapse spaces/tabs, blank out symbols - in one pass
+_NORMALIZE = re.compile(r'[ \t]+|[^\w\s:/\-\.,()]')
+
+# Regex metacharacters that end a literal pattern prefix
+_META = set('.^$*+?{}[]|()\\')
+
+_SSCC_AI = re.compile(r'\(00\)\s*([0-9]{16,22})')
+_SSCC_6SCC = re.compile(r'6SCC\s*\(?\s*00\s*\)?\s*([0-9]{16,22})')
+_SSCC_6SCC_I = re.compile(r'6SCC\s*\(?\s*00\s*\)?\s*([0-9]{16,22})', re.I)
+_NON_DIGIT = re.compile(r'[^0-9]')
+_NUMBER = re.compile(r'(\d+(?:\.\d+)?)')
+_DATE_VALUE = re.compile(r'(\d{1,2}[/\-]\d{1,2}[/\-]\d{2,4})')
+_TIME_VALUE = re.compile(r'(\d{1,2}:\d{2}(?::\d{2})?)')
+_HAS_TIME = re.compile(r'\d{1,2}:\d{2}')
+_HAS_DATE = re.compile(r'\d{1,2}/\d{1,2}/\d{2,4}')
+_NON_WORD_DASH = re.compile(r'[^\w\-]')
+_NON_WORD = re.compile(r'[^\w]')
+_QUOTES = re.compile(r'["\']')
+_WHITESPACE = re.compile(r'\s+')
+_ITEM_CODE = re.compile(r'^[A-Z]{2,3}\d+[A-Z0-9\-]{8,}$', re.I)
+_PRODUCT = re.compile(r'\d+%|\d+\s*ML|RASPBERRY|LAGER|ALE|BEER|JUICE', re.I)
+_WORDS = re.compile(r'[A-Z]+\s+[A-Z]')
+_DIGITS_ONLY = re.compile(r'^\d+$')
+_SIX_DIGITS = re.compile(r'^\d{6}$')
+_QTY_DIGITS = re.compile(r'^\d{3,5}$')
+_DATE_ONLY = re.compile(r'(\d{1,2}/\d{1,2}/\d{2,4})')
+_TIME_ONLY = re.compile(r'(\d{1,2}:\d{2})')
+_HANDWRITTEN = re.compile(r'^\d{1,2}$')
+_DATE_SHAPE = re.compile(r'\d{1,2}[/\-]\d{1,2}[/\-]\d{2,4}')
+_QUANTITY_SHAPE = re.compile(r'^\d+(\.\d+)?$')
+_HAS_LETTER = re.compile(r'[A-Z]')
+_HAS_DIGIT = re.compile(r'\d')
+
+# OCR confusions on GS1 numbers: character -> digit it reads as, and digits it may really be
+_GS1_AS_DIGIT = {'O': '0', 'D': '0', 'B': '8', 'I': '1', 'S': '5'}
+_GS1_CONFUSIONS = {'0': '8', '8': '0', '1': '7', '7': '1'}
+_GS1_TOKEN = re.compile(r'^[0-9ODBIS]+$')
+# SSCC with OCR letter confusions in it (the field patterns only take digits)
+_SSCC_LOOSE = re.compile(r'(?:\(00\)|6SCC\s*\(?\s*00\s*\)?|SSCC[\s:]*)\s*([0-9ODBIS]{18})(?![0-9A-Z])')
+
+
+def check_gs1(value, lengths):
+    """
+    GS1 mod-10 check of value (spaces ignored) against the allowed lengths.
+
+    Returns:
+        (digits, 'valid' | 'corrected') - corrected when confused letters were read as digits or one
+        confusable digit had to change (only if exactly one such change fits the check digit);
+        (value, 'invalid') otherwise, including when several changes would fit
+    """
+    token = ''.join(str(value or '').upper().split())
+    if len(token) not in lengths or not _GS1_TOKEN.match(token):
+        return value, 'invalid'
+    digits = ''.join(_GS1_AS_DIGIT.get(c, c) for c in token)
+    if gs1_check_digit(digits[:-1]) == digits[-1]:
+        return digits, 'valid' if digits == token else 'corrected'
+    # Positions OCR read as letters are the likeliest misreads - search them first, then every position
+    letters = [i for i, c in enumerate(token) if not c.isdigit()]
+    for positions in (letters, range(len(digits))):
+        fixes = []
+        for i in positions:
+            if digits[i] in _GS1_CONFUSIONS:
+                candidate = digits[:i] + _GS1_CONFUSIONS[digits[i]] + digits[i + 1:]
+                if gs1_check_digit(candidate[:-1]) == candidate[-1]:
+                    fixes.append(candidate)
+        if fixes:
+            return (fixes[0], 'corrected') if len(fixes) == 1 else (value, 'invalid')
+    return value, 'invalid'
+
+
+def _has_top_level_alternation(pattern):
+    """True if pattern has a | outside any group or character class (A|B matches without A's prefix)."""
+    depth = 0
+    in_class = False
+    i = 0
+    while i < len(pattern):
+        ch = pattern[i]
+        if ch == '\\':
+            i += 2
+            continue
+        if in_class:
+            in_class = ch != ']'
+        elif ch == '[':
+            in_class = True
+            if pattern[i + 1:i + 2] == '^':
+                i += 1
+            if pattern[i + 1:i + 2] == ']':
+                i += 1  # ] first in a class is literal
+        elif ch == '(':
+            depth += 1
+        elif ch == ')':
+            depth -= 1
+        elif ch == '|' and depth == 0:
+            return True
+        i += 1
+    return False
+
+
+def _literal_prefix(pattern):
+    """
+    Literal text every match of pattern starts with (leading \\b skipped), e.g. 'ITEM' for
+    ITEM\\s*NUMBER..., '(00)' for \\(00\\).... Empty if the pattern doesn't start with a literal
+    (including a leading group or inline flag) or has a top-level alternation (LOT|BATCH...).
+    """
+    if _has_top_level_alternation(pattern):
+        return ''
+    i = 2 if pattern.startswith('\\b') else 0
+    prefix = []
+    while i < len(pattern):
+        ch = pattern[i]
+        if ch == '\\' and i + 1 < len(pattern) and not pattern[i + 1].isalnum():
+            prefix.append(pattern[i + 1])  # escaped punctuation / space is literal
+            i += 2
+        elif ch in _META:
+            break
+        else:
+            prefix.append(ch)
+            i += 1
+    # A quantifier applies to the last literal character - it isn't guaranteed
+    if i < len(pattern) and pattern[i] in '*?{' and prefix:
+        prefix.pop()
+    return ''.join(prefix)
+
 
 class DataParser:
-    def __init__(self):
-        """Fields that match the label headings exactly"""
+    def __init__(self, catalog=None, templates=None):
+        """
+        Fields that match the label headings exactly.
+        catalog: optional ItemCatalog used to correct item numbers and fill item fields.
+        templates: optional TemplateRegistry with other customers' layouts (the built-in one is added as default).
+        """
+        self.catalog = catalog
         self.field_configs = {
             'item_number': {
                 'keywords': ['ITEM NUMBER'],
@@ -54,26 +205,72 @@ class DataParser:
                 'patterns': []  # Extracted in unstructured parse - standalone 1-3 digit
             }
         }
+        self.templates = templates if templates is not None else TemplateRegistry()
+        self.templates.register(LabelTemplate(DEFAULT_TEMPLATE, self.field_configs, fingerprints=BUILTIN_FINGERPRINTS,
+                                              heuristics=True), default=True)
+        self.compile()
+    
+    def compile(self):
+        """Drop compiled templates (call after changing field_configs) - each is recompiled on first use."""
+        self._compiled = {}
+    
+    def _compiled_template(self, template):
+        """(steps per field, locator) for a template, compiled once (again if the template was replaced)."""
+        cached = self._compiled.get(template.name)
+        if cached is None or cached[0] is not template:
+            cached = (template,) + self._compile_fields(template.field_configs)
+            self._compiled[template.name] = cached
+        return cached[1], cached[2]
+    
+    @staticmethod
+    def _compile_fields(field_configs):
+        """
+        Per field, the (compiled pattern, literal prefix, confidence) steps of _parse_field, plus one
+        locator regex that finds every prefix occurrence (overlapping ones too) in a single scan.
+        """
+        compiled = {}
+        prefixes = set()
+        for field_name, config in field_configs.items():
+            steps = []
+            for pattern in config['patterns']:
+                try:
+                    steps.append((re.compile(pattern, re.IGNORECASE), _literal_prefix(pattern), 'high'))
+                except re.error:
+                    continue
+            for keyword in config['keywords']:
+                pattern = rf'{re.escape(keyword)}[\s:]+([^\n\r]+)'
+                steps.append((re.compile(pattern, re.IGNORECASE), _literal_prefix(pattern), 'medium'))
+            prefixes.update(prefix for _, prefix, _ in steps if prefix)
+            compiled[field_name] = steps
+        alternation = '|'.join(re.escape(p) for p in sorted(prefixes, key=len, reverse=True))
+        return compiled, (re.compile(f'(?=(?:{alternation}))', re.IGNORECASE) if prefixes else None)
     
     def normalize_text(self, text):
         if not text or not text.strip():
             return ''
-        normalized = text.upper()
-        normalized = re.sub(r'[ \t]+', ' ', normalized)
-        normalized = re.sub(r'[^\w\s:/\-\.,()]', ' ', normalized)
-        return normalized.strip()
+        return _NORMALIZE.sub(' ', text.upper()).strip()
     
-    def parse(self, ocr_text):
+    def parse(self, ocr_text, template=None, record_stats=True):
+        """
+        Parse OCR text with the template it classifies as (or the named template).
+        Returns {'parsed', 'confidence', 'warnings', 'template'} - parsed has every record field.
+        record_stats: count the text as a parsed label in the template stats (False for re-OCR patches)
+        """
+        started = time.perf_counter()
         normalized = self.normalize_text(ocr_text)
+        layout = self.templates.get(template) if template else self.templates.classify(normalized)
+        compiled, locator = self._compiled_template(layout)
         parsed = {}
         confidence = {}
         warnings = []
+        # One scan: every position a field pattern can start at
+        starts = [m.start() for m in locator.finditer(normalized)] if locator else []
         
-        for field_name, config in self.field_configs.items():
-            value, conf_level = self._parse_field(normalized, ocr_text, config['patterns'], config['keywords'])
+        for field_name in self.field_configs:
+            value, conf_level = self._match_field(normalized, compiled.get(field_name, []), starts)
             if field_name == 'sscc' and value:
                 # Store only the numeric part (e.g. 000000000000222051), not "6SCC(00)..."
-                digits = re.sub(r'[^0-9]', '', str(value))
+                digits = _NON_DIGIT.sub('', str(value))
                 value = digits if len(digits) >= 16 else value
             if field_name == 'item_number' and value and not self._valid_item_number(value):
                 value = ''
@@ -92,8 +289,8 @@ class DataParser:
             if not value:
                 warnings.append(f"'{field_name}' not found")
         
-        # Fallback: "Heading: Value" on same line
-        lines = [l.strip() for l in ocr_text.split('\n') if l.strip()]
+        # Fallback: "Heading: Value" on same line (lines split once, reused by the unstructured pass)
+        lines = [l.strip() for l in ocr_text.split('\n') if l.strip()] if layout.heuristics else []
         for line in lines:
             if ':' not in line:
                 continue
@@ -106,7 +303,7 @@ class DataParser:
                 continue
             
             if 'ITEM NUMBER' in key and 'CUSTOMER' not in key and not parsed.get('item_number'):
-                val = re.sub(r'[^\w\-]', '', value).strip()
+                val = _NON_WORD_DASH.sub('', value).strip()
                 if val and self._valid_item_number(val):
                     parsed['item_number'] = val[:40]
                     confidence['item_number'] = 'high'
@@ -114,21 +311,21 @@ class DataParser:
                 parsed['item_description'] = value[:100]
                 confidence['item_description'] = 'high'
             elif 'BATCH NO' in key and not parsed.get('batch_no'):
-                parsed['batch_no'] = re.sub(r'[^\w]', '', value)[:20]
+                parsed['batch_no'] = _NON_WORD.sub('', value)[:20]
                 confidence['batch_no'] = 'high'
             elif 'QUANTITY' in key and not parsed.get('quantity'):
-                m = re.search(r'(\d+(?:\.\d+)?)', value)
+                m = _NUMBER.search(value)
                 if m and self._valid_quantity(m.group(1)):
                     parsed['quantity'] = m.group(1)
                     confidence['quantity'] = 'high'
             elif key == 'DATE' and not parsed.get('date'):
-                m = re.search(r'(\d{1,2}[/\-]\d{1,2}[/\-]\d{2,4})', value)
-                if m and not re.search(r'\d{1,2}:\d{2}', value) and self._valid_date(m.group(1)):
+                m = _DATE_VALUE.search(value)
+                if m and not _HAS_TIME.search(value) and self._valid_date(m.group(1)):
                     parsed['date'] = m.group(1)
                     confidence['date'] = 'high'
             elif key == 'TIME' and not parsed.get('time'):
-                m = re.search(r'(\d{1,2}:\d{2}(?::\d{2})?)', value)
-                if m and not re.search(r'\d{1,2}/\d{1,2}/\d{2,4}', value) and self._valid_time(m.group(1)):
+                m = _TIME_VALUE.search(value)
+                if m and not _HAS_DATE.search(value) and self._valid_time(m.group(1)):
                     parsed['time'] = m.group(1)
                     confidence['time'] = 'high'
             elif 'CUSTOMER ITEM NUMBER' in key and not parsed.get('customer_item_number'):
@@ -140,33 +337,44 @@ class DataParser:
         
         # SSCC: store only the numeric part (no "6SCC(00)" prefix)
         if not parsed.get('sscc'):
-            m = re.search(r'\(00\)\s*([0-9]{16,22})', ocr_text)
+            m = _SSCC_AI.search(ocr_text)
             if m:
                 parsed['sscc'] = m.group(1)
                 confidence['sscc'] = 'high'
             else:
-                m = re.search(r'6SCC\s*\(?\s*00\s*\)?\s*([0-9]{16,22})', ocr_text)
+                m = _SSCC_6SCC.search(ocr_text)
                 if m:
                     parsed['sscc'] = m.group(1)
                     confidence['sscc'] = 'high'
         
+        # Item from the catalog first - its description makes the heuristics below unnecessary
+        code_tried = self.catalog is not None and bool(parsed.get('item_number'))
+        matched = code_tried and self._match_catalog(parsed, confidence, warnings)
+        
         # When OCR returns unstructured text (no "Heading: Value"), use content heuristics
-        self._parse_unstructured(ocr_text, parsed, confidence)
+        if layout.heuristics:
+            self._parse_unstructured(ocr_text, parsed, confidence, lines)
+        self._check_gs1_fields(normalized, parsed, confidence, warnings)
+        if self.catalog is not None and not matched:
+            self._match_catalog(parsed, confidence, warnings, by_code=not code_tried)
         
-        return {'parsed': parsed, 'confidence': confidence, 'warnings': warnings}
+        if record_stats:
+            self.templates.record(layout.name, (time.perf_counter() - started) * 1000, parsed)
+        return {'parsed': parsed, 'confidence': confidence, 'warnings': warnings, 'template': layout.name}
     
-    def _parse_unstructured(self, ocr_text, parsed, confidence):
+    def _parse_unstructured(self, ocr_text, parsed, confidence, lines=None):
         """Extract from OCR text when headings are missing (values only, line by line)"""
-        lines = [l.strip() for l in ocr_text.split('\n') if l.strip()]
+        if lines is None:
+            lines = [l.strip() for l in ocr_text.split('\n') if l.strip()]
         
         for line in lines:
-            line_clean = re.sub(r'["\']', '', line).strip()
+            line_clean = _QUOTES.sub('', line).strip()
             if not line_clean:
                 continue
             
             # Item Number: BRI023A250SM200BMHP style (2-3 letters + numbers + alphanumeric, 15+ chars)
-            code = re.sub(r'\s+', '', line_clean)
-            if not parsed.get('item_number') and re.match(r'^[A-Z]{2,3}\d+[A-Z0-9\-]{8,}$', code, re.I) and len(code) >= 15:
+            code = _WHITESPACE.sub('', line_clean)
+            if not parsed.get('item_number') and _ITEM_CODE.match(code) and len(code) >= 15:
                 parsed['item_number'] = code[:40]
                 confidence['item_number'] = 'medium'
             
@@ -177,54 +385,74 @@ class DataParser:
             
             # Item Description: product-style line with ML, %, or descriptive text
             elif not parsed.get('item_description') and len(line_clean) > 10:
-                if re.search(r'\d+%|\d+\s*ML|RASPBERRY|LAGER|ALE|BEER|JUICE', line_clean, re.I):
+                if _PRODUCT.search(line_clean):
                     parsed['item_description'] = line_clean[:100]
                     confidence['item_description'] = 'medium'
-                elif re.search(r'[A-Z]+\s+[A-Z]', line_clean) and not re.match(r'^\d+$', line_clean) and 'RECORP' not in line_clean.upper():
+                elif _WORDS.search(line_clean) and not _DIGITS_ONLY.match(line_clean) and 'RECORP' not in line_clean.upper():
                     parsed['item_description'] = line_clean[:100]
                     confidence['item_description'] = 'low'
             
             # Batch No: 6-digit number
-            elif not parsed.get('batch_no') and re.match(r'^\d{6}$', line_clean):
+            elif not parsed.get('batch_no') and _SIX_DIGITS.match(line_clean):
                 parsed['batch_no'] = line_clean
                 confidence['batch_no'] = 'medium'
             
             # Quantity: 3-5 digit number (standalone)
-            elif not parsed.get('quantity') and re.match(r'^\d{3,5}$', line_clean):
+            elif not parsed.get('quantity') and _QTY_DIGITS.match(line_clean):
                 parsed['quantity'] = line_clean
                 confidence['quantity'] = 'medium'
             
             # Date: DD/MM/YYYY only (no time format, no "TIME" text)
             elif not parsed.get('date'):
-                m = re.search(r'(\d{1,2}/\d{1,2}/\d{2,4})', line_clean)
-                if m and not re.search(r'\d{1,2}:\d{2}', line_clean):
+                m = _DATE_ONLY.search(line_clean)
+                if m and not _HAS_TIME.search(line_clean):
                     parsed['date'] = m.group(1)
                     confidence['date'] = 'medium'
             
             # Time: HH:MM only (no date format)
             elif not parsed.get('time'):
-                m = re.search(r'(\d{1,2}:\d{2})', line_clean)
-                if m and not re.search(r'\d{1,2}/\d{1,2}/\d{2,4}', line_clean):
+                m = _TIME_ONLY.search(line_clean)
+                if m and not _HAS_DATE.search(line_clean):
                     parsed['time'] = m.group(1)
                     confidence['time'] = 'medium'
             
             # SSCC: store only the numeric part
             elif not parsed.get('sscc'):
-                m = re.search(r'6SCC\s*\(?\s*00\s*\)?\s*([0-9]{16,22})', line_clean, re.I)
+                m = _SSCC_6SCC_I.search(line_clean)
                 if m:
                     parsed['sscc'] = m.group(1)
                     confidence['sscc'] = 'high'
                 else:
-                    m = re.search(r'\(00\)\s*([0-9]{16,22})', line_clean)
+                    m = _SSCC_AI.search(line_clean)
                     if m:
                         parsed['sscc'] = m.group(1)
                         confidence['sscc'] = 'high'
             
             # Handwritten number: standalone 1-2 digit (e.g. "29" written on label)
-            elif not parsed.get('handwritten_number') and re.match(r'^\d{1,2}$', line_clean):
+            elif not parsed.get('handwritten_number') and _HANDWRITTEN.match(line_clean):
                 parsed['handwritten_number'] = line_clean
                 confidence['handwritten_number'] = 'medium'
     
+    def _match_field(self, normalized_text, steps, starts):
+        """
+        _parse_field on compiled steps: each pattern is only tried at the located start positions
+        of its literal prefix (in text order), which finds the same first match as re.search.
+        """
+        for regex, prefix, conf_level in steps:
+            if prefix:
+                match = None
+                for pos in starts:
+                    match = regex.match(normalized_text, pos)
+                    if match:
+                        break
+            else:
+                match = regex.search(normalized_text)
+            if match and match.group(1):
+                value = self._clean(match.group(1))
+                if value and value.upper() != 'N/A':
+                    return value, conf_level
+        return '', 'low'
+    
     def _parse_field(self, normalized_text, original_text, patterns, keywords):
         for pattern in patterns:
             try:
@@ -246,23 +474,94 @@ class DataParser:
         
         return '', 'low'
     
+    def _match_catalog(self, parsed, confidence, warnings, by_code=True):
+        """
+        Look the item up in the catalog - by item number (exact / prefix / nearest code), else by a
+        check-digit valid EAN, else by description - and take the catalog's item fields. Returns True
+        on a match.
+        """
+        entry = None
+        code = parsed.get('item_number')
+        if by_code and code:
+            entry, method, _ = self.catalog.match(code)
+            if entry is None:
+                warnings.append(f"'item_number' {code} not in item catalog ({method})")
+            elif method != 'exact':
+                warnings.append(f"'item_number' corrected to catalog item ({code} -> {entry['item_number']}, {method})")
+        if entry is None and parsed.get('ean_number') and confidence.get('ean_number') == 'high':
+            entry, method = self.catalog.by_ean(parsed['ean_number']), 'ean'
+        if entry is None and parsed.get('item_description'):
+            entry, method = self.catalog.match_description(parsed['item_description']), 'description'
+            if entry is not None:
+                warnings.append(f"'item_number' {entry['item_number']} found by description")
+        if entry is None:
+            return False
+        # A certain match (exact code / EAN) makes the catalog authoritative; a nearest match only fills gaps
+        level = 'high' if method in ('exact', 'ean') else 'medium'
+        for field in ('item_number', 'item_description', 'ean_number', 'customer_item_number'):
+            value = entry[field]
+            if not value or parsed.get(field) == value:
+                continue
+            if field == 'ean_number' and parsed.get(field) and check_gs1(parsed[field], (13, 14))[1] == 'valid':
+                warnings.append(f"'ean_number' {parsed[field]} differs from catalog EAN {value} for {entry['item_number']}")
+                continue
+            if field == 'item_number' or level == 'high' or not parsed.get(field) or confidence.get(field) != 'high':
+                parsed[field] = value
+                confidence[field] = level
+                if f"'{field}' not found" in warnings:
+                    warnings.remove(f"'{field}' not found")
+        if parsed.get('item_number') == entry['item_number']:
+            confidence['item_number'] = level
+        return True
+    
+    def _check_gs1_fields(self, normalized, parsed, confidence, warnings):
+        """Check-digit SSCC and EAN/GTIN (see check_gs1) and set their confidence accordingly."""
+        sscc = parsed.get('sscc', '')
+        ai = ''
+        if len(sscc) == 20 and sscc.startswith('00'):
+            ai, sscc = '00', sscc[2:]  # AI (00) read into the number - checked without it, stored with it
+        m = _SSCC_LOOSE.search(normalized)
+        # The field patterns drop confused letters - the loose read keeps them for the correction search
+        sscc_reads = [sscc] + ([m.group(1)] if m and m.group(1) != sscc else [])
+        for field, reads, lengths, name in (('sscc', sscc_reads, (18,), 'SSCC-18'),
+                                            ('ean_number', [parsed.get('ean_number', '')], (13, 14), 'EAN-13/GTIN-14')):
+            value, checked, status = reads[0], reads[0], 'invalid'
+            for read in filter(None, reads):
+                read_checked, read_status = check_gs1(read, lengths)
+                if read_status != 'invalid':
+                    value, checked, status = read, read_checked, read_status
+                    break
+            if status == 'invalid':
+                if value:
+                    confidence[field] = 'low'
+                    warnings.append(f"'{field}' is not a valid {name} ({value})")
+                continue
+            if f"'{field}' not found" in warnings:
+                warnings.remove(f"'{field}' not found")
+            # Keep the stored SSCC format (20 digits when the AI was read into it) - duplicate checks
+            # compare SSCCs as stored, including those of records saved before this check existed
+            parsed[field] = ai + checked if field == 'sscc' else checked
+            confidence[field] = 'high' if status == 'valid' else 'medium'
+            if status == 'corrected':
+                warnings.append(f"'{field}' corrected to a valid {name} ({value} -> {checked})")
+    
     def _valid_date(self, value):
         """Date must be DD/MM/YYYY format, not TIME or time format"""
         val = value.strip().upper()
         if val in ('DATE', 'TIME'):
             return False
-        if re.search(r'\d{1,2}:\d{2}', val):
+        if _HAS_TIME.search(val):
             return False
-        return bool(re.search(r'\d{1,2}[/\-]\d{1,2}[/\-]\d{2,4}', val))
+        return bool(_DATE_SHAPE.search(val))
     
     def _valid_time(self, value):
         """Time must be HH:MM format, not DATE or date format"""
         val = value.strip().upper()
         if val in ('DATE', 'TIME'):
             return False
-        if re.search(r'\d{1,2}/\d{1,2}/\d{2,4}', val):
+        if _HAS_DATE.search(val):
             return False
-        return bool(re.search(r'\d{1,2}:\d{2}', val))
+        return bool(_HAS_TIME.search(val))
     
     def _valid_quantity(self, value):
         """Quantity must be numeric only - reject DATE, TIME, or other labels"""
@@ -271,18 +570,18 @@ class DataParser:
         val = str(value).strip().upper()
         if val in ('DATE', 'TIME', 'N/A', 'EA', 'ES'):
             return False
-        return bool(re.match(r'^\d+(\.\d+)?$', val))
+        return bool(_QUANTITY_SHAPE.match(val))
 
     def _valid_item_number(self, value):
         """Reject units (ea, es, etc.) and require proper item code format"""
         if not value or value.upper() == 'N/A':
             return False
-        val = re.sub(r'[^\w]', '', value).strip().upper()
+        val = _NON_WORD.sub('', value).strip().upper()
         if val in ('EA', 'ES', 'CS', 'CT', 'PC', 'KG', 'LB', 'BAG', 'BOX'):
             return False
         if len(val) < 10:
             return False
-        if not re.search(r'[A-Z]', val) or not re.search(r'\d', val):
+        if not _HAS_LETTER.search(val) or not _HAS_DIGIT.search(val):
             return False
         return True
     
@@ -3,22 +3,36 @@ Google Drive Integration
 Uploads captured images to Drive in date-based folders (7am-7am day blocks).
 """
 
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
 
 NZ_TZ = ZoneInfo("Pacific/Auckland")  # NZ Wellington time
 from pathlib import Path
 import io
+import json
 import os
+import threading
 
-def get_date_folder_name():
+FOLDER_MIME = 'application/vnd.google-apps.folder'
+FOLDER_CACHE_FILENAME = 'drive_folders.json'
+MULTIPART_MAX_BYTES = 5 * 1024 * 1024  # Simple multipart upload (one request) below this size
+BATCH_MAX_CALLS = 100  # Drive batch endpoint limit
+
+
+def get_date_folder_name(when=None):
     """
     Get folder name for current 7am-7am day block (NZ Wellington time).
     Day runs 7:00 AM to 6:59:59 AM next day.
     E.g. 3am Jan 31 -> Jan 30 folder (still in yesterday's block)
     E.g. 10am Jan 31 -> Jan 31 folder
+
+    Args:
+        when: Datetime to place (defaults to now). Naive datetimes are taken as NZ time.
     """
-    now = datetime.now(NZ_TZ)
+    now = when or datetime.now(NZ_TZ)
+    if now.tzinfo is not None:
+        now = now.astimezone(NZ_TZ)
     if now.hour < 7:
         # Before 7am: we're in the block that started yesterday 7am
         day_start = now.date() - timedelta(days=1)
@@ -27,6 +41,11 @@ def get_date_folder_name():
     return day_start.strftime('%Y-%m-%d')
 
 
+def get_next_date_folder_name():
+    """Folder name of the next 7am-7am block (the one starting at the coming 7am rollover)."""
+    return get_date_folder_name(datetime.now(NZ_TZ) + timedelta(days=1))
+
+
 def get_credentials(credentials_file=None, credentials_json=None):
     """Build credentials from file or JSON string."""
     from google.oauth2.service_account import Credentials
@@ -42,12 +61,279 @@ def get_credentials(credentials_file=None, credentials_json=None):
     return None
 
 
+class DriveClient:
+    def __init__(self, credentials_file=None, credentials_json=None, root_folder_id=None, cache_dir=None,
+                 max_workers=4, share_files=False, multipart_max_bytes=MULTIPART_MAX_BYTES):
+        """
+        Long-lived Drive client: credentials are parsed once, the service object is built once per
+        thread (httplib2 is not thread-safe) and date-folder ids are cached in memory and on disk,
+        so a steady-state upload is a single files().create call.
+
+        Args:
+            credentials_file / credentials_json: Service account credentials
+            root_folder_id: Parent of the date folders (None = My Drive root)
+            cache_dir: Directory for drive_folders.json (folder id cache that survives restarts)
+            max_workers: Upload threads used by upload_many()
+            share_files: Also grant link access per file (batched) instead of relying on the folder share
+            multipart_max_bytes: Files up to this size go as one multipart request; larger ones resumable
+        """
+        self.credentials_file = credentials_file
+        self.credentials_json = credentials_json
+        self.root_folder_id = root_folder_id
+        self.max_workers = max_workers
+        self.share_files = share_files
+        self.multipart_max_bytes = multipart_max_bytes
+        self.cache_path = Path(cache_dir) / FOLDER_CACHE_FILENAME if cache_dir else None
+        self._creds = None
+        self._local = threading.local()
+        self._folder_lock = threading.Lock()
+        self._folders = self._load_folder_cache()
+        self._timer = None
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    def _load_folder_cache(self):
+        if not self.cache_path or not self.cache_path.exists():
+            return {}
+        try:
+            with open(self.cache_path, 'r') as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"[Drive] Ignoring unreadable folder cache {self.cache_path}: {e}")
+            return {}
+
+    def _save_folder_cache(self):
+        if not self.cache_path:
+            return
+        try:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.cache_path.with_suffix('.tmp')
+            with open(tmp, 'w') as f:
+                json.dump(self._folders, f, indent=2)
+            os.replace(tmp, self.cache_path)
+        except Exception as e:
+            print(f"[Drive] Could not write folder cache: {e}")
+
+    def service(self):
+        """Drive v3 service for the calling thread. Raises if the client library or credentials are missing."""
+        service = getattr(self._local, 'service', None)
+        if service is None:
+            from googleapiclient.discovery import build
+            if self._creds is None:
+                self._creds = get_credentials(self.credentials_file, self.credentials_json)
+                if not self._creds:
+                    raise Exception("No Drive credentials")
+            service = build('drive', 'v3', credentials=self._creds, cache_discovery=False)
+            self._local.service = service
+        return service
+
+    def _cache_key(self, folder_name):
+        return f"{self.root_folder_id or 'root'}/{folder_name}"
+
+    def folder_id(self, folder_name):
+        """Id of the date folder, looked up or created (and shared by link) on first use."""
+        key = self._cache_key(folder_name)
+        folder_id = self._folders.get(key)
+        if folder_id:
+            return folder_id
+        with self._folder_lock:
+            folder_id = self._folders.get(key)
+            if folder_id:
+                return folder_id
+            service = self.service()
+            # Find or create date folder (supportsAllDrives=True for Shared Drives - fixes quota error)
+            parent_id = self.root_folder_id or 'root'
+            list_params = {'q': f"name='{folder_name}' and '{parent_id}' in parents and mimeType='{FOLDER_MIME}' and trashed=false", 'spaces': 'drive', 'fields': 'files(id, name)', 'supportsAllDrives': True, 'includeItemsFromAllDrives': True}
+            folders = service.files().list(**list_params).execute().get('files', [])
+            if folders:
+                folder_id = folders[0]['id']
+            else:
+                folder_metadata = {'name': folder_name, 'mimeType': FOLDER_MIME}
+                if self.root_folder_id:
+                    folder_metadata['parents'] = [self.root_folder_id]
+                folder = service.files().create(body=folder_metadata, fields='id', supportsAllDrives=True).execute()
+                folder_id = folder['id']
+            # Share the folder by link once - files inside inherit it, so uploads skip a permissions call
+            self._share_by_link(folder_id)
+            self._folders[key] = folder_id
+            self._save_folder_cache()
+            return folder_id
+
+    def _share_by_link(self, file_id):
+        from googleapiclient.errors import HttpError
+        try:
+            self.service().permissions().create(fileId=file_id, body={'type': 'anyone', 'role': 'reader'}, supportsAllDrives=True).execute()
+        except HttpError as e:
+            self._permission_error(e)
+
+    @staticmethod
+    def _permission_error(e):
+        if 'insufficient' in str(e).lower() or '403' in str(e):
+            pass  # May already have permission
+        else:
+            print(f"[WARN] Could not set Drive permission: {e}")
+
+    def share_by_link_batch(self, file_ids):
+        """Grant anyone-with-link read on many files through the Drive batch endpoint (100 calls per request)."""
+        service = self.service()
+        permission = {'type': 'anyone', 'role': 'reader'}
+
+        def _callback(request_id, response, exception):
+            if exception is not None:
+                self._permission_error(exception)
+
+        for i in range(0, len(file_ids), BATCH_MAX_CALLS):
+            batch = service.new_batch_http_request(callback=_callback)
+            for file_id in file_ids[i:i + BATCH_MAX_CALLS]:
+                batch.add(service.permissions().create(fileId=file_id, body=permission, supportsAllDrives=True))
+            batch.execute()
+
+    def forget_folder(self, folder_name):
+        """Drop a cached folder id (e.g. the folder was deleted in Drive)."""
+        with self._folder_lock:
+            if self._folders.pop(self._cache_key(folder_name), None):
+                self._save_folder_cache()
+
+    def upload(self, file_path, filename, folder_name=None, check_existing=False, share=True):
+        """
+        Upload image into its date folder. Returns (drive_url, error).
+        check_existing: list the folder for filename first (use on retries, where an earlier
+        attempt may have created the file before failing).
+        share: grant per-file link access when share_files is set (upload_many batches these instead)
+        """
+        from googleapiclient.http import MediaFileUpload
+        from googleapiclient.errors import HttpError
+        folder_name = folder_name or get_date_folder_name()
+        folder_id = self.folder_id(folder_name)
+        service = self.service()
+
+        file_id = None
+        if check_existing:
+            # Check if file already exists (avoid duplicates by filename)
+            file_query = f"name='{filename}' and '{folder_id}' in parents and trashed=false"
+            existing = service.files().list(q=file_query, spaces='drive', fields='files(id)', supportsAllDrives=True, includeItemsFromAllDrives=True).execute()
+            if existing.get('files'):
+                file_id = existing['files'][0]['id']
+        if file_id is None:
+            file_metadata = {'name': filename, 'parents': [folder_id]}
+            # Capture JPEGs are well under a megabyte: one multipart request instead of a resumable session
+            resumable = os.path.getsize(file_path) > self.multipart_max_bytes
+            media = MediaFileUpload(file_path, mimetype='image/jpeg', resumable=resumable)
+            try:
+                file = service.files().create(body=file_metadata, media_body=media, fields='id', supportsAllDrives=True).execute()
+            except HttpError as e:
+                if getattr(e, 'resp', None) is not None and e.resp.status == 404:
+                    self.forget_folder(folder_name)  # Cached folder was deleted - recreate on retry
+                raise
+            file_id = file['id']
+            if self.share_files and share:
+                self._share_by_link(file_id)
+
+        return self.view_url(file_id), None
+
+    @staticmethod
+    def view_url(file_id):
+        return f"https://drive.google.com/uc?export=view&id={file_id}"
+
+    def _executor(self):
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='drive-upload')
+            return self._pool
+
+    def upload_many(self, items):
+        """
+        Upload many images in parallel on the bounded pool (backfill after an outage).
+
+        Args:
+            items: list of dicts with file_path, filename and optional folder_name / check_existing
+        Returns:
+            list of (drive_url, error) in the same order as items
+        """
+        if not items:
+            return []
+        # Resolve folders up front so workers don't race to create the same date folder
+        for folder_name in {item.get('folder_name') or get_date_folder_name() for item in items}:
+            self.folder_id(folder_name)
+
+        def _one(item):
+            try:
+                return self.upload(item['file_path'], item['filename'], folder_name=item.get('folder_name'),
+                                   check_existing=item.get('check_existing', False), share=False)
+            except Exception as e:
+                return None, e
+
+        results = list(self._executor().map(_one, items))
+        if self.share_files:
+            file_ids = [url.rsplit('id=', 1)[-1] for url, _ in results if url]
+            if file_ids:
+                try:
+                    self.share_by_link_batch(file_ids)
+                except Exception as e:
+                    print(f"[WARN] Batched Drive permissions failed: {e}")
+        return results
+
+    def ensure_upcoming_folders(self):
+        """Resolve today's and the next block's folder ids ahead of the 7am rollover."""
+        for folder_name in (get_date_folder_name(), get_next_date_folder_name()):
+            self.folder_id(folder_name)
+
+    def start_prefetch_timer(self, interval_seconds=3600):
+        """Keep today's and tomorrow's folders created on a daemon timer."""
+        def _tick():
+            try:
+                self.ensure_upcoming_folders()
+            except Exception as e:
+                print(f"[Drive] Folder prefetch error: {e}")
+            self._timer = threading.Timer(interval_seconds, _tick)
+            self._timer.daemon = True
+            self._timer.start()
+
+        self._timer = threading.Timer(0, _tick)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def stop(self):
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+        if self._pool:
+            self._pool.shutdown(wait=False)
+            self._pool = None
+
+    def stats(self):
+        return {
+            'cached_folders': len(self._folders),
+            'cache_file': str(self.cache_path) if self.cache_path else None,
+            'upload_workers': self.max_workers,
+            'share_files': self.share_files,
+        }
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_drive_client(credentials_file=None, credentials_json=None, root_folder_id=None, cache_dir=None, **options):
+    """Process-wide DriveClient for these credentials / root folder. options (max_workers, share_files, ...) apply on first call."""
+    key = (credentials_file, credentials_json, root_folder_id)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = DriveClient(credentials_file, credentials_json, root_folder_id, cache_dir, **options)
+            _clients[key] = client
+        return client
+
+
 def upload_to_drive(
     file_path,
     filename,
     root_folder_id=None,
     credentials_file=None,
-    credentials_json=None
+    credentials_json=None,
+    folder_name=None,
+    check_existing=False,
+    cache_dir=None
 ):
     """
     Upload image to Google Drive in a date-named folder (YYYY-MM-DD).
@@ -55,62 +341,12 @@ def upload_to_drive(
     Returns (drive_url, error). drive_url is viewable link for img src.
     """
     try:
-        from googleapiclient.discovery import build
-        from googleapiclient.http import MediaFileUpload
-        from googleapiclient.errors import HttpError
+        import googleapiclient.discovery  # noqa: F401
     except ImportError:
         return None, "Install google-api-python-client: pip install google-api-python-client"
 
-    creds = get_credentials(credentials_file, credentials_json)
-    if not creds:
-        return None, "No Drive credentials"
-
     try:
-        service = build('drive', 'v3', credentials=creds)
-        folder_name = get_date_folder_name()
-
-        # Find or create date folder (supportsAllDrives=True for Shared Drives - fixes quota error)
-        parent_id = root_folder_id or 'root'
-        list_params = {'q': f"name='{folder_name}' and '{parent_id}' in parents and mimeType='application/vnd.google-apps.folder' and trashed=false", 'spaces': 'drive', 'fields': 'files(id, name)', 'supportsAllDrives': True, 'includeItemsFromAllDrives': True}
-        results = service.files().list(**list_params).execute()
-        folders = results.get('files', [])
-
-        if folders:
-            folder_id = folders[0]['id']
-        else:
-            folder_metadata = {
-                'name': folder_name,
-                'mimeType': 'application/vnd.google-apps.folder'
-            }
-            if root_folder_id:
-                folder_metadata['parents'] = [root_folder_id]
-            create_params = {'body': folder_metadata, 'fields': 'id', 'supportsAllDrives': True}
-            folder = service.files().create(**create_params).execute()
-            folder_id = folder['id']
-
-        # Check if file already exists (avoid duplicates by filename)
-        file_query = f"name='{filename}' and '{folder_id}' in parents and trashed=false"
-        existing = service.files().list(q=file_query, spaces='drive', fields='files(id)', supportsAllDrives=True, includeItemsFromAllDrives=True).execute()
-        if existing.get('files'):
-            file_id = existing['files'][0]['id']
-        else:
-            file_metadata = {'name': filename, 'parents': [folder_id]}
-            media = MediaFileUpload(file_path, mimetype='image/jpeg', resumable=True)
-            create_params = {'body': file_metadata, 'media_body': media, 'fields': 'id', 'supportsAllDrives': True}
-            file = service.files().create(**create_params).execute()
-            file_id = file['id']
-
-        # Make viewable by anyone with link
-        try:
-            service.permissions().create(fileId=file_id, body={'type': 'anyone', 'role': 'reader'}, supportsAllDrives=True).execute()
-        except HttpError as e:
-            if 'insufficient' in str(e).lower() or '403' in str(e):
-                pass  # May already have permission
-            else:
-                print(f"[WARN] Could not set Drive permission: {e}")
-
-        view_url = f"https://drive.google.com/uc?export=view&id={file_id}"
-        return view_url, None
-
+        client = get_drive_client(credentials_file, credentials_json, root_folder_id, cache_dir)
+        return client.upload(file_path, filename, folder_name=folder_name, check_existing=check_existing)
     except Exception as e:
         return None, str(e)
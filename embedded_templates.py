@@ -115,9 +115,14 @@ function loadDiagnostics(){var el=document.getElementById('processLog');if(!el)r
     function motion(id,prev){if(!prev)return 999;var c=getPixels(id);if(c.length!==prev.length)return 999;var s=0;for(var i=0;i<c.length;i++)s+=Math.abs(c[i]-prev[i]);return s/c.length;}
     function sharpness(id){var d=id.data,w=id.width,h=id.height,v=0,m=0,n=0;for(var y=1;y<h-1;y+=10)for(var x=1;x<w-1;x+=10){var idx=(y*w+x)*4;var g=(d[idx]+d[idx+1]+d[idx+2])/3;var ni=(y*w+(x+1))*4;var ng=(d[ni]+d[ni+1]+d[ni+2])/3;m+=Math.abs(g-ng);n++;}if(n===0)return 0;m/=n;for(var y=1;y<h-1;y+=10)for(var x=1;x<w-1;x+=10){var idx=(y*w+x)*4;var g=(d[idx]+d[idx+1]+d[idx+2])/3;var ni=(y*w+(x+1))*4;var ng=(d[ni]+d[ni+1]+d[ni+2])/3;v+=Math.pow(Math.abs(g-ng)-m,2);}return v/n;}
     function analyzeFrame(){if(isProcessing||!isRunning)return;try{var ctx=canvas.getContext('2d',{willReadFrequently:true});var id=ctx.getImageData(0,0,canvas.width,canvas.height);var sh=sharpness(id);if(captureState==='capturing'||captureState==='countdown')return;if(captureState==='wait_exit'){if(sh<SHARPNESS_THRESHOLD*0.7){exitFrameCount++;if(exitFrameCount>=EXIT_FRAMES_NEEDED){captureState='ready';exitFrameCount=0;prevFramePixels=null;updateStatus('ready','Ready for next label');}}else exitFrameCount=0;return;}if(captureState==='ready'){prevFramePixels=getPixels(id);if(sh>SHARPNESS_THRESHOLD){captureState='label_in_view';stableFrameCount=0;updateStatus('processing','Hold steady...');}return;}if(captureState==='label_in_view'||captureState==='checking'){if(sh<SHARPNESS_THRESHOLD){captureState='ready';stableFrameCount=0;prevFramePixels=null;return;}var mot=motion(id,prevFramePixels);prevFramePixels=getPixels(id);if(mot<MOTION_THRESHOLD){stableFrameCount++;captureState='checking';if(stableFrameCount>=STABLE_FRAMES_NEEDED){captureState='countdown';captureWithCountdown();}}else{stableFrameCount=0;updateStatus('processing','Hold steady...');}}}catch(e){}}
-    function captureWithCountdown(){if(isProcessing)return;isProcessing=true;captureState='capturing';var frame=document.getElementById('cameraFrame'),overlay=document.getElementById('countdownOverlay');if(stream)stream.getTracks().forEach(function(t){t.enabled=false;});var fc=document.createElement('canvas');fc.width=canvas.width;fc.height=canvas.height;fc.getContext('2d').drawImage(canvas,0,0);var v=document.getElementById('video'),ph=document.getElementById('videoPlaceholder');ph.style.backgroundImage='url('+fc.toDataURL('image/jpeg')+')';ph.style.backgroundSize='cover';ph.style.display='flex';ph.innerHTML='';var doCap=function(){overlay.classList.add('green');overlay.textContent='OK';updateStatus('processing','Processing...');setTimeout(function(){overlay.classList.remove('active','green');overlay.textContent='';if(stream)stream.getTracks().forEach(function(t){t.enabled=true;});v.style.display='block';ph.style.backgroundImage='';ph.style.display='none';captureState='wait_exit';exitFrameCount=0;updateStatus('success','Captured! Remove label');var w=fc.width,h=fc.height,m=800;if(w>m||h>m){var sc=m/Math.max(w,h);w=Math.round(w*sc);h=Math.round(h*sc);}var cc=document.createElement('canvas');cc.width=w;cc.height=h;cc.getContext('2d').drawImage(fc,0,0,w,h);submitTicket(cc.toDataURL('image/jpeg',0.7));},500);};overlay.classList.add('active');overlay.classList.remove('green');var cd=function(n){if(n>0){overlay.textContent=n;updateStatus('processing','Hold... '+n);setTimeout(function(){cd(n-1);},1000);}else{frame.classList.add('capture-good');doCap();}};cd(3);}
+    function captureWithCountdown(){if(isProcessing)return;isProcessing=true;captureState='capturing';var frame=document.getElementById('cameraFrame'),overlay=document.getElementById('countdownOverlay');if(stream)stream.getTracks().forEach(function(t){t.enabled=false;});var fc=document.createElement('canvas');fc.width=canvas.width;fc.height=canvas.height;fc.getContext('2d').drawImage(canvas,0,0);var v=document.getElementById('video'),ph=document.getElementById('videoPlaceholder');ph.style.backgroundImage='url('+fc.toDataURL('image/jpeg')+')';ph.style.backgroundSize='cover';ph.style.display='flex';ph.innerHTML='';var doCap=function(){overlay.classList.add('green');overlay.textContent='OK';updateStatus('processing','Processing...');setTimeout(function(){overlay.classList.remove('active','green');overlay.textContent='';if(stream)stream.getTracks().forEach(function(t){t.enabled=true;});v.style.display='block';ph.style.backgroundImage='';ph.style.display='none';captureState='wait_exit';exitFrameCount=0;updateStatus('success','Captured! Remove label');var w=fc.width,h=fc.height,m=800;if(w>m||h>m){var sc=m/Math.max(w,h);w=Math.round(w*sc);h=Math.round(h*sc);}var cc=document.createElement('canvas');cc.width=w;cc.height=h;cc.getContext('2d').drawImage(fc,0,0,w,h);if(cc.toBlob)cc.toBlob(function(b){submitTicket(b||cc.toDataURL('image/jpeg',0.7));},'image/jpeg',0.7);else submitTicket(cc.toDataURL('image/jpeg',0.7));},500);};overlay.classList.add('active');overlay.classList.remove('green');var cd=function(n){if(n>0){overlay.textContent=n;updateStatus('processing','Hold... '+n);setTimeout(function(){cd(n-1);},1000);}else{frame.classList.add('capture-good');doCap();}};cd(3);}
     var capturedRecords=[];
-    function submitTicket(img){updateStatus('processing','Running OCR...');fetch('/api/submit',{method:'POST',headers:{'Content-Type':'application/json'},body:JSON.stringify({image:img,test_mode:testMode})}).then(function(r){return safeJson(r).then(function(d){return{ok:r.ok,status:r.status,data:d};});}).then(function(_){var d=_.data;if(d.duplicate){if(d.record)document.getElementById('rawOcrText').textContent=d.record.raw_ocr_text||'(none)';updateStatus('error','Duplicate - use Test Mode');captureState='ready';isProcessing=false;return;}if(d.success){if(d.record){capturedRecords.push(d.record);loadLabelsList();document.getElementById('rawOcrText').textContent=d.record.raw_ocr_text||'(none)';}var m=d.message||'Submitted!';if(d.sheets_error)m+=' Sheet: '+d.sheets_error;updateStatus('success',m);isProcessing=false;var pl=document.getElementById('processLog');if(pl){var tx=(pl.textContent||'').replace(/After capture.*/,'');tx+='--- Last capture ---\n';tx+='OCR: done\n';tx+='Drive: '+(d.drive_uploaded?'OK':'skipped')+'\n';tx+='Sheets: '+(d.sheets_submitted?'OK':'FAILED')+(d.sheets_error?' - '+d.sheets_error:'')+'\n';pl.textContent=tx;pl.scrollTop=pl.scrollHeight;}}else{throw new Error(d.message||d.error||'Failed');}}).catch(function(e){updateStatus('error','Error: '+e.message);captureState='ready';isProcessing=false;});}
+    var pendingJobs={},jobStream=null,jobPollTimer=null;
+    function submitTicket(img){updateStatus('processing','Uploading...');var opts;if(typeof img==='string'){opts={method:'POST',headers:{'Content-Type':'application/json'},body:JSON.stringify({image:img,test_mode:testMode,async:true})};}else{var fd=new FormData();fd.append('image',img,'capture.jpg');fd.append('test_mode',testMode?'1':'0');fd.append('async','1');opts={method:'POST',body:fd};}fetch('/api/submit',opts).then(function(r){return safeJson(r).then(function(d){return{ok:r.ok,status:r.status,data:d};});}).then(function(_){var d=_.data;if(d.queued&&d.job_id){pendingJobs[d.job_id]=true;isProcessing=false;updateStatus('success','Captured! Remove label ('+Object.keys(pendingJobs).length+' processing)');watchJobs();return;}handleSubmitResult(d,false);}).catch(function(e){updateStatus('error','Error: '+e.message);captureState='ready';isProcessing=false;});}
+    function handleSubmitResult(d,fromJob){if(d.duplicate){if(d.record)document.getElementById('rawOcrText').textContent=d.record.raw_ocr_text||'(none)';updateStatus('error','Duplicate - use Test Mode');if(!fromJob){captureState='ready';isProcessing=false;}return;}if(d.success){if(d.record){capturedRecords.push(d.record);loadLabelsList();document.getElementById('rawOcrText').textContent=d.record.raw_ocr_text||'(none)';}var m=d.message||'Submitted!';if(d.sheets_error)m+=' Sheet: '+d.sheets_error;updateStatus('success',m);if(!fromJob)isProcessing=false;var pl=document.getElementById('processLog');if(pl){var tx=(pl.textContent||'').replace(/After capture.*/,'');tx+='--- Last capture ---\n';tx+='OCR: done\n';tx+='Drive: '+(d.drive_uploaded?'OK':(d.sync_queued?'queued':'skipped'))+'\n';tx+='Sheets: '+(d.sheets_submitted?'OK':(d.sync_queued?'queued':'FAILED'))+(d.sheets_error?' - '+d.sheets_error:'')+'\n';pl.textContent=tx;pl.scrollTop=pl.scrollHeight;}}else{var err=d.message||d.error||'Failed';if(fromJob){updateStatus('error','Error: '+err);return;}throw new Error(err);}}
+    function finishJob(j){if(!pendingJobs[j.id])return;if(j.status!=='done'&&j.status!=='error')return;delete pendingJobs[j.id];if(j.status==='done')handleSubmitResult(j.result||{},true);else updateStatus('error','Error: '+(j.error||'OCR failed'));if(!Object.keys(pendingJobs).length&&jobStream){jobStream.close();jobStream=null;}}
+    function watchJobs(){if(jobStream||jobPollTimer)return;if(!window.EventSource){pollJobs();return;}jobStream=new EventSource('/api/jobs/stream');jobStream.addEventListener('job',function(ev){try{finishJob(JSON.parse(ev.data));}catch(e){}});jobStream.onerror=function(){if(jobStream){jobStream.close();jobStream=null;}if(Object.keys(pendingJobs).length)pollJobs();};}
+    function pollJobs(){jobPollTimer=null;var ids=Object.keys(pendingJobs);ids.forEach(function(id){fetch('/api/jobs/'+id).then(function(r){return safeJson(r);}).then(function(j){if(!j.id){delete pendingJobs[id];return;}finishJob(j);}).catch(function(){});});if(ids.length)jobPollTimer=setTimeout(pollJobs,2000);}
     function escapeHtml(t){var d=document.createElement('div');d.textContent=t;return d.innerHTML;}
     function safeJson(r){var ct=r.headers.get('content-type')||'';if(!ct.includes('application/json'))return r.text().then(function(t){throw new Error('Server returned '+r.status+(t&&t.length<100?': '+t:''));});return r.json();}
     function loadLabelsList(){fetch('/api/pending').then(function(r){return safeJson(r);}).then(function(d){renderLabelsTable(d.records||[]);}).catch(function(e){var t=document.getElementById('labelsTableBody');if(t)t.innerHTML='<tr><td colspan="7" class="labels-table-empty">Error: '+e.message+'</td></tr>';});}
@@ -0,0 +1,147 @@
+"""
+Field Re-OCR
+Second pass for fields the first OCR pass missed. The first pass's word boxes locate the field's
+heading (e.g. "BATCH NO"); only the value region next to it - right of the heading on the same
+line, then the line below - is cropped from the higher-resolution capture, upscaled so the text
+is a readable height, and sent to OCR on its own. The patch text is parsed with the field's own
+DataParser patterns. A missing SSCC or batch number no longer means re-shooting the label.
+"""
+
+from PIL import Image
+import io
+import re
+import threading
+import time
+
+# Fields worth a second pass, in priority order (each costs up to two small OCR calls)
+DEFAULT_FIELDS = ('sscc', 'batch_no', 'quantity', 'item_number')
+
+
+def _token(text):
+    return re.sub(r'[^A-Z0-9]', '', str(text).upper())
+
+
+class FieldReOCR:
+    def __init__(self, ocr, parser, fields=DEFAULT_FIELDS, target_text_px=48, max_calls=4, max_patch_dim=1600):
+        """
+        Args:
+            ocr: OCRProcessor / OCRRouter used for the patches
+            parser: DataParser (its field keywords locate headings, its patterns read values)
+            fields: Fields re-read when missing
+            target_text_px: Upscale patches so the heading's text height is about this many pixels
+            max_calls: OCR calls allowed per capture
+            max_patch_dim: Longest side of a patch sent to OCR
+        """
+        self.ocr = ocr
+        self.parser = parser
+        self.fields = tuple(fields)
+        self.target_text_px = target_text_px
+        self.max_calls = max_calls
+        self.max_patch_dim = max_patch_dim
+        self.counters = {'attempts': 0, 'recovered': 0, 'calls': 0}
+        self._lock = threading.Lock()
+
+    def _count(self, name, n=1):
+        with self._lock:
+            self.counters[name] += n
+
+    def _field_config(self, field, template=None):
+        return self.parser.templates.get(template).field_configs.get(field, {})
+
+    def locate_heading(self, words, field, template=None):
+        """
+        Box (left, top, right, bottom) of the field's heading among the OCR words, or None.
+        Multi-word headings must be consecutive words on one line (left to right, overlapping vertically).
+        template: label template the first pass classified the text as (default layout if None)
+        """
+        for keyword in self._field_config(field, template).get('keywords', []):
+            tokens = [_token(t) for t in keyword.split()]
+            for i in range(len(words) - len(tokens) + 1):
+                run = words[i:i + len(tokens)]
+                if i > 0 and _token(words[i - 1]['text']) == 'CUSTOMER':
+                    continue  # ITEM NUMBER inside CUSTOMER ITEM NUMBER (same rule as DataParser)
+                if not all(_token(w['text']).startswith(t) if j == len(tokens) - 1 else _token(w['text']) == t
+                           for j, (w, t) in enumerate(zip(run, tokens))):
+                    continue
+                if not all(b['left'] > a['left'] and b['top'] < a['top'] + a['height'] and a['top'] < b['top'] + b['height']
+                           for a, b in zip(run, run[1:])):
+                    continue
+                return (min(w['left'] for w in run), min(w['top'] for w in run),
+                        max(w['left'] + w['width'] for w in run), max(w['top'] + w['height'] for w in run))
+        return None
+
+    @staticmethod
+    def value_regions(heading, size):
+        """Candidate value boxes for a heading box in an image of size: same line to the right, then below."""
+        left, top, right, bottom = heading
+        width, height = size
+        h = max(1, bottom - top)
+        pad = h * 0.4
+        right_of = (right, top - pad, width, bottom + pad)
+        below = (max(0, left - h), bottom, min(width, left + (right - left) * 4 + h * 10), bottom + h * 2.6)
+        return [tuple(int(round(v)) for v in box) for box in (right_of, below)
+                if box[2] - box[0] > h and box[3] - box[1] > h / 2]
+
+    def _patch(self, hires, box, scale, text_px):
+        """Crop box (OCR-image pixels) from hires, upscaled towards target_text_px. Returns JPEG bytes."""
+        left, top, right, bottom = [v * scale for v in box]
+        left, top = max(0, left), max(0, top)
+        right, bottom = min(hires.width, right), min(hires.height, bottom)
+        patch = hires.crop((int(left), int(top), int(right), int(bottom)))
+        zoom = max(1.0, self.target_text_px / max(1.0, text_px * scale))
+        zoom = min(zoom, self.max_patch_dim / float(max(patch.size)))
+        if zoom > 1.0:
+            patch = patch.resize((int(patch.width * zoom), int(patch.height * zoom)), Image.Resampling.LANCZOS)
+        buf = io.BytesIO()
+        patch.convert('RGB').save(buf, 'JPEG', quality=92)
+        return buf.getvalue()
+
+    def recover(self, hires, ocr_size, words, missing, template=None):
+        """
+        Re-OCR the value regions of missing fields.
+
+        Args:
+            hires: PIL image the OCR upload was made from (same framing, more pixels)
+            ocr_size: (width, height) of the image the word boxes refer to
+            words: Word boxes from the first pass (OCRProcessor.last_words())
+            missing: Field names to try (those not in self.fields are skipped)
+            template: Label template of the first pass (its headings and patterns are used)
+        Returns:
+            ({field: value} recovered, info with calls / reocr_ms / located)
+        """
+        started = time.perf_counter()
+        scale = hires.width / float(ocr_size[0])
+        found = {}
+        located = []
+        calls = 0
+        for field in [f for f in self.fields if f in missing]:
+            heading = self.locate_heading(words or [], field, template)
+            if heading is None:
+                continue
+            located.append(field)
+            self._count('attempts')
+            keyword = self._field_config(field, template)['keywords'][-1]
+            for box in self.value_regions(heading, ocr_size):
+                if calls >= self.max_calls:
+                    break
+                calls += 1
+                try:
+                    text = self.ocr.process_image(self._patch(hires, box, scale, heading[3] - heading[1]))
+                except Exception as e:
+                    print(f"[ReOCR] {field} patch failed: {e}")
+                    continue
+                result = self.parser.parse(f"{keyword}: {text}", template=template, record_stats=False)
+                value = result['parsed'].get(field)
+                # Only a full pattern match or a check-digit corrected SSCC / EAN counts - the
+                # keyword-proximity fallback guesses on short patches
+                corrected = any(w.startswith(f"'{field}' corrected to a valid") for w in result['warnings'])
+                if value and (result['confidence'].get(field) == 'high' or corrected):
+                    found[field] = value
+                    self._count('recovered')
+                    break
+        self._count('calls', calls)
+        return found, {'calls': calls, 'located': located, 'reocr_ms': round((time.perf_counter() - started) * 1000, 1)}
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counters, fields=list(self.fields))
@@ -0,0 +1,155 @@
+"""
+Image Encoder
+Reduced-resolution decode and single-pass JPEG sizing for OCR uploads.
+Phone photos are decoded near the OCR size (JPEG DCT scaling via Image.draft, then Image.reduce)
+instead of at full resolution. Encoding predicts dimensions and quality from the first encode's
+bytes-per-pixel, then refines with a bounded binary search over one resized image instead of
+trying every size x quality combination.
+"""
+
+from PIL import Image
+import io
+import math
+import time
+
+_BYTES_PER_PIXEL = {'1': 0.125, 'L': 1, 'P': 1, 'RGB': 4, 'RGBA': 4, 'CMYK': 4, 'YCbCr': 4, 'I;16': 2}
+
+# Quality steps tried by the binary search (highest that fits wins)
+QUALITY_STEPS = (40, 45, 50, 55, 60, 65, 70, 75, 80, 85)
+
+# Leave headroom under the limit when predicting a smaller size
+_SIZE_MARGIN = 0.9
+
+
+def decode_reduced(data, target_dim=800):
+    """
+    Decode image bytes (or a seekable file object, e.g. an uploaded multipart part) to RGB with
+    the longest side at least target_dim (never upscaled) but as close to it as whole-number
+    scaling allows - a 12 MP photo decodes at 1/4 scale instead of allocating a ~36 MB
+    full-resolution buffer.
+
+    Returns:
+        (img, info) - info has source / decoded size, decode_ms and decode_mb (decoded buffer size)
+    """
+    started = time.perf_counter()
+    img = Image.open(io.BytesIO(data) if isinstance(data, (bytes, bytearray)) else data)
+    source = img.size
+    longest = max(source)
+    if img.format == 'JPEG' and longest > target_dim:
+        # DCT scale-on-decode (1/2, 1/4, 1/8) - keeps both sides >= the requested box
+        scale = target_dim / float(longest)
+        img.draft('RGB', (max(1, int(source[0] * scale)), max(1, int(source[1] * scale))))
+    img.load()
+    if img.mode not in ('RGB', 'RGBA', 'L'):
+        img = img.convert('RGB')  # reduce() doesn't handle palette / CMYK / 1-bit
+    factor = max(img.size) // target_dim
+    if factor >= 2:
+        img = img.reduce(factor)
+    if img.mode != 'RGB':
+        img = img.convert('RGB')
+    info = {
+        'source': f"{source[0]}x{source[1]}",
+        'decoded': f"{img.width}x{img.height}",
+        'decode_ms': round((time.perf_counter() - started) * 1000, 1),
+        'decode_mb': round(img.width * img.height * _BYTES_PER_PIXEL.get(img.mode, 4) / (1024 * 1024), 2),
+    }
+    return img, info
+
+
+def _encode(img, quality):
+    buf = io.BytesIO()
+    img.save(buf, 'JPEG', quality=quality, optimize=True)
+    return buf.getvalue()
+
+
+def _resize(img, max_dim):
+    width, height = img.size
+    if max(width, height) <= max_dim:
+        return img
+    scale = max_dim / max(width, height)
+    return img.resize((max(1, int(width * scale)), max(1, int(height * scale))), Image.Resampling.LANCZOS)
+
+
+def encode_under(img, max_bytes, max_dim=800, min_dim=400, qualities=QUALITY_STEPS):
+    """
+    Encode img as JPEG no larger than max_bytes.
+
+    1. Resize once to max_dim and encode at the top quality (usually enough - one attempt).
+    2. Too big: binary search the quality steps on that same resized image.
+    3. Still too big at the lowest quality: predict the pixel count that fits from the measured
+       bytes-per-pixel, resize once more (not below min_dim) and search again.
+    4. Guarantee: keep shrinking at the lowest quality until it fits.
+
+    Args:
+        img: PIL Image
+        max_bytes: Hard size limit (exclusive)
+        max_dim: Longest side of the first attempt
+        min_dim: Smallest longest side the predictor will choose
+        qualities: Ascending JPEG quality steps
+    Returns:
+        (jpeg_bytes, info) - info has attempts, quality, width, height, bytes
+    """
+    rgb = img.convert('RGB')
+    attempts = 0
+
+    def _try(image, quality):
+        nonlocal attempts
+        attempts += 1
+        return _encode(image, quality)
+
+    def _search(image, top_data=None):
+        """
+        Highest quality step under max_bytes, or (None, bytes at lowest quality).
+        top_data: image already encoded (too big) at the top quality - that step isn't tried again.
+        """
+        lo, hi = 0, len(qualities) - 1
+        best = None
+        smallest = None
+        if top_data is not None:
+            hi -= 1
+            if hi < 0:
+                smallest = top_data  # Top quality is the only (lowest) step
+        while lo <= hi:
+            mid = (lo + hi) // 2
+            data = _try(image, qualities[mid])
+            if len(data) < max_bytes:
+                best = (qualities[mid], data)
+                lo = mid + 1
+            else:
+                if mid == 0:
+                    smallest = data
+                hi = mid - 1
+        return best, smallest
+
+    def _result(image, quality, data):
+        return data, {'attempts': attempts, 'quality': quality, 'width': image.width,
+                      'height': image.height, 'bytes': len(data)}
+
+    resized = _resize(rgb, max_dim)
+    data = _try(resized, qualities[-1])
+    if len(data) < max_bytes:
+        return _result(resized, qualities[-1], data)
+
+    best, smallest = _search(resized, top_data=data)
+    if best:
+        return _result(resized, *best)
+
+    # Predict the longest side that fits at the lowest quality from bytes-per-pixel
+    bpp = len(smallest) / float(resized.width * resized.height)
+    target_pixels = max_bytes * _SIZE_MARGIN / bpp
+    scale = math.sqrt(target_pixels / float(resized.width * resized.height))
+    dim = max(min_dim, int(max(resized.size) * min(scale, 1.0)))
+    if dim < max(resized.size):
+        resized = _resize(rgb, dim)
+        best, smallest = _search(resized)
+        if best:
+            return _result(resized, *best)
+
+    # Guarantee the limit: shrink at the lowest quality until it fits
+    dim = max(resized.size)
+    while True:
+        dim = max(16, int(dim * 0.8))
+        resized = _resize(rgb, dim)
+        data = _try(resized, qualities[0])
+        if len(data) < max_bytes or dim == 16:
+            return _result(resized, qualities[0], data)
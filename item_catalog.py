@@ -0,0 +1,313 @@
+"""
+Item Master Catalog
+Known items (item_number -> item_description, ean_number, customer_item_number) loaded from a CSV
+or JSON export, indexed so an OCR'd item code can be corrected to the catalog code:
+    - Trie over item codes: exact lookup, unique-prefix completion (code cut off at the label
+      edge) and nearest code within a few edits (O/0, I/1, dropped characters) - one Levenshtein
+      row per trie node, branches pruned once every cell of the row is over the limit
+    - BK-tree over the description vocabulary: each OCR'd description word is corrected to the
+      nearest catalog word (triangle inequality skips subtrees; bit-parallel edit distance), an
+      inverted word index shortlists items, and the closest whole description must be unique -
+      the item when the code wasn't readable
+    - EAN index: item from a check-digit valid EAN
+A correction is only made when the nearest match is unique; ties are left to the operator.
+"""
+
+from pathlib import Path
+import csv
+import json
+import re
+import threading
+
+# Record fields the catalog supplies, and the export column names accepted for each
+FIELDS = ('item_number', 'item_description', 'ean_number', 'customer_item_number')
+_COLUMNS = {
+    'item_number': ('item_number', 'item', 'item_code', 'code', 'sku'),
+    'item_description': ('item_description', 'description', 'desc', 'name'),
+    'ean_number': ('ean_number', 'ean', 'gtin', 'barcode'),
+    'customer_item_number': ('customer_item_number', 'customer_item', 'customer_code'),
+}
+# Shortest code completed from a prefix (shorter prefixes are too likely to be a different item)
+MIN_PREFIX = 10
+# Shortest description matched against the catalog, and edits allowed per character of it
+MIN_DESCRIPTION = 8
+DESCRIPTION_EDIT_RATE = 0.2
+# Share of the OCR'd description's words an item must contain to be a candidate
+MIN_WORD_SHARE = 0.5
+
+
+def normalize_code(code):
+    """Catalog key for an item code: upper-case letters and digits only."""
+    return re.sub(r'[^A-Z0-9]', '', str(code or '').upper())
+
+
+def normalize_description(text):
+    """Catalog key for a description: upper-case words separated by single spaces."""
+    return ' '.join(re.sub(r'[^A-Z0-9%.]', ' ', str(text or '').upper()).split())
+
+
+def levenshtein(a, b):
+    """Edit distance between a and b (Myers / Hyyro bit-parallel: one pass over a, bit vectors over b)."""
+    if len(a) < len(b):
+        a, b = b, a
+    m = len(b)
+    if not m:
+        return len(a)
+    peq = {}
+    for i, ch in enumerate(b):
+        peq[ch] = peq.get(ch, 0) | (1 << i)
+    mask = (1 << m) - 1
+    last = 1 << (m - 1)
+    pv, mv, score = mask, 0, m
+    for ch in a:
+        eq = peq.get(ch, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | ~(xh | pv)
+        mh = pv & xh
+        if ph & last:
+            score += 1
+        elif mh & last:
+            score -= 1
+        ph = (ph << 1) | 1
+        mh <<= 1
+        pv = (mh | ~(xv | ph)) & mask
+        mv = ph & xv & mask
+    return score
+
+
+class _TrieNode:
+    __slots__ = ('children', 'entry', 'count')
+
+    def __init__(self):
+        self.children = {}
+        self.entry = None
+        self.count = 0  # Entries at or below this node
+
+
+class _BKNode:
+    __slots__ = ('key', 'children')
+
+    def __init__(self, key):
+        self.key = key
+        self.children = {}  # distance -> _BKNode
+
+
+class _BKTree:
+    def __init__(self):
+        self._root = None
+
+    def add(self, key):
+        if self._root is None:
+            self._root = _BKNode(key)
+            return
+        node = self._root
+        while True:
+            d = levenshtein(key, node.key)
+            if d == 0:
+                return
+            child = node.children.get(d)
+            if child is None:
+                node.children[d] = _BKNode(key)
+                return
+            node = child
+
+    def nearest(self, key, limit):
+        """Keys at the smallest edit distance <= limit from key: (distance, [keys]) or (None, [])."""
+        best, found = limit + 1, []
+        stack = [self._root] if self._root is not None else []
+        while stack:
+            node = stack.pop()
+            d = levenshtein(key, node.key)
+            if d < best:
+                best, found = d, [node.key]
+            elif d == best:
+                found.append(node.key)
+            bound = min(best, limit)
+            stack.extend(child for dist, child in node.children.items() if d - bound <= dist <= d + bound)
+        return (best, found) if best <= limit else (None, [])
+
+
+class ItemCatalog:
+    def __init__(self, items=(), max_distance=None):
+        """
+        Args:
+            items: Iterable of dicts with item_number and any of item_description, ean_number,
+                customer_item_number
+            max_distance: Edits allowed for a fuzzy match (default: about one per 8 characters, 1-3)
+        """
+        self.max_distance = max_distance
+        self._entries = {}  # normalized code -> entry
+        self._by_ean = {}
+        self._descriptions = {}  # normalized code -> normalized description
+        self._by_word = {}  # description word -> set of normalized codes
+        self._trie = _TrieNode()
+        self._vocabulary = _BKTree()
+        self._lock = threading.Lock()
+        self.counters = {'exact': 0, 'prefix': 0, 'fuzzy': 0, 'ean': 0, 'description': 0, 'ambiguous': 0, 'unknown': 0}
+        for item in items:
+            self.add(item)
+
+    @classmethod
+    def load(cls, path, **options):
+        """Catalog from a .csv (header row, see _COLUMNS for accepted names) or .json (list of objects)."""
+        path = Path(path)
+        if path.suffix.lower() == '.json':
+            with open(path, 'r', encoding='utf-8') as f:
+                rows = json.load(f)
+        else:
+            with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+                rows = list(csv.DictReader(f))
+        items = []
+        for row in rows:
+            columns = {str(k).strip().lower().replace(' ', '_'): v for k, v in row.items() if k}
+            items.append({field: str(next((columns[c] for c in names if columns.get(c)), '') or '').strip()
+                          for field, names in _COLUMNS.items()})
+        return cls(items, **options)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add(self, item):
+        key = normalize_code(item.get('item_number'))
+        if not key:
+            return
+        entry = {field: str(item.get(field) or '').strip() for field in FIELDS}
+        if key not in self._entries:
+            node = self._trie
+            node.count += 1
+            for ch in key:
+                node = node.children.setdefault(ch, _TrieNode())
+                node.count += 1
+        self._entries[key] = entry
+        node = self._trie
+        for ch in key:
+            node = node.children[ch]
+        node.entry = entry
+        ean = re.sub(r'\D', '', entry['ean_number'])
+        if ean:
+            self._by_ean[ean.lstrip('0')] = entry  # GTIN-14 / EAN-13 of the same item share the digits
+        description = normalize_description(entry['item_description'])
+        if description:
+            self._descriptions[key] = description
+            for word in set(description.split()):
+                if word not in self._by_word:
+                    self._by_word[word] = set()
+                    self._vocabulary.add(word)
+                self._by_word[word].add(key)
+
+    def _limit(self, key):
+        if self.max_distance is not None:
+            return self.max_distance
+        return min(3, max(1, len(key) // 8))
+
+    def _prefix(self, key):
+        """Entry whose code is the only one starting with key (trie walk), or None."""
+        if len(key) < MIN_PREFIX:
+            return None
+        node = self._trie
+        for ch in key:
+            node = node.children.get(ch)
+            if node is None:
+                return None
+        if node.count != 1:
+            return None
+        while node.entry is None:
+            node = next(iter(node.children.values()))
+        return node.entry
+
+    def nearest(self, key, limit):
+        """
+        Catalog codes at the smallest edit distance <= limit from key: (distance, [entries]) or
+        (None, []). Walks the trie carrying the Levenshtein row of each prefix against key.
+        """
+        best, found = limit + 1, []
+        stack = [(self._trie, list(range(len(key) + 1)))]
+        while stack:
+            node, row = stack.pop()
+            if node.entry is not None and row[-1] <= best:
+                if row[-1] < best:
+                    best, found = row[-1], []
+                found.append(node.entry)
+            bound = min(best, limit)
+            for ch, child in node.children.items():
+                next_row = [row[0] + 1]
+                for j, kc in enumerate(key, 1):
+                    next_row.append(min(next_row[j - 1] + 1, row[j] + 1, row[j - 1] + (kc != ch)))
+                if min(next_row) <= bound:
+                    stack.append((child, next_row))
+        return (best, found) if best <= limit else (None, [])
+
+    def _count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def match(self, code):
+        """
+        Catalog entry for an OCR'd item code.
+
+        Returns:
+            (entry, method, distance) - method 'exact' | 'prefix' | 'fuzzy', or (None, reason, None)
+            with reason 'unknown' (nothing close) / 'ambiguous' (several equally close codes)
+        """
+        key = normalize_code(code)
+        if not key:
+            return None, 'unknown', None
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._count('exact')
+            return entry, 'exact', 0
+        entry = self._prefix(key)
+        if entry is not None:
+            self._count('prefix')
+            return entry, 'prefix', len(normalize_code(entry['item_number'])) - len(key)
+        distance, entries = self.nearest(key, self._limit(key))
+        if len(entries) == 1:
+            self._count('fuzzy')
+            return entries[0], 'fuzzy', distance
+        reason = 'ambiguous' if entries else 'unknown'
+        self._count(reason)
+        return None, reason, None
+
+    def _catalog_word(self, word):
+        """word if the catalog uses it, else the unique catalog word within 1 edit (2 from 8 characters), or None."""
+        if word in self._by_word:
+            return word
+        if len(word) < 4:
+            return None
+        _, words = self._vocabulary.nearest(word, 2 if len(word) >= 8 else 1)
+        return words[0] if len(words) == 1 else None
+
+    def match_description(self, text):
+        """Catalog entry whose description is uniquely closest to text (within DESCRIPTION_EDIT_RATE), or None."""
+        key = normalize_description(text)
+        if len(key) < MIN_DESCRIPTION:
+            return None
+        words = key.split()
+        hits = {}
+        for word in set(filter(None, map(self._catalog_word, words))):
+            for code in self._by_word[word]:
+                hits[code] = hits.get(code, 0) + 1
+        if not hits:
+            return None
+        top = max(hits.values())
+        if top < max(1, len(set(words)) * MIN_WORD_SHARE):
+            return None
+        limit = max(1, int(len(key) * DESCRIPTION_EDIT_RATE))
+        scored = sorted((levenshtein(key, self._descriptions[code]), code) for code, n in hits.items() if n == top)
+        if scored[0][0] > limit or (len(scored) > 1 and scored[1][0] == scored[0][0]):
+            return None
+        self._count('description')
+        return self._entries[scored[0][1]]
+
+    def by_ean(self, ean):
+        """Catalog entry with this EAN / GTIN, or None."""
+        digits = re.sub(r'\D', '', str(ean or ''))
+        entry = self._by_ean.get(digits.lstrip('0')) if digits else None
+        if entry is not None:
+            self._count('ean')
+        return entry
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counters, items=len(self._entries), max_distance=self.max_distance)
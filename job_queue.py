@@ -0,0 +1,122 @@
+"""
+Background Job Queue
+Bounded worker pool for OCR + parse jobs so /api/submit can return a job id immediately.
+Job state lives in memory (single gunicorn worker); clients poll /api/jobs/<id> or follow the SSE stream.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from collections import OrderedDict
+import threading
+import time
+import uuid
+
+
+class QueueFullError(Exception):
+    """Raised when the queue already holds max_pending unfinished jobs."""
+
+
+class JobQueue:
+    def __init__(self, max_workers=2, max_pending=20, keep_seconds=3600, name='ocr-job'):
+        """
+        Args:
+            max_workers: Worker threads running jobs concurrently
+            max_pending: Max queued + running jobs before submit() raises QueueFullError
+            keep_seconds: How long finished jobs stay available for polling
+            name: Worker thread name prefix
+        """
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.keep_seconds = keep_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._jobs = OrderedDict()
+        self._cond = threading.Condition()
+        self._version = 0
+
+    def submit(self, fn, *args, kind='ocr', **kwargs):
+        """Queue fn(*args, **kwargs). Returns the job id."""
+        with self._cond:
+            self._prune()
+            active = sum(1 for j in self._jobs.values() if j['status'] in ('queued', 'running'))
+            if active >= self.max_pending:
+                raise QueueFullError(f"{active} jobs already pending (max {self.max_pending})")
+            job_id = uuid.uuid4().hex[:16]
+            self._version += 1
+            self._jobs[job_id] = {
+                'id': job_id,
+                'kind': kind,
+                'status': 'queued',
+                'created': datetime.now().isoformat(),
+                'started': None,
+                'finished': None,
+                'result': None,
+                'error': None,
+                'version': self._version,
+                '_finished_at': None,
+            }
+            self._cond.notify_all()
+        self._executor.submit(self._run, job_id, fn, args, kwargs)
+        return job_id
+
+    def _run(self, job_id, fn, args, kwargs):
+        self._update(job_id, status='running', started=datetime.now().isoformat())
+        try:
+            result = fn(*args, **kwargs)
+            self._update(job_id, status='done', result=result, finished=datetime.now().isoformat(),
+                         _finished_at=time.monotonic())
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            self._update(job_id, status='error', error=str(e), finished=datetime.now().isoformat(),
+                         _finished_at=time.monotonic())
+
+    def _update(self, job_id, **fields):
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            self._version += 1
+            job.update(fields)
+            job['version'] = self._version
+            self._cond.notify_all()
+
+    def _prune(self):
+        """Drop finished jobs older than keep_seconds (caller holds the lock)."""
+        cutoff = time.monotonic() - self.keep_seconds
+        for job_id in [k for k, j in self._jobs.items() if j['_finished_at'] and j['_finished_at'] < cutoff]:
+            del self._jobs[job_id]
+
+    @staticmethod
+    def _public(job):
+        return {k: v for k, v in job.items() if not k.startswith('_')}
+
+    def get(self, job_id):
+        """Snapshot of a job, or None if unknown/expired."""
+        with self._cond:
+            job = self._jobs.get(job_id)
+            return self._public(job) if job else None
+
+    def wait_for_changes(self, since_version, timeout=15, job_ids=None):
+        """
+        Block until any job changes after since_version (or timeout).
+        Returns (current_version, [changed job snapshots]) - used by the SSE stream.
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: self._version > since_version, timeout=timeout)
+            changed = [self._public(j) for j in self._jobs.values()
+                       if j['version'] > since_version and (job_ids is None or j['id'] in job_ids)]
+            return self._version, changed
+
+    def recent(self, seconds=120):
+        """Unfinished jobs plus jobs finished in the last `seconds` - replayed when a stream connects."""
+        cutoff = time.monotonic() - seconds
+        with self._cond:
+            return self._version, [self._public(j) for j in self._jobs.values()
+                                   if not j['_finished_at'] or j['_finished_at'] >= cutoff]
+
+    def stats(self):
+        with self._cond:
+            counts = {}
+            for j in self._jobs.values():
+                counts[j['status']] = counts.get(j['status'], 0) + 1
+            return {'workers': self.max_workers, 'max_pending': self.max_pending, 'jobs': counts}
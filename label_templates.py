@@ -0,0 +1,192 @@
+"""
+Label Templates
+Registry of label layouts. Each template declares its fingerprints (phrases that identify the
+layout, e.g. the customer name and its distinctive headings) and its field_configs (headings +
+patterns per record field, same structure as DataParser.field_configs). One Aho-Corasick pass over
+the normalized OCR text finds every fingerprint of every template; the template with the most
+fingerprint hits (at least its min_hits) is used, else the default (Brix & Co / Recorp) layout.
+DataParser then runs only that template's extractors.
+
+Custom templates: JSON file (one template object or a list) or a directory of *.json files, e.g.
+    {"name": "acme", "fingerprints": ["ACME FOODS", "PALLET ID"], "min_hits": 2,
+     "fields": {"sscc": {"keywords": ["PALLET ID"], "patterns": ["PALLET ID[\\s:]*([0-9]{18})"]}}}
+Fields must be record fields (see DataParser.field_configs); fields a template leaves out stay empty.
+Each pattern's value is its group 1 - patterns are tried in order, like re.search (alternation included).
+"""
+
+from collections import deque
+from pathlib import Path
+import json
+import re
+import threading
+
+DEFAULT_TEMPLATE = 'brix_recorp'
+
+# Phrases on the Brix & Co / Recorp pallet label
+BUILTIN_FINGERPRINTS = ('BRIX', 'RECORP', 'ITEM NUMBER', 'ITEM DESCRIPTION', 'BATCH NO', 'CUSTOMER ITEM NUMBER', '6SCC')
+
+
+def _normalize(text):
+    """
+    Upper-case, the symbols DataParser.normalize_text drops removed, all whitespace (line breaks
+    too) collapsed to single spaces - fingerprints and the text classify() searches both get it.
+    """
+    return ' '.join(re.sub(r'[^\w\s:/\-\.,()]', ' ', str(text).upper()).split())
+
+
+class KeywordMatcher:
+    """Aho-Corasick automaton: which of a fixed set of keywords occur in a text, in one pass over it."""
+
+    def __init__(self, keywords):
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [set()]
+        for keyword in keywords:
+            state = 0
+            for ch in keyword:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(set())
+                state = nxt
+            self._out[state].add(keyword)
+        # Failure links, breadth first: longest proper suffix that is also a trie path
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0) if state else 0
+                self._out[nxt] |= self._out[self._fail[nxt]]
+
+    def find(self, text):
+        """Set of keywords found in text."""
+        found = set()
+        state = 0
+        goto, fail, out = self._goto, self._fail, self._out
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                found |= out[state]
+        return found
+
+
+class LabelTemplate:
+    def __init__(self, name, field_configs, fingerprints=(), min_hits=2, heuristics=False):
+        """
+        Args:
+            name: Template name (reported in parse results and stats)
+            field_configs: {record field: {'keywords': [...], 'patterns': [...]}}
+            fingerprints: Phrases identifying the layout (matched on the normalized OCR text)
+            min_hits: Distinct fingerprints needed to pick this template
+            heuristics: Also run DataParser's Brix & Co / Recorp line heuristics ("Heading: Value" lines,
+                unlabelled values) - for the built-in layout
+        """
+        self.name = name
+        self.field_configs = field_configs
+        self.fingerprints = tuple(_normalize(f) for f in fingerprints if _normalize(f))
+        self.min_hits = min_hits
+        self.heuristics = heuristics
+
+    @classmethod
+    def from_dict(cls, data):
+        fields = {field: {'keywords': list(config.get('keywords', [])), 'patterns': list(config.get('patterns', []))}
+                  for field, config in data.get('fields', {}).items()}
+        return cls(data['name'], fields, fingerprints=data.get('fingerprints', ()),
+                   min_hits=int(data.get('min_hits', 2)), heuristics=bool(data.get('heuristics', False)))
+
+
+class TemplateRegistry:
+    def __init__(self):
+        self._templates = {}  # name -> LabelTemplate, in registration order
+        self.default = None
+        self._matcher = None
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def __iter__(self):
+        return iter(list(self._templates.values()))
+
+    def __len__(self):
+        return len(self._templates)
+
+    def get(self, name):
+        """Template by name (default template for an unknown / empty name)."""
+        return self._templates.get(name) or self.default
+
+    def register(self, template, default=False, fields=None):
+        """
+        Add (or replace) a template. fields: allowed record fields - a template naming any other
+        field raises ValueError (records and the Sheets columns have a fixed set of fields).
+        """
+        unknown = sorted(set(template.field_configs) - set(fields)) if fields is not None else []
+        if unknown:
+            raise ValueError(f"Template {template.name}: unknown field(s) {', '.join(unknown)}")
+        with self._lock:
+            self._templates[template.name] = template
+            if default or self.default is None:
+                self.default = template
+            self._stats.setdefault(template.name, {'labels': 0, 'parse_ms': 0.0, 'fields': {}})
+            self._matcher = KeywordMatcher({f for t in self._templates.values() for f in t.fingerprints})
+
+    def load(self, path, fields=None):
+        """Register the templates in a JSON file or a directory of *.json files. Returns their names."""
+        path = Path(path)
+        files = sorted(path.glob('*.json')) if path.is_dir() else [path]
+        names = []
+        for f in files:
+            with open(f, 'r', encoding='utf-8') as fp:
+                data = json.load(fp)
+            for item in (data if isinstance(data, list) else [data]):
+                template = LabelTemplate.from_dict(item)
+                self.register(template, fields=fields)
+                names.append(template.name)
+        return names
+
+    def classify(self, normalized_text):
+        """
+        Template for a label's OCR text (raw or DataParser-normalized): most distinct fingerprint hits
+        (at least min_hits), ties to the earlier registered template; the default template when none
+        qualifies.
+        """
+        if len(self._templates) < 2:
+            return self.default
+        matcher = self._matcher
+        text = _normalize(normalized_text) if normalized_text else ''
+        found = matcher.find(text) if matcher is not None and text else set()
+        best, best_hits = self.default, 0
+        for template in self:
+            hits = sum(1 for f in template.fingerprints if f in found)
+            if hits >= template.min_hits and hits > best_hits:
+                best, best_hits = template, hits
+        return best
+
+    def record(self, name, parse_ms, parsed):
+        """Count one parsed label for the template (with its parse time and the fields it found)."""
+        with self._lock:
+            stats = self._stats.setdefault(name, {'labels': 0, 'parse_ms': 0.0, 'fields': {}})
+            stats['labels'] += 1
+            stats['parse_ms'] += parse_ms
+            for field, value in parsed.items():
+                if value:
+                    stats['fields'][field] = stats['fields'].get(field, 0) + 1
+
+    def stats(self):
+        with self._lock:
+            templates = {}
+            for name, stats in self._stats.items():
+                templates[name] = {
+                    'labels': stats['labels'],
+                    'parse_ms': round(stats['parse_ms'], 1),
+                    'avg_parse_ms': round(stats['parse_ms'] / stats['labels'], 3) if stats['labels'] else None,
+                    'field_hits': dict(stats['fields']),
+                }
+            return {'default': self.default.name if self.default else None, 'templates': templates}
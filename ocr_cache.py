@@ -0,0 +1,181 @@
+"""
+OCR Result Cache
+Content-addressed SQLite cache of OCR text keyed by SHA-256 of the JPEG bytes plus the provider /
+engine settings, so a re-shot or re-submitted identical image doesn't spend OCR quota again.
+Optional near-duplicate tier: a 64-bit difference hash (dHash) matches visually identical frames
+within a short window (re-shoots of the same label).
+"""
+
+from PIL import Image
+from pathlib import Path
+import hashlib
+import io
+import sqlite3
+import threading
+import time
+
+DB_FILENAME = 'ocr_cache.db'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS ocr_cache (
+    cache_key TEXT PRIMARY KEY,
+    sha256 TEXT NOT NULL,
+    settings TEXT NOT NULL,
+    dhash INTEGER,
+    text TEXT NOT NULL,
+    created REAL NOT NULL,
+    last_hit REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_ocr_cache_last_hit ON ocr_cache(last_hit);
+CREATE INDEX IF NOT EXISTS idx_ocr_cache_created ON ocr_cache(created);
+"""
+
+
+def dhash(image_bytes, hash_size=8):
+    """64-bit difference hash of an image (grayscale, (hash_size+1) x hash_size, adjacent-pixel gradients)."""
+    img = Image.open(io.BytesIO(image_bytes))
+    img.draft('L', (hash_size * 4, hash_size * 4))  # JPEG: decode at 1/8 scale - only a thumbnail is needed
+    pixels = img.convert('L').resize((hash_size + 1, hash_size), Image.Resampling.BILINEAR).tobytes()
+    value = 0
+    for row in range(hash_size):
+        for col in range(hash_size):
+            left = pixels[row * (hash_size + 1) + col]
+            right = pixels[row * (hash_size + 1) + col + 1]
+            value = (value << 1) | (1 if left > right else 0)
+    # SQLite INTEGER is signed 64-bit
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+def _distance(a, b):
+    return bin((a ^ b) & 0xFFFFFFFFFFFFFFFF).count('1')
+
+
+class OCRCache:
+    def __init__(self, db_dir, max_entries=5000, max_age_days=30, near_duplicates=False,
+                 near_max_distance=2, near_max_age_seconds=600):
+        """
+        Args:
+            db_dir: Directory for ocr_cache.db (use the persistent records dir)
+            max_entries: Evict least recently hit entries above this count
+            max_age_days: Evict entries older than this
+            near_duplicates: Also serve dHash near-duplicates. Different labels of the same layout can
+                             hash alike, so matches are limited to near_max_distance bits and to entries
+                             created in the last near_max_age_seconds (re-shoots)
+        """
+        self.db_path = Path(db_dir) / DB_FILENAME
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self.max_age_seconds = max_age_days * 86400
+        self.near_duplicates = near_duplicates
+        self.near_max_distance = near_max_distance
+        self.near_max_age_seconds = near_max_age_seconds
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._puts = 0
+        self.counters = {'hits': 0, 'near_hits': 0, 'misses': 0}
+        conn = self._conn()
+        conn.executescript(_SCHEMA)
+        conn.commit()
+        self.evict()
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_path), timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _key(sha256, settings):
+        return f"{sha256}:{settings}"
+
+    def _count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def get(self, image_bytes, settings):
+        """
+        Cached OCR text for these bytes + settings.
+        Returns (text, 'exact' | 'near') or (None, None) on a miss.
+        """
+        sha256 = hashlib.sha256(image_bytes).hexdigest()
+        conn = self._conn()
+        now = time.time()
+        row = conn.execute('SELECT cache_key, text FROM ocr_cache WHERE cache_key = ? AND created >= ?',
+                           (self._key(sha256, settings), now - self.max_age_seconds)).fetchone()
+        tier = 'exact' if row else None
+        if row is None and self.near_duplicates:
+            row = self._near(image_bytes, settings, now)
+            tier = 'near' if row else None
+        if row is None:
+            self._count('misses')
+            return None, None
+        with self._lock:
+            conn.execute('UPDATE ocr_cache SET hits = hits + 1, last_hit = ? WHERE cache_key = ?', (now, row['cache_key']))
+            conn.commit()
+        self._count('hits' if tier == 'exact' else 'near_hits')
+        return row['text'], tier
+
+    def _near(self, image_bytes, settings, now):
+        try:
+            target = dhash(image_bytes)
+        except Exception:
+            return None
+        rows = self._conn().execute(
+            'SELECT cache_key, text, dhash FROM ocr_cache WHERE settings = ? AND created >= ? AND dhash IS NOT NULL',
+            (settings, now - self.near_max_age_seconds)
+        ).fetchall()
+        best = None
+        for r in rows:
+            d = _distance(target, r['dhash'])
+            if d <= self.near_max_distance and (best is None or d < best[0]):
+                best = (d, r)
+        return best[1] if best else None
+
+    def put(self, image_bytes, settings, text):
+        sha256 = hashlib.sha256(image_bytes).hexdigest()
+        try:
+            image_hash = dhash(image_bytes) if self.near_duplicates else None
+        except Exception:
+            image_hash = None
+        now = time.time()
+        with self._lock:
+            conn = self._conn()
+            conn.execute(
+                'INSERT OR REPLACE INTO ocr_cache (cache_key, sha256, settings, dhash, text, created, last_hit, hits) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, 0)',
+                (self._key(sha256, settings), sha256, settings, image_hash, text, now, now)
+            )
+            conn.commit()
+            self._puts += 1
+            evict = self._puts % 100 == 0
+        if evict:
+            self.evict()
+
+    def evict(self):
+        """Drop expired entries, then least recently hit ones above max_entries. Returns rows removed."""
+        with self._lock:
+            conn = self._conn()
+            removed = conn.execute('DELETE FROM ocr_cache WHERE created < ?',
+                                   (time.time() - self.max_age_seconds,)).rowcount
+            excess = conn.execute('SELECT COUNT(*) FROM ocr_cache').fetchone()[0] - self.max_entries
+            if excess > 0:
+                removed += conn.execute(
+                    'DELETE FROM ocr_cache WHERE cache_key IN '
+                    '(SELECT cache_key FROM ocr_cache ORDER BY last_hit LIMIT ?)', (excess,)
+                ).rowcount
+            conn.commit()
+        return removed
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self.counters)
+        lookups = counters['hits'] + counters['near_hits'] + counters['misses']
+        counters['entries'] = self._conn().execute('SELECT COUNT(*) FROM ocr_cache').fetchone()[0]
+        counters['hit_rate'] = round((counters['hits'] + counters['near_hits']) / lookups, 3) if lookups else None
+        counters['near_duplicates'] = self.near_duplicates
+        return counters
@@ -1,25 +1,124 @@
 """
 OCR Processor with Online API Support
-Supports multiple OCR APIs (no local Tesseract required)
+Supports multiple OCR APIs (no local Tesseract required), plus local Tesseract either per call
+('local', pytesseract) or on a pool of warm engines ('local-pool', tesserocr)
 """
 
 import base64
 import requests
 import json
 from PIL import Image
+from pathlib import Path
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPSConnection
+from urllib3.connectionpool import HTTPSConnectionPool
 import io
+import threading
+import time
+
+# Per-thread accumulator for TCP+TLS connect time inside one request
+_connect_timing = threading.local()
+
+
+class _TimedHTTPSConnection(HTTPSConnection):
+    """HTTPS connection that records how long DNS + TCP + TLS setup took."""
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            _connect_timing.ms = getattr(_connect_timing, 'ms', 0.0) + (time.perf_counter() - started) * 1000
+            _connect_timing.count = getattr(_connect_timing, 'count', 0) + 1
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class _PooledAdapter(HTTPAdapter):
+    """Keep-alive adapter whose HTTPS pools use _TimedHTTPSConnection."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = dict(self.poolmanager.pool_classes_by_scheme,
+                                                       https=_TimedHTTPSConnectionPool)
+
+
+def _image_bytes(image):
+    """
+    (bytes-like, filename) for an OCR input: file path, bytes / bytearray / memoryview or PIL Image.
+    In-memory buffers are passed through without copying; only paths are read and Images encoded.
+    """
+    if isinstance(image, (bytes, bytearray)):
+        return image, 'image.jpg'
+    if isinstance(image, memoryview):
+        return (image.obj if isinstance(image.obj, bytes) and image.contiguous and len(image) == len(image.obj)
+                else image.tobytes()), 'image.jpg'
+    if isinstance(image, Image.Image):
+        buf = io.BytesIO()
+        image.convert('RGB').save(buf, 'JPEG', quality=90)
+        return buf.getvalue(), 'image.jpg'
+    path = Path(image)
+    with open(path, 'rb') as f:
+        return f.read(), path.name
+
+
+def _vision_words(annotation):
+    """Word boxes from a Google Vision fullTextAnnotation (pages > blocks > paragraphs > words)."""
+    words = []
+    for page in annotation.get('pages', []):
+        for block in page.get('blocks', []):
+            for paragraph in block.get('paragraphs', []):
+                for word in paragraph.get('words', []):
+                    vertices = word.get('boundingBox', {}).get('vertices', [])
+                    if not vertices:
+                        continue
+                    xs = [v.get('x', 0) for v in vertices]
+                    ys = [v.get('y', 0) for v in vertices]
+                    words.append({
+                        'text': ''.join(s.get('text', '') for s in word.get('symbols', [])),
+                        'left': min(xs), 'top': min(ys), 'width': max(xs) - min(xs), 'height': max(ys) - min(ys),
+                    })
+    return words
+
 
 class OCRProcessor:
-    def __init__(self, api_provider='ocrspace', api_key=None):
+    # Request settings that change OCR output - part of the cache key
+    OCRSPACE_ENGINE = 2
+    OCRSPACE_LANGUAGE = 'eng'
+
+    def __init__(self, api_provider='ocrspace', api_key=None, pool_size=8, cache=None, timeout=90, attempts=3,
+                 local_workers=None, overlay=False, quota=None):
         """
         Initialize OCR processor with online API
         
         Args:
             api_provider: 'ocrspace', 'tesseractspace', 'google', or 'local'
             api_key: API key for the service (optional for some free services)
+            pool_size: Keep-alive connections kept per provider (>= concurrent OCR calls)
+            cache: Optional OCRCache - identical image bytes are answered without calling the provider
+            timeout: Per-request timeout in seconds
+            attempts: OCR.space tries on read timeout (the OCR router uses 1 and hedges instead)
+            local_workers: 'local-pool' engine processes (default: CPU count)
+            overlay: Ask OCR.space for word boxes too (Google Vision always returns them) - see last_words()
+            quota: Optional QuotaScheduler - consulted before each provider request (not for cache hits)
         """
         self.api_provider = api_provider.lower()
         self.api_key = api_key
+        self.cache = cache
+        self.timeout = timeout
+        self.attempts = max(1, attempts)
+        self.pool_size = pool_size
+        self.local_workers = local_workers
+        self.overlay = overlay
+        self.quota = quota
+        if quota is not None:
+            quota.register(self.api_provider)
+        self._sessions = {}
+        self._sessions_lock = threading.Lock()
+        self._local = threading.local()
+        self._http_stats = {'requests': 0, 'new_connections': 0, 'connect_ms': 0.0}
         
         # OCR.space free API endpoint (no key required)
         self.ocrspace_url = "https://api.ocr.space/parse/image"
@@ -30,19 +129,141 @@ class OCRProcessor:
         # Google Cloud Vision API
         self.google_vision_url = "https://vision.googleapis.com/v1/images:annotate"
     
-    def process_image(self, image_path, preprocess=False):
+    def _provider_url(self, provider=None):
+        return {
+            'ocrspace': self.ocrspace_url,
+            'tesseractspace': self.tesseractspace_url,
+            'google': self.google_vision_url,
+        }.get(provider or self.api_provider)
+    
+    def _session(self, provider):
+        """Pooled keep-alive session for provider (one per provider, shared by all threads)."""
+        session = self._sessions.get(provider)
+        if session is None:
+            with self._sessions_lock:
+                session = self._sessions.get(provider)
+                if session is None:
+                    session = requests.Session()
+                    adapter = _PooledAdapter(pool_connections=2, pool_maxsize=self.pool_size, pool_block=False)
+                    session.mount('https://', adapter)
+                    session.mount('http://', HTTPAdapter(pool_connections=2, pool_maxsize=self.pool_size))
+                    self._sessions[provider] = session
+        return session
+    
+    def _post(self, provider, url, **kwargs):
+        """POST on the provider's pooled session, recording connect vs server time for this thread."""
+        _connect_timing.ms = 0.0
+        _connect_timing.count = 0
+        started = time.perf_counter()
+        response = self._session(provider).post(url, **kwargs)
+        total_ms = (time.perf_counter() - started) * 1000
+        connect_ms = _connect_timing.ms
+        timings = {
+            'provider': provider,
+            'connect_ms': round(connect_ms, 1),
+            'server_ms': round(response.elapsed.total_seconds() * 1000 - connect_ms, 1),  # upload + processing until headers
+            'total_ms': round(total_ms, 1),
+            'reused_connection': _connect_timing.count == 0,
+        }
+        self._local.timings = timings
+        with self._sessions_lock:
+            self._http_stats['requests'] += 1
+            self._http_stats['new_connections'] += _connect_timing.count
+            self._http_stats['connect_ms'] += connect_ms
+        return response
+    
+    def last_timings(self):
+        """HTTP timings of the calling thread's most recent OCR request (None if none / local OCR)."""
+        return getattr(self._local, 'timings', None)
+    
+    def last_words(self):
+        """
+        Word boxes from the calling thread's most recent OCR request, in the sent image's pixels:
+        [{'text', 'left', 'top', 'width', 'height'}]. None when the provider / a cache hit gave none.
+        """
+        return getattr(self._local, 'words', None)
+    
+    def warm_up(self, timeout=10):
+        """
+        Open (and keep alive) a connection to the provider so the first capture skips DNS/TCP/TLS.
+        Returns connect time in ms, or None for local OCR / on failure.
+        """
+        if self.api_provider == 'local-pool':
+            try:
+                self._local_pool().warm_up()  # load the engines now, not on the first capture
+            except Exception as e:
+                print(f"[OCR] Local Tesseract pool warm-up failed: {e}")
+            return None
+        url = self._provider_url()
+        if not url:
+            return None
+        _connect_timing.ms = 0.0
+        try:
+            self._session(self.api_provider).head(url, timeout=timeout)
+        except requests.exceptions.RequestException as e:
+            print(f"[OCR] Warm-up to {url} failed: {e}")
+            return None
+        return round(_connect_timing.ms, 1)
+    
+    def http_stats(self):
+        stats = dict(self._http_stats)
+        stats['connect_ms'] = round(stats['connect_ms'], 1)
+        stats['reused'] = stats['requests'] - min(stats['requests'], stats['new_connections'])
+        return stats
+    
+    def process_image(self, image_path, preprocess=False, priority='live'):
         """
         Process image using online OCR API
         
         Args:
-            image_path: Path to image file
+            image_path: Path to image file, or the image itself as bytes / memoryview / PIL Image
+                        (sent straight from memory - no temp file needed)
             preprocess: Ignored for API-based OCR (not needed)
+            priority: 'live' (capture) or 'background' (OCR fill / reparse) - for the quota scheduler
             
         Returns:
             Extracted text string
         """
+        self._local.timings = None
+        self._local.cache_tier = None
+        self._local.words = None
+        if self.cache is None:
+            self._acquire_quota(priority)
+            return self._process(image_path)
+        image_data = _image_bytes(image_path)[0]
+        settings = self.cache_settings()
+        text, tier = self.cache.get(image_data, settings)
+        if text is not None:
+            self._local.cache_tier = tier
+            return text
+        self._acquire_quota(priority)
+        text = self._process(image_data)
+        if text:
+            self.cache.put(image_data, settings, text)
+        return text
+    
+    def _acquire_quota(self, priority):
+        """Raises QuotaExceeded when the scheduler refuses this provider right now."""
+        if self.quota is not None:
+            self.quota.acquire(self.api_provider, priority)
+    
+    def cache_settings(self):
+        """Provider / engine settings that distinguish cached results."""
+        if self.api_provider == 'ocrspace':
+            return f"ocrspace|engine={self.OCRSPACE_ENGINE}|lang={self.OCRSPACE_LANGUAGE}|orient=1|scale=1"
+        if self.api_provider in ('local', 'local-pool'):
+            return "tesseract|lang=eng|psm=6"  # same engine settings either way
+        return self.api_provider
+    
+    def last_cache_hit(self):
+        """'exact' / 'near' if the calling thread's last process_image was served from the cache, else None."""
+        return getattr(self._local, 'cache_tier', None)
+    
+    def _process(self, image_path):
         if self.api_provider == 'local':
             return self._process_local(image_path)
+        elif self.api_provider == 'local-pool':
+            return self._process_local_pool(image_path)
         elif self.api_provider == 'ocrspace':
             return self._process_ocrspace(image_path)
         elif self.api_provider == 'tesseractspace':
@@ -58,43 +279,50 @@ class OCRProcessor:
         25,000 requests/month free
         """
         # OCR.space can be slow; use 90s timeout + retry on transient timeouts
-        timeout = 90
+        timeout = self.timeout
+        image_data, filename = _image_bytes(image_path)
 
-        for attempt in range(3):  # try up to 3 times
+        for attempt in range(self.attempts):  # try up to 3 times
             try:
-                with open(image_path, 'rb') as image_file:
-                    payload = {
-                        'apikey': self.api_key or 'helloworld',
-                        'language': 'eng',
-                        'isOverlayRequired': False,
-                        'detectOrientation': True,
-                        'OCREngine': 2,
-                        'scale': True,
-                    }
-                    files = {'image': image_file}
-
-                    response = requests.post(
-                        self.ocrspace_url,
-                        files=files,
-                        data=payload,
-                        timeout=timeout
-                    )
+                payload = {
+                    'apikey': self.api_key or 'helloworld',
+                    'language': self.OCRSPACE_LANGUAGE,
+                    'isOverlayRequired': self.overlay,
+                    'detectOrientation': True,
+                    'OCREngine': self.OCRSPACE_ENGINE,
+                    'scale': True,
+                }
+                files = {'image': (filename, image_data, 'image/jpeg')}
+
+                response = self._post(
+                    'ocrspace',
+                    self.ocrspace_url,
+                    files=files,
+                    data=payload,
+                    timeout=timeout
+                )
 
                 result = response.json()
 
                 if result.get('OCRExitCode') == 1:
                     text_parts = []
+                    words = []
                     for parsed_result in result.get('ParsedResults', []):
                         text_parts.append(parsed_result.get('ParsedText', ''))
+                        for line in (parsed_result.get('TextOverlay') or {}).get('Lines', []):
+                            words += [{'text': w.get('WordText', ''), 'left': w.get('Left', 0), 'top': w.get('Top', 0),
+                                       'width': w.get('Width', 0), 'height': w.get('Height', 0)}
+                                      for w in line.get('Words', [])]
+                    self._local.words = words or None
                     return '\n'.join(text_parts).strip()
                 else:
                     error_message = result.get('ErrorMessage', 'Unknown error')
                     raise Exception(f"OCR.space API error: {error_message}")
 
             except requests.exceptions.Timeout as e:
-                if attempt < 2:
+                if attempt < self.attempts - 1:
                     continue  # retry
-                raise Exception(f"OCR.space API request failed: Read timed out after {timeout}s (tried 3 times)")
+                raise Exception(f"OCR.space API request failed: Read timed out after {timeout}s (tried {self.attempts} times)")
             except requests.exceptions.RequestException as e:
                 raise Exception(f"OCR.space API request failed: {str(e)}")
             except Exception as e:
@@ -111,22 +339,23 @@ class OCRProcessor:
             raise Exception("Tesseract.space requires an API key. Get one at: https://tesseract.space")
         
         try:
-            with open(image_path, 'rb') as image_file:
-                files = {'image': image_file}
-                headers = {'Authorization': f'Bearer {self.api_key}'}
-                
-                response = requests.post(
-                    self.tesseractspace_url,
-                    files=files,
-                    headers=headers,
-                    timeout=90
-                )
-                
-                if response.status_code == 200:
-                    result = response.json()
-                    return result.get('text', '').strip()
-                else:
-                    raise Exception(f"Tesseract.space API error: {response.status_code} - {response.text}")
+            image_data, filename = _image_bytes(image_path)
+            files = {'image': (filename, image_data, 'image/jpeg')}
+            headers = {'Authorization': f'Bearer {self.api_key}'}
+            
+            response = self._post(
+                'tesseractspace',
+                self.tesseractspace_url,
+                files=files,
+                headers=headers,
+                timeout=self.timeout
+            )
+            
+            if response.status_code == 200:
+                result = response.json()
+                return result.get('text', '').strip()
+            else:
+                raise Exception(f"Tesseract.space API error: {response.status_code} - {response.text}")
                     
         except requests.exceptions.RequestException as e:
             raise Exception(f"Tesseract.space API request failed: {str(e)}")
@@ -140,9 +369,8 @@ class OCRProcessor:
             raise Exception("Google Vision API requires an API key. Get one from Google Cloud Console")
         
         try:
-            # Read and encode image
-            with open(image_path, 'rb') as image_file:
-                image_content = base64.b64encode(image_file.read()).decode('utf-8')
+            # Encode image (straight from the in-memory buffer when given one)
+            image_content = base64.b64encode(_image_bytes(image_path)[0]).decode('utf-8')
             
             # Prepare request
             request_data = {
@@ -159,17 +387,20 @@ class OCRProcessor:
             
             # Make API call
             url = f"{self.google_vision_url}?key={self.api_key}"
-            response = requests.post(
+            response = self._post(
+                'google',
                 url,
                 json=request_data,
-                timeout=90
+                timeout=self.timeout
             )
             
             if response.status_code == 200:
                 result = response.json()
                 if 'responses' in result and len(result['responses']) > 0:
                     if 'fullTextAnnotation' in result['responses'][0]:
-                        return result['responses'][0]['fullTextAnnotation'].get('text', '').strip()
+                        annotation = result['responses'][0]['fullTextAnnotation']
+                        self._local.words = _vision_words(annotation) or None
+                        return annotation.get('text', '').strip()
                     elif 'textAnnotations' in result['responses'][0]:
                         # Fallback to textAnnotations
                         annotations = result['responses'][0]['textAnnotations']
@@ -198,7 +429,12 @@ class OCRProcessor:
             except:
                 pass
             
-            img = Image.open(image_path)
+            if isinstance(image_path, Image.Image):
+                img = image_path
+            elif isinstance(image_path, (bytes, bytearray, memoryview)):
+                img = Image.open(io.BytesIO(image_path))
+            else:
+                img = Image.open(image_path)
             text = pytesseract.image_to_string(img, config='--oem 3 --psm 6')
             return text.strip()
             
@@ -207,6 +443,22 @@ class OCRProcessor:
         except Exception as e:
             raise Exception(f"Local Tesseract OCR failed: {str(e)}")
     
+    def _local_pool(self):
+        from tesseract_pool import get_tesseract_pool
+        return get_tesseract_pool(workers=self.local_workers, lang='eng', psm=6)
+    
+    def _process_local_pool(self, image_path):
+        """
+        Local Tesseract on warm tesserocr engines (no per-image process start / model load)
+        """
+        try:
+            image_data, _ = _image_bytes(image_path)
+            return self._local_pool().recognize(image_data, timeout=self.timeout)
+        except ImportError as e:
+            raise Exception(str(e))
+        except Exception as e:
+            raise Exception(f"Local Tesseract pool OCR failed: {str(e)}")
+    
     def get_confidence_data(self, image_path):
         """
         Get OCR data with confidence scores (if API supports it)
@@ -0,0 +1,235 @@
+"""
+OCR Quota Scheduler
+Per-provider request budgets in front of the OCR APIs:
+- Persistent ledger (SQLite, per provider per day) so monthly usage survives restarts
+- Token bucket per provider for the per-minute rate limit; background work (outbox OCR fill,
+  reparse) may only use tokens above a reserve kept for live captures
+- Soft limits: background work stops at background_fraction of the monthly budget (or when
+  usage is projected to run out before month end), live captures stop at live_fraction while
+  another provider still has budget - the router then sends the call to that provider
+- Exhaustion forecast from the last 7 days' usage
+Providers without configured limits (local Tesseract) are never refused.
+"""
+
+from datetime import date, datetime, timedelta
+from pathlib import Path
+import calendar
+import sqlite3
+import threading
+import time
+
+DB_FILENAME = 'ocr_quota.db'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS ocr_usage (
+    provider TEXT NOT NULL,
+    day TEXT NOT NULL,
+    requests INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (provider, day)
+);
+"""
+
+LIVE = 'live'
+BACKGROUND = 'background'
+
+
+class QuotaExceeded(Exception):
+    """Provider refused by the quota scheduler (the message reads as a quota error, so the outbox pauses the kind)."""
+
+
+class QuotaLedger:
+    def __init__(self, db_dir):
+        self.db_path = Path(db_dir) / DB_FILENAME
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        conn = self._conn()
+        conn.executescript(_SCHEMA)
+        conn.commit()
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_path), timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def record(self, provider, n=1, day=None):
+        with self._write_lock:
+            conn = self._conn()
+            conn.execute(
+                'INSERT INTO ocr_usage (provider, day, requests) VALUES (?, ?, ?) '
+                'ON CONFLICT(provider, day) DO UPDATE SET requests = requests + excluded.requests',
+                (provider, (day or date.today()).isoformat(), n)
+            )
+            conn.commit()
+
+    def used_between(self, provider, start, end):
+        """Requests from start to end inclusive (dates)."""
+        row = self._conn().execute(
+            'SELECT COALESCE(SUM(requests), 0) FROM ocr_usage WHERE provider = ? AND day >= ? AND day <= ?',
+            (provider, start.isoformat(), end.isoformat())
+        ).fetchone()
+        return row[0]
+
+    def month_used(self, provider, today=None):
+        today = today or date.today()
+        return self.used_between(provider, today.replace(day=1), today)
+
+
+class TokenBucket:
+    def __init__(self, per_minute, burst=None, reserve_fraction=0.5):
+        """
+        Args:
+            per_minute: Refill rate
+            burst: Bucket size (default: per_minute / 6, at least 2 - ten seconds' worth)
+            reserve_fraction: Share of the bucket only live requests may take (at least one token is
+                always left to background requests, or a small bucket would refuse them for good)
+        """
+        self.rate = per_minute / 60.0
+        self.capacity = float(burst or max(2, per_minute // 6))
+        self.reserve = min(self.capacity * reserve_fraction, self.capacity - 1)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._cond = threading.Condition()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, priority=LIVE, timeout=0):
+        """Take one token, waiting up to timeout seconds. Background requests leave the reserve alone."""
+        floor = 0.0 if priority == LIVE else self.reserve
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                self._refill()
+                if self._tokens - 1 >= floor - 1e-9:
+                    self._tokens -= 1
+                    return True
+                wait = min(deadline - time.monotonic(), (floor + 1 - self._tokens) / self.rate)
+                if wait <= 0:
+                    return False
+                self._cond.wait(wait)
+
+    @property
+    def tokens(self):
+        with self._cond:
+            self._refill()
+            return self._tokens
+
+
+class QuotaScheduler:
+    def __init__(self, db_dir, limits, live_fraction=0.95, background_fraction=0.8, live_wait=10, background_wait=0):
+        """
+        Args:
+            db_dir: Directory for ocr_quota.db (use the persistent records dir)
+            limits: {provider: {'monthly': N or None, 'per_minute': N or None}}
+            live_fraction: Live captures move to another provider beyond this share of the monthly budget
+            background_fraction: Background OCR stops beyond this share (or when projected to run out)
+            live_wait / background_wait: Seconds to wait for a rate-limit token before refusing
+        """
+        self.ledger = QuotaLedger(db_dir)
+        self.limits = {p.lower(): dict(l) for p, l in limits.items()}
+        self.live_fraction = live_fraction
+        self.background_fraction = background_fraction
+        self.live_wait = live_wait
+        self.background_wait = background_wait
+        self.providers = set()  # Registered with the router - the only possible alternatives
+        self._buckets = {p: TokenBucket(l['per_minute']) for p, l in self.limits.items() if l.get('per_minute')}
+        self._lock = threading.Lock()
+        self._month_used = {}  # provider -> (month, count) - avoids a ledger read per request
+        self.counters = {'granted': 0, 'refused_budget': 0, 'refused_rate': 0}
+
+    def register(self, provider):
+        """Known provider (alternatives are only considered among registered ones)."""
+        self.providers.add(provider.lower())
+
+    def _count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def month_used(self, provider):
+        month = date.today().strftime('%Y-%m')
+        with self._lock:
+            cached = self._month_used.get(provider)
+        if cached and cached[0] == month:
+            return cached[1]
+        used = self.ledger.month_used(provider)
+        with self._lock:
+            self._month_used[provider] = (month, used)
+        return used
+
+    def _over(self, provider, fraction):
+        monthly = self.limits.get(provider, {}).get('monthly')
+        return bool(monthly) and self.month_used(provider) >= monthly * fraction
+
+    def _has_alternative(self, provider):
+        return any(p != provider and not self._over(p, self.live_fraction) for p in self.providers)
+
+    def daily_average(self, provider, days=7):
+        today = date.today()
+        used = self.ledger.used_between(provider, today - timedelta(days=days - 1), today)
+        return used / float(days)
+
+    def predict_exhaustion(self, provider):
+        """Datetime the monthly budget runs out at the recent daily rate, or None (no limit / no usage / not this month)."""
+        monthly = self.limits.get(provider, {}).get('monthly')
+        avg = self.daily_average(provider)
+        if not monthly or avg <= 0:
+            return None
+        remaining = max(0, monthly - self.month_used(provider))
+        when = datetime.now() + timedelta(days=remaining / avg)
+        today = date.today()
+        month_end = datetime(today.year, today.month, calendar.monthrange(today.year, today.month)[1], 23, 59, 59)
+        return when if when <= month_end else None
+
+    def acquire(self, provider, priority=LIVE):
+        """
+        Permit one request to provider, waiting briefly for a rate token. Raises QuotaExceeded when
+        the provider should not be used now (the router then falls through to the next provider).
+        """
+        provider = provider.lower()
+        if provider not in self.limits:
+            return
+        if priority == LIVE:
+            if self._over(provider, 1.0) or (self._over(provider, self.live_fraction) and self._has_alternative(provider)):
+                self._count('refused_budget')
+                raise QuotaExceeded(f"OCR quota exceeded: {provider} monthly budget reserved/used up ({self.month_used(provider)} requests)")
+        elif self._over(provider, self.background_fraction) or self.predict_exhaustion(provider):
+            self._count('refused_budget')
+            raise QuotaExceeded(f"OCR quota exceeded: {provider} budget kept for live captures ({self.month_used(provider)} requests this month)")
+        bucket = self._buckets.get(provider)
+        if bucket and not bucket.acquire(priority, self.live_wait if priority == LIVE else self.background_wait):
+            self._count('refused_rate')
+            raise QuotaExceeded(f"OCR quota exceeded: {provider} rate limit ({self.limits[provider]['per_minute']}/min) reached")
+        self.ledger.record(provider)
+        with self._lock:
+            month = date.today().strftime('%Y-%m')
+            cached = self._month_used.get(provider)
+            self._month_used[provider] = (month, (cached[1] if cached and cached[0] == month else 0) + 1)
+            self.counters['granted'] += 1
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self.counters)
+        providers = {}
+        for provider in sorted(self.providers | set(self.limits)):
+            limit = self.limits.get(provider, {})
+            used = self.month_used(provider) if provider in self.limits else None
+            exhaustion = self.predict_exhaustion(provider) if provider in self.limits else None
+            providers[provider] = {
+                'monthly_limit': limit.get('monthly'),
+                'per_minute': limit.get('per_minute'),
+                'month_used': used,
+                'remaining': (limit['monthly'] - used) if limit.get('monthly') else None,
+                'daily_average_7d': round(self.daily_average(provider), 1) if provider in self.limits else None,
+                'predicted_exhaustion': exhaustion.isoformat(timespec='minutes') if exhaustion else None,
+                'rate_tokens': round(self._buckets[provider].tokens, 1) if provider in self._buckets else None,
+            }
+        counters['providers'] = providers
+        return counters
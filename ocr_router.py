@@ -0,0 +1,258 @@
+"""
+OCR Router
+Hedged multi-provider OCR. Tracks rolling p50/p95 latency and error rate per provider, sends a
+second (hedged) request to the next provider once the first runs past its p95, and opens a
+circuit breaker on providers that keep failing. Every call finishes within a fixed deadline.
+Drop-in for OCRProcessor in web_app (process_image / last_timings / last_cache_hit / last_words / warm_up).
+"""
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from ocr_quota import QuotaExceeded
+import threading
+import time
+
+
+class OCRDeadlineExceeded(Exception):
+    """No provider returned text within the router deadline."""
+
+
+class ProviderStats:
+    def __init__(self, window=50):
+        self._samples = deque(maxlen=window)  # (latency seconds, ok)
+        self._lock = threading.Lock()
+
+    def record(self, latency, ok):
+        with self._lock:
+            self._samples.append((latency, ok))
+
+    def percentile(self, pct):
+        """Latency percentile of successful calls, or None without history."""
+        with self._lock:
+            latencies = sorted(l for l, ok in self._samples if ok)
+        if not latencies:
+            return None
+        return latencies[min(len(latencies) - 1, int(round(pct / 100.0 * (len(latencies) - 1))))]
+
+    def error_rate(self):
+        with self._lock:
+            if not self._samples:
+                return None
+            return sum(1 for _, ok in self._samples if not ok) / float(len(self._samples))
+
+    def snapshot(self):
+        p50, p95, err = self.percentile(50), self.percentile(95), self.error_rate()
+        return {
+            'samples': len(self._samples),
+            'p50_ms': round(p50 * 1000) if p50 is not None else None,
+            'p95_ms': round(p95 * 1000) if p95 is not None else None,
+            'error_rate': round(err, 3) if err is not None else None,
+        }
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold=3, cooldown_seconds=60):
+        """
+        Args:
+            failure_threshold: Consecutive failures (errors / timeouts) that open the breaker
+            cooldown_seconds: Open time before one half-open probe is let through
+        """
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+
+    def _state(self):
+        if self._opened_at is None:
+            return 'closed'
+        if time.monotonic() - self._opened_at >= self.cooldown_seconds:
+            return 'half-open'
+        return 'open'
+
+    def allow(self):
+        """True if a request may go to this provider (one probe at a time when half-open)."""
+        with self._lock:
+            state = self._state()
+            if state == 'closed':
+                return True
+            if state == 'half-open' and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def failure(self):
+        with self._lock:
+            self._failures += 1
+            self._probing = False
+            if self._failures >= self.failure_threshold or self._opened_at is not None:
+                self._opened_at = time.monotonic()
+
+
+class OCRRouter:
+    def __init__(self, processors, deadline_seconds=60, hedge_after_seconds=15, hedge_min_seconds=3,
+                 failure_threshold=3, cooldown_seconds=60, max_workers=8):
+        """
+        Args:
+            processors: OCRProcessor instances in preference order (first = primary)
+            deadline_seconds: Hard limit for one process_image call
+            hedge_after_seconds: Hedge delay before a provider has latency history
+            hedge_min_seconds: Never hedge earlier than this (avoids doubling quota on normal calls)
+            failure_threshold / cooldown_seconds: Circuit breaker settings per provider
+            max_workers: Threads running provider calls (hedged losers finish in the background)
+        """
+        if not processors:
+            raise ValueError("OCRRouter needs at least one processor")
+        self.processors = list(processors)
+        self.deadline_seconds = deadline_seconds
+        self.hedge_after_seconds = hedge_after_seconds
+        self.hedge_min_seconds = hedge_min_seconds
+        self.stats = {p.api_provider: ProviderStats() for p in self.processors}
+        self.breakers = {p.api_provider: CircuitBreaker(failure_threshold, cooldown_seconds) for p in self.processors}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='ocr-route')
+        self._local = threading.local()
+        self.counters = {'calls': 0, 'hedged': 0, 'fallbacks': 0, 'deadline_exceeded': 0, 'quota_skips': 0}
+        self._counter_lock = threading.Lock()
+
+    # OCRProcessor-compatible surface used by web_app
+    @property
+    def api_provider(self):
+        return self.processors[0].api_provider
+
+    @property
+    def cache(self):
+        return getattr(self.processors[0], 'cache', None)
+
+    def last_timings(self):
+        return getattr(self._local, 'timings', None)
+
+    def last_cache_hit(self):
+        return getattr(self._local, 'cache_tier', None)
+
+    def last_words(self):
+        return getattr(self._local, 'words', None)
+
+    def warm_up(self, timeout=10):
+        return self.processors[0].warm_up(timeout)
+
+    def http_stats(self):
+        return {p.api_provider: p.http_stats() for p in self.processors if hasattr(p, 'http_stats')}
+
+    def _count(self, name):
+        with self._counter_lock:
+            self.counters[name] += 1
+
+    def _hedge_delay(self, provider):
+        p95 = self.stats[provider].percentile(95)
+        return max(self.hedge_min_seconds, p95 if p95 is not None else self.hedge_after_seconds)
+
+    def _call(self, processor, image, priority):
+        """Runs on the router pool; returns (text, http timings, cache tier, word boxes)."""
+        provider = processor.api_provider
+        started = time.monotonic()
+        try:
+            text = processor.process_image(image, priority=priority)
+        except QuotaExceeded:
+            self._count('quota_skips')  # Not a provider fault - no latency sample, breaker untouched
+            raise
+        except Exception:
+            self.stats[provider].record(time.monotonic() - started, False)
+            self.breakers[provider].failure()
+            raise
+        self.stats[provider].record(time.monotonic() - started, True)
+        self.breakers[provider].success()
+        timings = processor.last_timings() if hasattr(processor, 'last_timings') else None
+        tier = processor.last_cache_hit() if hasattr(processor, 'last_cache_hit') else None
+        words = processor.last_words() if hasattr(processor, 'last_words') else None
+        return text, timings, tier, words
+
+    def process_image(self, image_path, preprocess=False, priority='live'):
+        """
+        OCR with hedging and fallback. Raises OCRDeadlineExceeded after deadline_seconds, or the last
+        provider error if every provider failed. priority ('live' / 'background') goes to the quota scheduler.
+        """
+        self._local.timings = None
+        self._local.cache_tier = None
+        self._local.words = None
+        self._count('calls')
+        deadline = time.monotonic() + self.deadline_seconds
+        if isinstance(image_path, memoryview):
+            image_path = image_path.tobytes()  # shared across threads - keep an owned copy
+        candidates = list(self.processors)
+        pending = {}
+        launched = []
+        last_error = None
+
+        def _launch():
+            """Start the next provider whose breaker allows it. Returns it, or None if none left."""
+            while candidates:
+                processor = candidates.pop(0)
+                # Breakers are consulted only at launch so an unused half-open probe isn't held
+                if self.breakers[processor.api_provider].allow():
+                    if pending:
+                        self._count('hedged')  # another provider still running
+                    launched.append(processor)
+                    pending[self._executor.submit(self._call, processor, image_path, priority)] = processor
+                    return processor
+            return None
+
+        current = _launch()
+        if current is None:
+            # Every breaker is open - try the primary anyway rather than failing without a request
+            current = self.processors[0]
+            launched.append(current)
+            pending[self._executor.submit(self._call, current, image_path, priority)] = current
+        hedge_at = time.monotonic() + self._hedge_delay(current.api_provider)
+        while pending or candidates:
+            now = time.monotonic()
+            if now >= deadline:
+                break
+            wait_until = min(deadline, hedge_at) if candidates else deadline
+            done, _ = wait(list(pending), timeout=max(0.0, wait_until - now), return_when=FIRST_COMPLETED)
+            for future in done:
+                processor = pending.pop(future)
+                try:
+                    text, timings, tier, words = future.result()
+                except Exception as e:
+                    last_error = e
+                    print(f"[OCR] {processor.api_provider} failed: {e}")
+                    continue
+                if processor is not self.processors[0]:
+                    self._count('fallbacks')
+                self._local.timings = dict(timings or {}, provider=processor.api_provider,
+                                           hedged=len(launched) > 1)
+                self._local.cache_tier = tier
+                self._local.words = words
+                return text
+            if candidates and (not pending or time.monotonic() >= hedge_at):
+                current = _launch()
+                if current is not None:
+                    hedge_at = time.monotonic() + self._hedge_delay(current.api_provider)
+            elif not pending:
+                break
+        if pending or last_error is None:
+            self._count('deadline_exceeded')
+            raise OCRDeadlineExceeded(f"OCR did not finish within {self.deadline_seconds}s"
+                                      + (f" (last error: {last_error})" if last_error else ''))
+        raise last_error
+
+    def router_stats(self):
+        with self._counter_lock:
+            counters = dict(self.counters)
+        counters['providers'] = {
+            name: dict(self.stats[name].snapshot(), breaker=self.breakers[name].state) for name in self.stats
+        }
+        counters['deadline_seconds'] = self.deadline_seconds
+        return counters
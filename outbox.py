@@ -0,0 +1,274 @@
+"""
+Write-Behind Outbox
+Durable SQLite queue for Google side effects (Drive uploads, Sheets appends).
+The request path only writes a task row; a background dispatcher drains it with retries,
+exponential backoff and a per-kind pause when Google reports rate limit / quota errors.
+Each kind drains on its own thread, so a slow kind (OCR fill) doesn't hold up uploads, and
+finished tasks are deleted after keep_done_days.
+"""
+
+from datetime import datetime, timedelta
+from pathlib import Path
+import json
+import random
+import sqlite3
+import threading
+import time
+
+DB_FILENAME = 'outbox.db'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    record_key TEXT NOT NULL DEFAULT '',
+    payload TEXT NOT NULL DEFAULT '{}',
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL DEFAULT 0,
+    depends_on INTEGER,
+    last_error TEXT,
+    created TEXT NOT NULL,
+    updated TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_outbox_ready ON outbox(status, kind, next_attempt_at);
+"""
+
+
+def is_quota_error(err):
+    """True for Google rate-limit / quota responses (HTTP 429, 403 rateLimitExceeded, etc.)."""
+    status = None
+    resp = getattr(err, 'resp', None)  # googleapiclient HttpError
+    if resp is not None:
+        status = getattr(resp, 'status', None)
+    response = getattr(err, 'response', None)  # gspread APIError
+    if status is None and response is not None:
+        status = getattr(response, 'status_code', None)
+    if str(status) == '429':
+        return True
+    msg = str(err).lower()
+    return any(s in msg for s in ('429', 'ratelimitexceeded', 'rate limit', 'quota exceeded', 'resource_exhausted'))
+
+
+class Outbox:
+    def __init__(self, db_dir, max_attempts=10, base_backoff=5, max_backoff=3600, keep_done_days=7):
+        """
+        Args:
+            db_dir: Directory for outbox.db (use the persistent records dir)
+            max_attempts: Attempts before a task is marked dead
+            base_backoff: First retry delay in seconds (doubles per attempt)
+            max_backoff: Retry delay cap in seconds
+            keep_done_days: Days finished ('done') tasks are kept before prune() deletes them
+                (dead tasks are kept for inspection)
+        """
+        self.db_path = Path(db_dir) / DB_FILENAME
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.keep_done_days = keep_done_days
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        conn = self._conn()
+        conn.executescript(_SCHEMA)
+        conn.commit()
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_path), timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def enqueue(self, kind, record_key='', payload=None, depends_on=None):
+        """Add a task. depends_on: task id that must finish (done or dead) first. Returns the task id."""
+        now = datetime.now().isoformat()
+        with self._lock:
+            conn = self._conn()
+            cur = conn.execute(
+                'INSERT INTO outbox (kind, record_key, payload, depends_on, created, updated) VALUES (?, ?, ?, ?, ?, ?)',
+                (kind, record_key, json.dumps(payload or {}), depends_on, now, now)
+            )
+            conn.commit()
+            return cur.lastrowid
+
+    def claim_ready(self, kind, limit=10):
+        """Pending tasks of kind that are due and whose dependency has finished."""
+        rows = self._conn().execute(
+            "SELECT o.* FROM outbox o LEFT JOIN outbox d ON d.id = o.depends_on "
+            "WHERE o.status = 'pending' AND o.kind = ? AND o.next_attempt_at <= ? "
+            "AND (o.depends_on IS NULL OR d.status IN ('done', 'dead') OR d.id IS NULL) "
+            "ORDER BY o.id LIMIT ?",
+            (kind, time.time(), limit)
+        ).fetchall()
+        tasks = []
+        for r in rows:
+            task = dict(r)
+            task['payload'] = json.loads(task['payload'] or '{}')
+            tasks.append(task)
+        return tasks
+
+    def mark_done(self, task_id):
+        with self._lock:
+            conn = self._conn()
+            conn.execute("UPDATE outbox SET status = 'done', last_error = NULL, updated = ? WHERE id = ?",
+                         (datetime.now().isoformat(), task_id))
+            conn.commit()
+
+    def mark_failed(self, task_id, error, retry_after=None):
+        """Record a failed attempt; schedule a retry with exponential backoff + jitter, or mark dead."""
+        with self._lock:
+            conn = self._conn()
+            row = conn.execute('SELECT attempts FROM outbox WHERE id = ?', (task_id,)).fetchone()
+            if not row:
+                return
+            attempts = row['attempts'] + 1
+            if attempts >= self.max_attempts:
+                status, next_at = 'dead', 0
+            else:
+                delay = retry_after if retry_after is not None else self.backoff(attempts)
+                status, next_at = 'pending', time.time() + delay
+            conn.execute(
+                'UPDATE outbox SET status = ?, attempts = ?, next_attempt_at = ?, last_error = ?, updated = ? WHERE id = ?',
+                (status, attempts, next_at, str(error)[:500], datetime.now().isoformat(), task_id)
+            )
+            conn.commit()
+
+    def prune(self, now=None):
+        """
+        Delete 'done' tasks last updated more than keep_done_days ago. Returns the number deleted.
+        Tasks depending on a deleted one still run (a missing dependency counts as finished).
+        """
+        cutoff = ((now or datetime.now()) - timedelta(days=self.keep_done_days)).isoformat()
+        with self._lock:
+            conn = self._conn()
+            cur = conn.execute("DELETE FROM outbox WHERE status = 'done' AND updated < ?", (cutoff,))
+            conn.commit()
+            return cur.rowcount
+
+    def backoff(self, attempts):
+        delay = min(self.max_backoff, self.base_backoff * (2 ** (attempts - 1)))
+        return delay * random.uniform(0.8, 1.2)
+
+    def stats(self):
+        rows = self._conn().execute('SELECT kind, status, COUNT(*) AS n FROM outbox GROUP BY kind, status').fetchall()
+        out = {}
+        for r in rows:
+            out.setdefault(r['kind'], {})[r['status']] = r['n']
+        return out
+
+
+class OutboxDispatcher:
+    def __init__(self, outbox, batch_handlers, poll_interval=5, quota_pause=60, batch_size=50, prune_interval=3600):
+        """
+        Background threads draining the outbox - one per kind.
+
+        Args:
+            outbox: Outbox instance
+            batch_handlers: {kind: fn(tasks) -> {task_id: error or None}} - all ready tasks of kind in one call
+            poll_interval: Seconds between scans when idle
+            quota_pause: Seconds to pause a kind after a quota / rate limit error (doubles while it persists)
+            batch_size: Max tasks claimed per kind per pass
+            prune_interval: Seconds between deletions of old finished tasks (Outbox.prune)
+        """
+        self.outbox = outbox
+        self.batch_handlers = dict(batch_handlers)
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.quota_pause = quota_pause
+        self.prune_interval = prune_interval
+        self._paused_until = {}
+        self._quota_strikes = {}
+        self._wake = {kind: threading.Event() for kind in self.batch_handlers}
+        self._stop = threading.Event()
+        self._threads = []
+        self._prune_lock = threading.Lock()
+        self._next_prune = 0
+        self.pruned = 0
+
+    def start(self):
+        if any(t.is_alive() for t in self._threads):
+            return
+        self._threads = [threading.Thread(target=self._loop, args=(kind, handler), name=f'outbox-{kind}', daemon=True)
+                         for kind, handler in self.batch_handlers.items()]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self.wake()
+
+    def wake(self):
+        """Process immediately (call after enqueue)."""
+        for event in self._wake.values():
+            event.set()
+
+    def _loop(self, kind, handler):
+        wake = self._wake[kind]
+        while not self._stop.is_set():
+            worked = False
+            if time.time() >= self._paused_until.get(kind, 0):
+                try:
+                    worked = self._drain_batch(kind, handler)
+                except Exception as e:
+                    print(f"[Outbox] Dispatcher error ({kind}): {e}")
+            self._maybe_prune()
+            if not worked:
+                wake.wait(self.poll_interval)
+                wake.clear()
+
+    def _maybe_prune(self):
+        """Delete old finished tasks at most every prune_interval (whichever kind's thread gets here first)."""
+        with self._prune_lock:
+            if time.time() < self._next_prune:
+                return
+            self._next_prune = time.time() + self.prune_interval
+        try:
+            self.pruned += self.outbox.prune()
+        except Exception as e:
+            print(f"[Outbox] Prune failed: {e}")
+
+    def _drain_batch(self, kind, handler):
+        tasks = self.outbox.claim_ready(kind, limit=self.batch_size)
+        if not tasks:
+            return False
+        try:
+            errors = handler(tasks)
+        except Exception as e:
+            errors = {t['id']: e for t in tasks}
+        quota_hit = False
+        for task in tasks:
+            err = errors.get(task['id'])
+            if err is None:
+                self.outbox.mark_done(task['id'])
+                self._quota_strikes[kind] = 0
+            elif quota_hit:
+                self.outbox.mark_failed(task['id'], err, retry_after=self._paused_until[kind] - time.time())
+            else:
+                quota_hit = self._fail(kind, task, err)
+        return True
+
+    def _fail(self, kind, task, e):
+        """Record a failure. Quota errors pause the whole kind; returns True when paused."""
+        if is_quota_error(e):
+            strikes = self._quota_strikes.get(kind, 0) + 1
+            self._quota_strikes[kind] = strikes
+            pause = min(self.outbox.max_backoff, self.quota_pause * (2 ** (strikes - 1)))
+            self._paused_until[kind] = time.time() + pause
+            self.outbox.mark_failed(task['id'], e, retry_after=pause)
+            print(f"[Outbox] {kind} quota/rate limit - pausing {int(pause)}s: {e}")
+            return True
+        self.outbox.mark_failed(task['id'], e)
+        print(f"[Outbox] {kind} task {task['id']} failed (attempt {task['attempts'] + 1}): {e}")
+        return False
+
+    def stats(self):
+        now = time.time()
+        return {
+            'tasks': self.outbox.stats(),
+            'paused': {k: int(t - now) for k, t in self._paused_until.items() if t > now},
+            'pruned': self.pruned,
+        }
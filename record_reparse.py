@@ -0,0 +1,184 @@
+"""
+Record Reparse
+Re-derives the parsed fields of stored records from their raw_ocr_text after a DataParser fix.
+Records stream from the local store in id order, chunks are parsed on a process pool, and only
+fields whose value changed are written back (one transaction per chunk, together with the
+checkpoint) - so an interrupted run resumes where it stopped.
+
+Written back: fields where the new parse has a value that differs from the stored one. Values the
+parser no longer finds are kept (they may come from field re-OCR or the OCR fill), and on GS1
+barcode captures the barcode-verified fields are never touched.
+
+    python record_reparse.py [records_dir] [--workers N] [--chunk-size N] [--dry-run] [--restart] [--catalog FILE]
+                             [--templates PATH]
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import json
+import multiprocessing
+import os
+import threading
+import time
+
+CHECKPOINT_KEY = 'reparse_checkpoint'
+
+# Fields barcode_reader.fields_from_gs1 can set - check-digit verified, OCR doesn't override them
+BARCODE_FIELDS = ('sscc', 'ean_number', 'batch_no', 'quantity', 'date')
+
+# Per worker process: the compiled parser
+_parser = None
+
+
+def _init_worker(catalog_path=None, templates_path=None):
+    global _parser
+    from data_parser import DataParser
+    catalog = None
+    if catalog_path:
+        from item_catalog import ItemCatalog
+        catalog = ItemCatalog.load(catalog_path)
+    _parser = DataParser(catalog=catalog)
+    if templates_path:
+        _parser.templates.load(templates_path, fields=_parser.field_configs)
+
+
+def _parse_chunk(chunk):
+    """[(id, key, raw_ocr_text)] -> [(id, key, parsed fields)]"""
+    return [(row_id, key, _parser.parse(text)['parsed']) for row_id, key, text in chunk]
+
+
+def changed_fields(record, parsed):
+    """Fields of parsed to write back to record (new non-empty value that differs from the stored one)."""
+    protected = BARCODE_FIELDS if 'GS1 barcode' in (record.get('notes') or '') else ()
+    return {field: value for field, value in parsed.items()
+            if value and field not in protected and str(record.get(field) or '') != value}
+
+
+class Reparser:
+    def __init__(self, store, workers=None, chunk_size=500, dry_run=False, catalog_path=None, templates_path=None):
+        """
+        Args:
+            store: RecordStore to read and update
+            workers: Parser processes (default: CPU count)
+            chunk_size: Records per chunk (one pool task and one write transaction)
+            dry_run: Count changes without writing records or the checkpoint
+            catalog_path: Item catalog file each worker's parser loads (see item_catalog)
+            templates_path: Label template JSON file / directory each worker's parser loads (see label_templates)
+        """
+        self.store = store
+        self.catalog_path = catalog_path
+        self.templates_path = templates_path
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.dry_run = dry_run
+        self._lock = threading.Lock()
+        self.progress = {}
+
+    def checkpoint(self):
+        """Last record id fully processed by an interrupted run (0 = start from the beginning)."""
+        value = self.store.get_meta(CHECKPOINT_KEY)
+        return json.loads(value)['after_id'] if value else 0
+
+    def _chunks(self, after_id, records):
+        chunk = []
+        for row_id, key, record in self.store.iter_records(after_id=after_id, chunk_size=self.chunk_size):
+            if record.get('raw_ocr_text'):
+                records[key] = record
+                chunk.append((row_id, key, record['raw_ocr_text']))
+            if len(chunk) >= self.chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def _update(self, **values):
+        with self._lock:
+            self.progress.update(values)
+            elapsed = self.progress['elapsed_s'] = round(time.perf_counter() - self._started, 1)
+            self.progress['records_per_sec'] = round(self.progress['scanned'] / elapsed, 1) if elapsed else None
+
+    def run(self, resume=True, on_progress=None):
+        """
+        Reparse every record after the checkpoint (all of them when resume is False).
+
+        Returns:
+            progress dict: scanned, changed (records), fields (written), by_field, records_per_sec, ...
+        """
+        after_id = self.checkpoint() if resume else 0
+        self._started = time.perf_counter()
+        with self._lock:
+            self.progress = {'running': True, 'started_after_id': after_id, 'scanned': 0, 'changed': 0,
+                             'fields': 0, 'by_field': {}, 'dry_run': self.dry_run}
+        records = {}  # key -> stored record, for chunks in flight
+        # spawn, not fork: the web app is multi-threaded and workers only need the parser (web_app skips
+        # its init when a worker re-imports it as __mp_main__)
+        with ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=_init_worker, initargs=(self.catalog_path, self.templates_path)) as pool:
+            chunks = self._chunks(after_id, records)
+            pending = []
+            while True:
+                # Bounded read-ahead: a few chunks per worker, results consumed in id order
+                while len(pending) < self.workers * 2:
+                    chunk = next(chunks, None)
+                    if chunk is None:
+                        break
+                    pending.append(pool.submit(_parse_chunk, chunk))
+                if not pending:
+                    break
+                results = pending.pop(0).result()
+                updates = {}
+                for _, key, parsed in results:
+                    fields = changed_fields(records.pop(key), parsed)
+                    if fields:
+                        updates[key] = fields
+                last_id = results[-1][0]
+                if not self.dry_run:
+                    self.store.update_many(updates, meta={CHECKPOINT_KEY: json.dumps({'after_id': last_id})})
+                with self._lock:
+                    by_field = self.progress['by_field']
+                    for fields in updates.values():
+                        for field in fields:
+                            by_field[field] = by_field.get(field, 0) + 1
+                    self.progress['changed'] += len(updates)
+                    self.progress['fields'] += sum(len(f) for f in updates.values())
+                    self.progress['scanned'] += len(results)
+                self._update(last_id=last_id)
+                if on_progress:
+                    on_progress(dict(self.progress))
+        if not self.dry_run:
+            self.store.set_meta(CHECKPOINT_KEY, '')  # Finished - the next run starts over
+        self._update(running=False)
+        return dict(self.progress)
+
+    def stats(self):
+        with self._lock:
+            return dict(self.progress, workers=self.workers, chunk_size=self.chunk_size)
+
+
+if __name__ == '__main__':
+    import argparse
+    from record_store import RecordStore
+
+    ap = argparse.ArgumentParser(description='Re-derive parsed fields of stored records from raw_ocr_text')
+    ap.add_argument('records_dir', nargs='?', default=os.getenv('LOCAL_RECORDS_DIR', 'local_records'))
+    ap.add_argument('--workers', type=int, default=None, help='Parser processes (default: CPU count)')
+    ap.add_argument('--chunk-size', type=int, default=500)
+    ap.add_argument('--dry-run', action='store_true', help='Report changes without writing them')
+    ap.add_argument('--restart', action='store_true', help='Ignore the checkpoint and start from the first record')
+    ap.add_argument('--catalog', default=os.getenv('ITEM_CATALOG') or None, help='Item catalog CSV/JSON (default: ITEM_CATALOG)')
+    ap.add_argument('--templates', default=os.getenv('LABEL_TEMPLATES') or None,
+                    help='Label template JSON file or directory (default: LABEL_TEMPLATES)')
+    args = ap.parse_args()
+
+    s = RecordStore(args.records_dir)
+    reparser = Reparser(s, workers=args.workers, chunk_size=args.chunk_size, dry_run=args.dry_run,
+                        catalog_path=args.catalog, templates_path=args.templates)
+    if not args.restart and reparser.checkpoint():
+        print(f"Resuming after record id {reparser.checkpoint()}")
+
+    def _print(p):
+        print(f"  {p['scanned']} records, {p['changed']} changed ({p['records_per_sec']}/s)", flush=True)
+
+    result = reparser.run(resume=not args.restart, on_progress=_print)
+    print(f"Reparsed {result['scanned']} records in {result['elapsed_s']}s ({result['records_per_sec']}/s): "
+          f"{result['changed']} records / {result['fields']} fields {'would change' if args.dry_run else 'updated'} "
+          f"{result['by_field']}")
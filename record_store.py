@@ -0,0 +1,299 @@
+"""
+Local Record Store
+SQLite (WAL mode) repository for captured records - replaces the record_*.json directory scan.
+Range, duplicate and pending lookups go through indexes instead of opening every file.
+"""
+
+from datetime import datetime
+from pathlib import Path
+import json
+import sqlite3
+import threading
+
+from report_generator import _parse_ts, _parse_label_datetime
+
+DB_FILENAME = 'records.db'
+
+# Fixed-width format so range comparisons on the TEXT columns sort chronologically
+_DT_FORMAT = '%Y-%m-%dT%H:%M:%S.%f'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    record_key TEXT NOT NULL UNIQUE,
+    timestamp TEXT NOT NULL DEFAULT '',
+    capture_dt TEXT,
+    label_dt TEXT,
+    sscc TEXT NOT NULL DEFAULT '',
+    batch_no TEXT NOT NULL DEFAULT '',
+    status TEXT NOT NULL DEFAULT '',
+    test_mode INTEGER NOT NULL DEFAULT 0,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_records_capture_dt ON records(capture_dt);
+CREATE INDEX IF NOT EXISTS idx_records_label_dt ON records(label_dt);
+CREATE INDEX IF NOT EXISTS idx_records_sscc ON records(sscc);
+CREATE INDEX IF NOT EXISTS idx_records_batch_no ON records(batch_no);
+CREATE INDEX IF NOT EXISTS idx_records_status_capture ON records(status, capture_dt);
+CREATE INDEX IF NOT EXISTS idx_records_test_mode ON records(test_mode);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def _fmt_dt(dt):
+    return dt.strftime(_DT_FORMAT) if dt else None
+
+
+def record_key_for(timestamp):
+    """Record key used for a capture - same stem as the legacy record_YYYYMMDD_HHMMSS.json files."""
+    return f"record_{timestamp.strftime('%Y%m%d_%H%M%S')}"
+
+
+class RecordStore:
+    def __init__(self, records_dir, db_name=DB_FILENAME):
+        """
+        Open (or create) the record database inside records_dir.
+
+        Args:
+            records_dir: Directory holding records.db (and any legacy record_*.json files)
+            db_name: Database filename
+        """
+        self.records_dir = Path(records_dir)
+        self.records_dir.mkdir(parents=True, exist_ok=True)
+        self.db_path = self.records_dir / db_name
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        conn = self._conn()
+        conn.executescript(_SCHEMA)
+        conn.commit()
+
+    def _conn(self):
+        """One connection per thread (sqlite3 connections are not shared across threads)."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_path), timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('PRAGMA busy_timeout=30000')
+            self._local.conn = conn
+        return conn
+
+    def _row_values(self, key, record):
+        return (
+            key,
+            str(record.get('timestamp') or ''),
+            _fmt_dt(_parse_ts(record.get('timestamp', ''))),
+            _fmt_dt(_parse_label_datetime(record)),
+            str(record.get('sscc') or '').strip(),
+            str(record.get('batch_no') or '').strip(),
+            str(record.get('status') or '').strip(),
+            1 if record.get('test_mode') else 0,
+            json.dumps(record),
+        )
+
+    def save(self, record, key=None):
+        """
+        Insert a new record. Returns the record key.
+        key defaults to record_<timestamp> (matches the legacy JSON filename stem). Keys have
+        one-second resolution, so a key already taken (two captures in the same second) gets a
+        _2, _3, ... suffix instead of overwriting the earlier record.
+        """
+        if key is None:
+            dt = _parse_ts(record.get('timestamp', '')) or datetime.now()
+            key = record_key_for(dt)
+        with self._write_lock:
+            conn = self._conn()
+            base, n = key, 1
+            while True:
+                try:
+                    conn.execute(
+                        'INSERT INTO records '
+                        '(record_key, timestamp, capture_dt, label_dt, sscc, batch_no, status, test_mode, data) '
+                        'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                        self._row_values(key, record)
+                    )
+                    break
+                except sqlite3.IntegrityError:
+                    n += 1
+                    key = f"{base}_{n}"
+            conn.commit()
+        return key
+
+    def update(self, key, fields):
+        """Merge fields into an existing record. Returns the updated record or None if not found."""
+        with self._write_lock:
+            conn = self._conn()
+            row = conn.execute('SELECT data FROM records WHERE record_key = ?', (key,)).fetchone()
+            if not row:
+                return None
+            record = json.loads(row['data'])
+            record.update(fields)
+            values = self._row_values(key, record)
+            conn.execute(
+                'UPDATE records SET timestamp = ?, capture_dt = ?, label_dt = ?, sscc = ?, batch_no = ?, '
+                'status = ?, test_mode = ?, data = ? WHERE record_key = ?',
+                values[1:] + (key,)
+            )
+            conn.commit()
+        return record
+
+    def update_many(self, updates, meta=None):
+        """
+        Merge {key: fields} into existing records in one transaction (missing keys are skipped),
+        optionally setting meta {key: value} in the same commit. Returns the number updated.
+        """
+        updated = 0
+        with self._write_lock:
+            conn = self._conn()
+            for key, fields in updates.items():
+                row = conn.execute('SELECT data FROM records WHERE record_key = ?', (key,)).fetchone()
+                if not row:
+                    continue
+                record = json.loads(row['data'])
+                record.update(fields)
+                values = self._row_values(key, record)
+                conn.execute(
+                    'UPDATE records SET timestamp = ?, capture_dt = ?, label_dt = ?, sscc = ?, batch_no = ?, '
+                    'status = ?, test_mode = ?, data = ? WHERE record_key = ?',
+                    values[1:] + (key,)
+                )
+                updated += 1
+            for meta_key, value in (meta or {}).items():
+                conn.execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', (meta_key, str(value)))
+            conn.commit()
+        return updated
+
+    def get(self, key):
+        """Get a single record by key, or None."""
+        row = self._conn().execute('SELECT data FROM records WHERE record_key = ?', (key,)).fetchone()
+        return json.loads(row['data']) if row else None
+
+    def count(self):
+        return self._conn().execute('SELECT COUNT(*) FROM records').fetchone()[0]
+
+    def sscc_exists(self, sscc):
+        """True if any local record has this SSCC (index lookup)."""
+        sscc_clean = str(sscc or '').strip()
+        if not sscc_clean:
+            return False
+        row = self._conn().execute('SELECT 1 FROM records WHERE sscc = ? LIMIT 1', (sscc_clean,)).fetchone()
+        return row is not None
+
+    def all_ssccs(self):
+        """All distinct non-empty SSCCs."""
+        rows = self._conn().execute("SELECT DISTINCT sscc FROM records WHERE sscc != ''").fetchall()
+        return [r[0] for r in rows]
+
+    def get_in_range(self, start_dt, end_dt, filter_by='capture', require_sscc=True):
+        """
+        Records with capture (or label) datetime in [start_dt, end_dt), oldest first.
+        Returns list of (record_key, record).
+        """
+        column = 'label_dt' if filter_by == 'label' else 'capture_dt'
+        sql = f'SELECT record_key, data FROM records WHERE {column} >= ? AND {column} < ?'
+        if require_sscc:
+            sql += " AND sscc != ''"
+        sql += f' ORDER BY {column}'
+        rows = self._conn().execute(sql, (_fmt_dt(start_dt), _fmt_dt(end_dt))).fetchall()
+        return [(r['record_key'], json.loads(r['data'])) for r in rows]
+
+    def get_pending(self, since_dt, statuses=('CAPTURED', 'PENDING')):
+        """Full-label records (have SSCC) with given statuses captured since since_dt, oldest key first."""
+        placeholders = ','.join('?' * len(statuses))
+        rows = self._conn().execute(
+            f"SELECT data FROM records WHERE status IN ({placeholders}) AND capture_dt >= ? "
+            f"AND sscc != '' ORDER BY record_key",
+            tuple(statuses) + (_fmt_dt(since_dt),)
+        ).fetchall()
+        return [json.loads(r['data']) for r in rows]
+
+    def iter_records(self, after_id=0, chunk_size=500):
+        """Stream (id, record_key, record) in id order, chunk_size rows per query."""
+        last_id = after_id
+        while True:
+            rows = self._conn().execute(
+                'SELECT id, record_key, data FROM records WHERE id > ? ORDER BY id LIMIT ?',
+                (last_id, chunk_size)
+            ).fetchall()
+            if not rows:
+                return
+            for r in rows:
+                yield r['id'], r['record_key'], json.loads(r['data'])
+            last_id = rows[-1]['id']
+
+    def get_meta(self, key, default=None):
+        row = self._conn().execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row['value'] if row else default
+
+    def set_meta(self, key, value):
+        with self._write_lock:
+            conn = self._conn()
+            conn.execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', (key, str(value)))
+            conn.commit()
+
+    def import_json_dir(self, json_dir=None):
+        """
+        One-shot import of legacy record_*.json files. Existing keys are left untouched.
+        Returns (imported, skipped).
+        """
+        json_dir = Path(json_dir) if json_dir else self.records_dir
+        imported = skipped = 0
+        if not json_dir.exists():
+            return 0, 0
+        with self._write_lock:
+            conn = self._conn()
+            for f in sorted(json_dir.glob('record_*.json')):
+                try:
+                    with open(f, 'r') as fp:
+                        rec = json.load(fp)
+                    cur = conn.execute(
+                        'INSERT OR IGNORE INTO records '
+                        '(record_key, timestamp, capture_dt, label_dt, sscc, batch_no, status, test_mode, data) '
+                        'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                        self._row_values(f.stem, rec)
+                    )
+                    if cur.rowcount:
+                        imported += 1
+                    else:
+                        skipped += 1
+                except Exception as e:
+                    print(f"[RecordStore] Skipped {f.name}: {e}")
+                    skipped += 1
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('json_migrated', ?)",
+                         (datetime.now().isoformat(),))
+            conn.commit()
+        return imported, skipped
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(records_dir):
+    """
+    Process-wide RecordStore for records_dir. Legacy JSON files are imported the first time
+    a directory is opened.
+    """
+    key = str(Path(records_dir).resolve())
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = RecordStore(records_dir)
+            if not store.get_meta('json_migrated'):
+                imported, skipped = store.import_json_dir()
+                if imported or skipped:
+                    print(f"[RecordStore] Migrated {imported} JSON records ({skipped} skipped) into {store.db_path}")
+            _stores[key] = store
+        return store
+
+
+if __name__ == '__main__':
+    import sys
+    target = sys.argv[1] if len(sys.argv) > 1 else 'local_records'
+    s = RecordStore(target)
+    n_imported, n_skipped = s.import_json_dir()
+    print(f"Imported {n_imported} records ({n_skipped} skipped). Total in {s.db_path}: {s.count()}")
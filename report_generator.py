@@ -8,7 +8,6 @@ from datetime import datetime, timedelta, time
 from pathlib import Path
 from zoneinfo import ZoneInfo
 import io
-import json
 
 NZ_TZ = ZoneInfo("Pacific/Auckland")
 
@@ -51,9 +50,9 @@ def _parse_label_datetime(rec):
             return None
         t_parts = time_str.replace(".", ":").split(":")
         h = int(t_parts[0]) if t_parts else 0
-        m = int(t_parts[1]) if len(t_parts) > 1 else 0
+        mi = int(t_parts[1]) if len(t_parts) > 1 else 0
         s = int(t_parts[2]) if len(t_parts) > 2 else 0
-        return datetime(y, m, d, h, m, s)
+        return datetime(y, m, d, h, mi, s)
     except (ValueError, TypeError):
         return None
 
@@ -112,39 +111,16 @@ def get_records_in_range(local_records_dir, images_dir, start_dt, end_dt, filter
     filter_by: "capture" = use timestamp (when photographed); "label" = use date/time on pallet label.
     Returns list of dicts with: record, image_path (local path or None)
     """
+    from record_store import get_store
+
     results = []
     if Path(local_records_dir).exists():
-        for f in Path(local_records_dir).glob("record_*.json"):
-            try:
-                with open(f, "r") as fp:
-                    rec = json.load(fp)
-                if filter_by == "label":
-                    dt = _parse_label_datetime(rec)
-                    if dt is None:
-                        continue
-                else:
-                    dt = _parse_ts(rec.get("timestamp", ""))
-                    if dt is None:
-                        continue
-                if dt < start_dt or dt >= end_dt:
-                    continue
-                # Only include full labels (have SSCC) - skip bad/incomplete captures
-                if not str(rec.get('sscc') or '').strip():
-                    continue
-                local_path = _resolve_image_path(rec, images_dir, record_filename=f.name)
-                results.append({"record": rec, "image_path": local_path})
-            except Exception:
-                pass
-
-    def _sort_key(r):
-        if filter_by == "label":
-            d = _parse_label_datetime(r["record"])
-            return d if d else datetime.min
-        t = r["record"].get("timestamp", "")
-        d = _parse_ts(t)
-        return d if d else datetime.min
+        # Indexed range query (already ordered by capture/label time); only full labels (have SSCC) - skip bad/incomplete captures
+        store = get_store(local_records_dir)
+        for key, rec in store.get_in_range(start_dt, end_dt, filter_by=filter_by):
+            local_path = _resolve_image_path(rec, images_dir, record_filename=key + ".json")
+            results.append({"record": rec, "image_path": local_path})
 
-    results.sort(key=_sort_key)
     return results
 
 
@@ -5,8 +5,12 @@ Handles reading/writing to Google Sheets
 
 import gspread
 from google.oauth2.service_account import Credentials
+from concurrent.futures import Future
 from datetime import datetime
 import json
+import re
+import threading
+import time
 
 # Column configuration (matches Code.gs)
 COLUMNS = [
@@ -30,6 +34,31 @@ COLUMNS = [
     "reviewed_timestamp"
 ]
 
+
+def _col_letter(col_num):
+    """1-based column number -> A1 column letter (1 -> A, 27 -> AA)."""
+    letters = ''
+    while col_num > 0:
+        col_num, rem = divmod(col_num - 1, 26)
+        letters = chr(65 + rem) + letters
+    return letters
+
+
+def _rows_from_append_response(response):
+    """
+    (first_row, last_row) from a values.append response, e.g. updatedRange 'APPROVED_RECORDS!A101:R103'.
+    Avoids re-reading the sheet just to learn where the rows landed. Returns (None, None) if unknown.
+    """
+    try:
+        updated = (response or {}).get('updates', {}).get('updatedRange', '')
+        cells = updated.split('!')[-1].split(':')
+        rows = [int(re.sub(r'[^0-9]', '', c)) for c in cells if re.search(r'\d', c)]
+        if not rows:
+            return None, None
+        return rows[0], rows[-1]
+    except (AttributeError, ValueError):
+        return None, None
+
 class SheetsIntegration:
     def __init__(self, sheet_id=None, credentials_file=None):
         """
@@ -42,6 +71,7 @@ class SheetsIntegration:
         self.sheet_id = sheet_id
         self.client = None
         self.spreadsheet = None
+        self._worksheets = {}  # title -> Worksheet (saves a metadata fetch per call)
         
         if credentials_file and sheet_id:
             self.connect(credentials_file)
@@ -72,12 +102,21 @@ class SheetsIntegration:
             # Open spreadsheet
             if self.sheet_id:
                 self.spreadsheet = self.client.open_by_key(self.sheet_id)
+            self._worksheets = {}
             
             return True
             
         except Exception as e:
             raise Exception(f"Failed to connect to Google Sheets: {str(e)}")
     
+    def _worksheet(self, sheet_name):
+        """Cached worksheet lookup. Raises gspread.exceptions.WorksheetNotFound."""
+        sheet = self._worksheets.get(sheet_name)
+        if sheet is None:
+            sheet = self.spreadsheet.worksheet(sheet_name)
+            self._worksheets[sheet_name] = sheet
+        return sheet
+
     def get_or_create_sheet(self, sheet_name):
         """Get existing sheet or create new one"""
         try:
@@ -85,7 +124,7 @@ class SheetsIntegration:
                 raise Exception("No spreadsheet connected")
             
             try:
-                sheet = self.spreadsheet.worksheet(sheet_name)
+                sheet = self._worksheet(sheet_name)
             except gspread.exceptions.WorksheetNotFound:
                 # Create new sheet
                 sheet = self.spreadsheet.add_worksheet(
@@ -99,6 +138,7 @@ class SheetsIntegration:
                 sheet.format('1:1', {'textFormat': {'bold': True}})
                 # Freeze header row
                 sheet.freeze(rows=1)
+                self._worksheets[sheet_name] = sheet
             
             return sheet
             
@@ -114,8 +154,8 @@ class SheetsIntegration:
                 return {'success': False, 'error': 'No spreadsheet connected'}
             sheet = self.get_or_create_sheet('PENDING_REVIEW')
             row_data = self._record_to_row(record)
-            sheet.append_row(row_data)
-            return {'success': True, 'row_num': len(sheet.get_all_values())}
+            response = sheet.append_row(row_data)
+            return {'success': True, 'row_num': _rows_from_append_response(response)[0]}
         except Exception as e:
             return {'success': False, 'error': str(e)}
 
@@ -130,8 +170,31 @@ class SheetsIntegration:
             record['status'] = 'CAPTURED'
             sheet = self.get_or_create_sheet('APPROVED_RECORDS')
             row_data = self._record_to_row(record)
-            sheet.append_row(row_data)
-            return {'success': True, 'row_num': len(sheet.get_all_values())}
+            response = sheet.append_row(row_data)
+            return {'success': True, 'row_num': _rows_from_append_response(response)[0]}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
+
+    def add_captured_records(self, records):
+        """
+        Append many records to APPROVED_RECORDS (status CAPTURED) in one append_rows call.
+        Returns {'success', 'row_nums'} - row_nums in the same order as records.
+        """
+        try:
+            if not self.spreadsheet:
+                return {'success': False, 'error': 'No spreadsheet connected'}
+            if not records:
+                return {'success': True, 'row_nums': []}
+            rows = []
+            for record in records:
+                record = dict(record)
+                record['status'] = 'CAPTURED'
+                rows.append(self._record_to_row(record))
+            sheet = self.get_or_create_sheet('APPROVED_RECORDS')
+            response = sheet.append_rows(rows)
+            first, _ = _rows_from_append_response(response)
+            row_nums = [first + i for i in range(len(rows))] if first else [None] * len(rows)
+            return {'success': True, 'row_nums': row_nums}
         except Exception as e:
             return {'success': False, 'error': str(e)}
 
@@ -147,7 +210,7 @@ class SheetsIntegration:
             sscc_clean = str(sscc).strip()
             for sheet_name in ['PENDING_REVIEW', 'APPROVED_RECORDS']:
                 try:
-                    sheet = self.spreadsheet.worksheet(sheet_name)
+                    sheet = self._worksheet(sheet_name)
                     col_idx = COLUMNS.index('sscc') + 1 if 'sscc' in COLUMNS else 0
                     if col_idx > 0:
                         col_values = sheet.col_values(col_idx)
@@ -160,6 +223,44 @@ class SheetsIntegration:
             print(f"Error checking SSCC: {e}")
             return False
     
+    def get_sscc_values(self, sheet_name, start_row=2):
+        """
+        Read the SSCC column of sheet_name from start_row down (ranged read, not the whole sheet).
+        Returns (non-empty SSCC values, next row to read).
+        """
+        if not self.spreadsheet:
+            return [], start_row
+        try:
+            sheet = self._worksheet(sheet_name)
+        except gspread.exceptions.WorksheetNotFound:
+            return [], start_row
+        col = _col_letter(COLUMNS.index('sscc') + 1)
+        rows = sheet.get(f"{col}{start_row}:{col}")
+        values = [str(r[0]).strip() for r in rows if r and str(r[0]).strip()]
+        return values, start_row + len(rows)
+
+    def get_ranges(self, ranges):
+        """
+        Read several A1 ranges ("'SHEET'!A2:R") in one values.batchGet call.
+        Returns a list of row lists in the same order; None for ranges on a worksheet that doesn't exist.
+        """
+        if not self.spreadsheet:
+            raise Exception("No spreadsheet connected")
+        present = []
+        for i, rng in enumerate(ranges):
+            sheet_name = rng.split('!')[0].strip("'")
+            try:
+                self._worksheet(sheet_name)
+                present.append(i)
+            except gspread.exceptions.WorksheetNotFound:
+                pass
+        out = [None] * len(ranges)
+        if present:
+            response = self.spreadsheet.values_batch_get([ranges[i] for i in present])
+            for i, value_range in zip(present, response.get('valueRanges', [])):
+                out[i] = value_range.get('values', [])
+        return out
+
     def get_pending_records(self):
         """Get all records for display: CAPTURED/APPROVED from APPROVED_RECORDS, PENDING from PENDING_REVIEW."""
         try:
@@ -169,7 +270,7 @@ class SheetsIntegration:
             def _records_from_sheet(sheet_name, status_filter=None):
                 out = []
                 try:
-                    sheet = self.spreadsheet.worksheet(sheet_name)
+                    sheet = self._worksheet(sheet_name)
                 except gspread.exceptions.WorksheetNotFound:
                     return []
                 all_values = sheet.get_all_values()
@@ -268,3 +369,50 @@ class SheetsIntegration:
             return {'success': False, 'error': str(e)}
 
 
+class SheetsBatchWriter:
+    def __init__(self, sheets, window_seconds=0.5, max_batch=50):
+        """
+        Coalesces captured records submitted within window_seconds into one append_rows call.
+
+        Args:
+            sheets: Connected SheetsIntegration
+            window_seconds: How long to wait for more rows after the first one arrives
+            max_batch: Flush early once this many rows are pending
+        """
+        self.sheets = sheets
+        self.window_seconds = window_seconds
+        self.max_batch = max_batch
+        self._pending = []  # (record, Future)
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._loop, name='sheets-batch-writer', daemon=True)
+        self._thread.start()
+
+    def submit(self, record):
+        """Queue a record. Returns a Future resolving to {'success', 'row_num'} (or 'error')."""
+        fut = Future()
+        with self._cond:
+            self._pending.append((record, fut))
+            self._cond.notify()
+        return fut
+
+    def add_captured_record(self, record, timeout=120):
+        """Blocking drop-in for SheetsIntegration.add_captured_record that shares the batch."""
+        return self.submit(record).result(timeout=timeout)
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending)
+                deadline = time.monotonic() + self.window_seconds
+                while len(self._pending) < self.max_batch:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+            result = self.sheets.add_captured_records([r for r, _ in batch])
+            for i, (_, fut) in enumerate(batch):
+                if result.get('success'):
+                    fut.set_result({'success': True, 'row_num': result['row_nums'][i]})
+                else:
+                    fut.set_result({'success': False, 'error': result.get('error', 'Sheets append failed')})
@@ -0,0 +1,278 @@
+"""
+Google Sheets Mirror
+Local SQLite copy of the PENDING_REVIEW / APPROVED_RECORDS worksheets.
+A watermark (next unread row per worksheet) means each sync fetches only appended rows in one
+ranged batch_get; a periodic checksum reconcile picks up edits and deletes made in the sheet.
+/api/pending and the report fallback read from here instead of get_all_values().
+"""
+
+from datetime import datetime
+from pathlib import Path
+import hashlib
+import json
+import sqlite3
+import threading
+
+DB_FILENAME = 'sheets_mirror.db'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sheet_rows (
+    sheet TEXT NOT NULL,
+    row_num INTEGER NOT NULL,
+    status TEXT NOT NULL DEFAULT '',
+    timestamp TEXT NOT NULL DEFAULT '',
+    row_hash TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (sheet, row_num)
+);
+CREATE INDEX IF NOT EXISTS idx_sheet_rows_status ON sheet_rows(sheet, status);
+CREATE TABLE IF NOT EXISTS sheet_state (
+    sheet TEXT PRIMARY KEY,
+    header TEXT NOT NULL DEFAULT '[]',
+    next_row INTEGER NOT NULL DEFAULT 2,
+    last_sync TEXT,
+    last_reconcile TEXT
+);
+"""
+
+# Widest range read per row (Sheets trims trailing empty cells)
+_LAST_COL = 'ZZ'
+
+
+def _row_hash(row):
+    return hashlib.sha1(json.dumps(row, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+def _trim(row):
+    row = [str(v) for v in row]
+    while row and row[-1] == '':
+        row.pop()
+    return row
+
+
+class SheetsMirror:
+    # Worksheets mirrored, with the statuses get_pending_records() shows from each
+    SHEETS = {
+        'APPROVED_RECORDS': ('CAPTURED', 'APPROVED'),
+        'PENDING_REVIEW': ('PENDING',),
+    }
+
+    def __init__(self, db_dir, sheets):
+        """
+        Args:
+            db_dir: Directory for sheets_mirror.db (use the persistent records dir)
+            sheets: Connected SheetsIntegration
+        """
+        self.sheets = sheets
+        self.db_path = Path(db_dir) / DB_FILENAME
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._sync_lock = threading.Lock()  # one sync/reconcile against Sheets at a time
+        self._timer = None
+        conn = self._conn()
+        conn.executescript(_SCHEMA)
+        conn.commit()
+        self.ready = self._has_state()
+        self.last_sync = None
+        self.last_reconcile = None
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_path), timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def _has_state(self):
+        return self._conn().execute('SELECT COUNT(*) FROM sheet_state').fetchone()[0] >= len(self.SHEETS)
+
+    def _state(self):
+        rows = self._conn().execute('SELECT * FROM sheet_state').fetchall()
+        return {r['sheet']: {'header': json.loads(r['header']), 'next_row': r['next_row']} for r in rows}
+
+    def _row_values(self, sheet_name, row_num, header, row):
+        rec = dict(zip(header, row + [''] * (len(header) - len(row))))
+        return (
+            sheet_name,
+            row_num,
+            str(rec.get('status', '')).strip().upper(),
+            str(rec.get('timestamp', '') or ''),
+            _row_hash(row),
+            json.dumps(rec),
+        )
+
+    def sync(self):
+        """
+        Incremental sync: fetch rows below each worksheet's watermark (plus the header row) in one
+        batch_get. A changed header triggers a full reconcile of that worksheet. Returns rows added.
+        """
+        if not self.ready:
+            return self.reconcile()
+        with self._sync_lock:
+            state = self._state()
+            ranges = []
+            for name in self.SHEETS:
+                start = state.get(name, {}).get('next_row', 2)
+                ranges += [f"'{name}'!1:1", f"'{name}'!A{start}:{_LAST_COL}"]
+            values = self.sheets.get_ranges(ranges)
+            added = 0
+            stale = []
+            now = datetime.now().isoformat()
+            with self._write_lock:
+                conn = self._conn()
+                for i, name in enumerate(self.SHEETS):
+                    header_rows, rows = values[2 * i], values[2 * i + 1]
+                    if header_rows is None:  # Worksheet doesn't exist (yet)
+                        continue
+                    header = _trim(header_rows[0]) if header_rows else []
+                    known = state.get(name)
+                    if known is None or header != known['header']:
+                        stale.append(name)
+                        continue
+                    start = known['next_row']
+                    new = [(start + j, _trim(r)) for j, r in enumerate(rows or [])]
+                    conn.executemany(
+                        'INSERT OR REPLACE INTO sheet_rows (sheet, row_num, status, timestamp, row_hash, data) '
+                        'VALUES (?, ?, ?, ?, ?, ?)',
+                        [self._row_values(name, n, header, r) for n, r in new if r]
+                    )
+                    conn.execute('UPDATE sheet_state SET next_row = ?, last_sync = ? WHERE sheet = ?',
+                                 (start + len(new), now, name))
+                    added += sum(1 for _, r in new if r)
+                conn.commit()
+            self.last_sync = datetime.now()
+        if stale:
+            added += self.reconcile(stale)
+        return added
+
+    def reconcile(self, sheet_names=None):
+        """
+        Full read of the given worksheets (default: all) in one batch_get. The sheet-level checksum
+        is compared first; on mismatch only rows whose hash differs are rewritten and rows past
+        the end are dropped. Returns number of rows changed.
+        """
+        names = list(sheet_names or self.SHEETS)
+        with self._sync_lock:
+            values = self.sheets.get_ranges([f"'{name}'!A1:{_LAST_COL}" for name in names])
+            changed = 0
+            now = datetime.now().isoformat()
+            with self._write_lock:
+                conn = self._conn()
+                for name, all_rows in zip(names, values):
+                    all_rows = [_trim(r) for r in (all_rows or [])]
+                    header = all_rows[0] if all_rows else []
+                    remote = {n: r for n, r in enumerate(all_rows[1:], start=2) if r}
+                    remote_hashes = {n: _row_hash(r) for n, r in remote.items()}
+                    local_hashes = {r['row_num']: r['row_hash'] for r in conn.execute(
+                        'SELECT row_num, row_hash FROM sheet_rows WHERE sheet = ?', (name,))}
+                    old = conn.execute('SELECT header FROM sheet_state WHERE sheet = ?', (name,)).fetchone()
+                    header_changed = old is None or json.loads(old['header']) != header
+                    if header_changed or self._checksum(remote_hashes) != self._checksum(local_hashes):
+                        upserts = [n for n, h in remote_hashes.items() if header_changed or local_hashes.get(n) != h]
+                        deletes = [n for n in local_hashes if n not in remote_hashes]
+                        conn.executemany(
+                            'INSERT OR REPLACE INTO sheet_rows (sheet, row_num, status, timestamp, row_hash, data) '
+                            'VALUES (?, ?, ?, ?, ?, ?)',
+                            [self._row_values(name, n, header, remote[n]) for n in upserts]
+                        )
+                        conn.executemany('DELETE FROM sheet_rows WHERE sheet = ? AND row_num = ?',
+                                         [(name, n) for n in deletes])
+                        changed += len(upserts) + len(deletes)
+                    conn.execute(
+                        'INSERT OR REPLACE INTO sheet_state (sheet, header, next_row, last_sync, last_reconcile) '
+                        'VALUES (?, ?, ?, ?, ?)',
+                        (name, json.dumps(header), max(2, len(all_rows) + 1), now, now)
+                    )
+                conn.commit()
+            self.ready = self._has_state()
+            self.last_sync = self.last_reconcile = datetime.now()
+        return changed
+
+    @staticmethod
+    def _checksum(hashes):
+        digest = hashlib.sha256()
+        for n in sorted(hashes):
+            digest.update(f"{n}:{hashes[n]};".encode('ascii'))
+        return digest.hexdigest()
+
+    def reconcile_async(self, sheet_names=None):
+        """Reconcile in a daemon thread (after approve/reject edits a row in place)."""
+        def _run():
+            try:
+                self.reconcile(sheet_names)
+            except Exception as e:
+                print(f"[SheetsMirror] Reconcile error: {e}")
+        threading.Thread(target=_run, daemon=True).start()
+
+    def get_pending_records(self):
+        """Same shape and order as SheetsIntegration.get_pending_records(), served from the mirror."""
+        records = []
+        for name, statuses in self.SHEETS.items():
+            placeholders = ','.join('?' * len(statuses))
+            rows = self._conn().execute(
+                f'SELECT row_num, data FROM sheet_rows WHERE sheet = ? AND status IN ({placeholders})',
+                (name,) + tuple(statuses)
+            ).fetchall()
+            for r in rows:
+                rec = json.loads(r['data'])
+                if name == 'PENDING_REVIEW':
+                    rec['_rowNumber'] = r['row_num']
+                rec['_sheetSource'] = name
+                records.append(rec)
+
+        def _ts(rec):
+            try:
+                s = (rec.get('timestamp') or '')[:19].replace('Z', '')
+                return datetime.fromisoformat(s) if s else datetime.min
+            except Exception:
+                return datetime.min
+        records.sort(key=_ts, reverse=True)
+        return records
+
+    def start_sync_timer(self, interval_seconds=60, reconcile_seconds=1800):
+        """Incremental sync every interval_seconds; full checksum reconcile every reconcile_seconds."""
+        def _tick():
+            try:
+                due = (reconcile_seconds and self.last_reconcile and
+                       (datetime.now() - self.last_reconcile).total_seconds() >= reconcile_seconds)
+                if due:
+                    n = self.reconcile()
+                    if n:
+                        print(f"[SheetsMirror] Reconciled: {n} rows changed")
+                else:
+                    added = self.sync()
+                    if added:
+                        print(f"[SheetsMirror] Synced: +{added} rows")
+            except Exception as e:
+                print(f"[SheetsMirror] Sync error: {e}")
+            self._schedule(_tick, interval_seconds)
+
+        if self.last_reconcile is None:
+            self.last_reconcile = datetime.now()
+        self._schedule(_tick, interval_seconds)
+
+    def _schedule(self, fn, interval_seconds):
+        self._timer = threading.Timer(interval_seconds, fn)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def stop(self):
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+
+    def stats(self):
+        counts = {}
+        for r in self._conn().execute('SELECT sheet, COUNT(*) AS n FROM sheet_rows GROUP BY sheet'):
+            counts[r['sheet']] = r['n']
+        return {
+            'ready': self.ready,
+            'rows': counts,
+            'watermarks': {k: v['next_row'] for k, v in self._state().items()},
+            'last_sync': self.last_sync.isoformat() if self.last_sync else None,
+            'last_reconcile': self.last_reconcile.isoformat() if self.last_reconcile else None,
+        }
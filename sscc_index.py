@@ -0,0 +1,171 @@
+"""
+SSCC Index
+Process-wide in-memory set of known SSCCs (local records + Google Sheets) for duplicate checks.
+Built once at startup, updated on every submit and refreshed incrementally from Sheets on a timer.
+"""
+
+from datetime import datetime
+import hashlib
+import math
+import threading
+
+
+class BloomFilter:
+    def __init__(self, capacity=200000, error_rate=0.001):
+        """
+        Fixed-size Bloom filter (bytearray bits, double hashing over blake2b).
+
+        Args:
+            capacity: Expected number of items
+            error_rate: Target false-positive rate at capacity
+        """
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, int(round(self.num_bits / capacity * math.log(2))))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def add(self, item):
+        for p in self._positions(item):
+            self.bits[p >> 3] |= 1 << (p & 7)
+
+    def __contains__(self, item):
+        return all(self.bits[p >> 3] & (1 << (p & 7)) for p in self._positions(item))
+
+
+class SSCCIndex:
+    # Sheets that hold captured SSCCs (same as SheetsIntegration.sscc_exists)
+    SHEET_NAMES = ('PENDING_REVIEW', 'APPROVED_RECORDS')
+
+    def __init__(self, use_bloom=False, bloom_capacity=200000):
+        """
+        Args:
+            use_bloom: Front the set with a Bloom filter (fast negative answers, less hashing of long strings)
+            bloom_capacity: Expected number of SSCCs when use_bloom is set
+        """
+        self.use_bloom = use_bloom
+        self.bloom_capacity = bloom_capacity
+        self._ssccs = set()
+        self._bloom = BloomFilter(bloom_capacity) if use_bloom else None
+        self._lock = threading.Lock()
+        self._sheet_next_row = {}  # sheet name -> first row not yet read
+        self._added_during_build = None
+        self._timer = None
+        self.ready = False
+        self.last_refresh = None
+        self.refresh_count = 0
+
+    def __len__(self):
+        return len(self._ssccs)
+
+    def __contains__(self, sscc):
+        sscc_clean = str(sscc or '').strip()
+        if not sscc_clean:
+            return False
+        if self._bloom is not None and sscc_clean not in self._bloom:
+            return False
+        return sscc_clean in self._ssccs
+
+    def add(self, sscc):
+        """Add one SSCC (call after a successful submit)."""
+        sscc_clean = str(sscc or '').strip()
+        if not sscc_clean:
+            return
+        with self._lock:
+            self._ssccs.add(sscc_clean)
+            if self._bloom is not None:
+                self._bloom.add(sscc_clean)
+            if self._added_during_build is not None:
+                self._added_during_build.append(sscc_clean)
+
+    def add_many(self, ssccs):
+        cleaned = [str(s).strip() for s in ssccs if s is not None and str(s).strip()]
+        with self._lock:
+            new = [s for s in cleaned if s not in self._ssccs]
+            self._ssccs.update(new)
+            if self._bloom is not None:
+                for s in new:
+                    self._bloom.add(s)
+        return len(new)
+
+    def build(self, local_ssccs, sheets=None):
+        """Full (re)build from local SSCCs and the Sheets SSCC columns. Swaps in the new set atomically."""
+        with self._lock:
+            self._added_during_build = []
+        ssccs = {str(s).strip() for s in local_ssccs if s is not None and str(s).strip()}
+        next_rows = {}
+        if sheets:
+            for sheet_name in self.SHEET_NAMES:
+                values, next_row = sheets.get_sscc_values(sheet_name, start_row=2)
+                ssccs.update(values)
+                next_rows[sheet_name] = next_row
+        with self._lock:
+            # Keep anything added by submits while the build was running
+            ssccs.update(self._added_during_build)
+            self._added_during_build = None
+            bloom = None
+            if self.use_bloom:
+                bloom = BloomFilter(max(self.bloom_capacity, len(ssccs) * 2))
+                for s in ssccs:
+                    bloom.add(s)
+            self._ssccs = ssccs
+            self._bloom = bloom
+            self._sheet_next_row = next_rows
+            self.ready = True
+            self.last_refresh = datetime.now()
+        return len(ssccs)
+
+    def refresh_from_sheets(self, sheets):
+        """Incremental refresh - read only rows appended since the last refresh. Returns count of new SSCCs."""
+        added = 0
+        for sheet_name in self.SHEET_NAMES:
+            start = self._sheet_next_row.get(sheet_name, 2)
+            values, next_row = sheets.get_sscc_values(sheet_name, start_row=start)
+            added += self.add_many(values)
+            self._sheet_next_row[sheet_name] = next_row
+        self.last_refresh = datetime.now()
+        self.refresh_count += 1
+        return added
+
+    def start_refresh_timer(self, sheets, interval_seconds=300, local_ssccs_fn=None, full_rebuild_every=12):
+        """
+        Refresh from Sheets every interval_seconds on a daemon timer.
+        Every full_rebuild_every ticks do a full rebuild so edits/deletes in the sheet are picked up.
+        """
+        def _tick():
+            try:
+                if local_ssccs_fn and full_rebuild_every and self.refresh_count % full_rebuild_every == full_rebuild_every - 1:
+                    n = self.build(local_ssccs_fn(), sheets)
+                    self.refresh_count += 1
+                    print(f"[SSCCIndex] Rebuilt: {n} SSCCs")
+                else:
+                    added = self.refresh_from_sheets(sheets)
+                    if added:
+                        print(f"[SSCCIndex] Refreshed from Sheets: +{added} SSCCs ({len(self)} total)")
+            except Exception as e:
+                print(f"[SSCCIndex] Refresh error: {e}")
+            self._schedule(_tick, interval_seconds)
+
+        self._schedule(_tick, interval_seconds)
+
+    def _schedule(self, fn, interval_seconds):
+        self._timer = threading.Timer(interval_seconds, fn)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def stop(self):
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+
+    def stats(self):
+        return {
+            'ready': self.ready,
+            'size': len(self),
+            'bloom': self.use_bloom,
+            'last_refresh': self.last_refresh.isoformat() if self.last_refresh else None,
+        }
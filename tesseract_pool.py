@@ -0,0 +1,143 @@
+"""
+Tesseract Worker Pool
+Local OCR on warm Tesseract engines. Each worker process loads the language model once into a
+tesserocr PyTessBaseAPI and reuses it for every image, instead of pytesseract forking a new
+`tesseract` process (and reloading eng.traineddata) per call. Images go to the workers as
+in-memory JPEG/PNG bytes - no temp files.
+
+Optional dependency: pip install tesserocr (needs the Tesseract library + tessdata installed).
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import io
+import multiprocessing
+import os
+import threading
+import time
+
+# Per worker process: the warm engine
+_api = None
+
+
+def _init_worker(lang, psm, tessdata):
+    global _api
+    import tesserocr
+    kwargs = {'lang': lang, 'psm': psm}
+    if tessdata:
+        kwargs['path'] = tessdata
+    _api = tesserocr.PyTessBaseAPI(**kwargs)
+
+
+def _recognize(image_bytes):
+    from PIL import Image
+    started = time.perf_counter()
+    img = Image.open(io.BytesIO(image_bytes))
+    if img.mode not in ('RGB', 'L'):
+        img = img.convert('RGB')
+    _api.SetImage(img)
+    text = _api.GetUTF8Text()
+    _api.Clear()  # drop the image and results, keep the loaded model
+    return text.strip(), round((time.perf_counter() - started) * 1000, 1)
+
+
+def _ping(_=None):
+    time.sleep(0.05)  # hold the worker briefly so each ping lands on a different process
+    return os.getpid()
+
+
+def tesserocr_available():
+    try:
+        import tesserocr  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class TesseractPool:
+    def __init__(self, workers=None, lang='eng', psm=6, tessdata=None):
+        """
+        Args:
+            workers: Worker processes / warm engines (default: CPU count)
+            lang: Tesseract language(s), e.g. 'eng'
+            psm: Page segmentation mode (6 = single uniform block, same as the pytesseract path)
+            tessdata: tessdata directory (default: Tesseract's own / TESSDATA_PREFIX)
+        """
+        if not tesserocr_available():
+            raise ImportError("tesserocr not installed. Install with: pip install tesserocr")
+        self.workers = workers or os.cpu_count() or 1
+        self.lang = lang
+        self.psm = psm
+        self.tessdata = tessdata
+        self._lock = threading.Lock()
+        self.counters = {'images': 0, 'errors': 0, 'recognize_ms': 0.0, 'restarts': 0}
+        self._executor = self._new_executor()
+
+    def _new_executor(self):
+        # spawn, not fork: the web app is multi-threaded and workers only need this module
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+            initargs=(self.lang, self.psm, self.tessdata),
+        )
+
+    def _restart(self, broken):
+        """Replace a pool whose worker died (e.g. Tesseract crashed on an image)."""
+        with self._lock:
+            if self._executor is broken:
+                broken.shutdown(wait=False)
+                self._executor = self._new_executor()
+                self.counters['restarts'] += 1
+
+    def warm_up(self):
+        """Start every worker and load its engine now, not on the first capture. Returns worker count."""
+        pids = set(self._executor.map(_ping, range(self.workers)))
+        return len(pids)
+
+    def recognize(self, image_bytes, timeout=None):
+        """OCR encoded image bytes on a warm engine. Returns the text."""
+        executor = self._executor
+        try:
+            text, ms = executor.submit(_recognize, bytes(image_bytes)).result(timeout=timeout)
+        except Exception as e:
+            with self._lock:
+                self.counters['errors'] += 1
+            if isinstance(e, BrokenProcessPool):
+                self._restart(executor)
+            raise
+        with self._lock:
+            self.counters['images'] += 1
+            self.counters['recognize_ms'] += ms
+        return text
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self.counters)
+        counters['avg_recognize_ms'] = round(counters['recognize_ms'] / counters['images'], 1) if counters['images'] else None
+        counters['recognize_ms'] = round(counters['recognize_ms'], 1)
+        counters['workers'] = self.workers
+        counters['lang'] = self.lang
+        return counters
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_tesseract_pool(workers=None, **options):
+    """Process-wide pool, created on first use (engines are expensive - share them)."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = TesseractPool(workers=workers, **options)
+    return _pool
+
+
+def pool_stats():
+    """Stats of the process-wide pool, or None if local-pool OCR hasn't been used."""
+    return _pool.stats() if _pool is not None else None
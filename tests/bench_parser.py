@@ -0,0 +1,60 @@
+"""
+DataParser throughput in labels/sec on the label_corpus golden corpus.
+
+    python tests/bench_parser.py [labels] [--repeat N]
+
+Reports DataParser.parse (compiled single-scan lexer) and, for comparison, the field extraction
+alone both ways: the compiled lexer (_match_field) and the per-field re.search reference
+(_parse_field) the lexer replaced.
+"""
+
+from pathlib import Path
+import argparse
+import sys
+import time
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from data_parser import DataParser  # noqa: E402
+from label_corpus import corpus  # noqa: E402
+
+
+def best_rate(fn, texts, repeat):
+    best = 0.0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for text in texts:
+            fn(text)
+        best = max(best, len(texts) / (time.perf_counter() - started))
+    return best
+
+
+def main():
+    ap = argparse.ArgumentParser(description='DataParser throughput (labels/sec)')
+    ap.add_argument('labels', nargs='?', type=int, default=20000)
+    ap.add_argument('--repeat', type=int, default=3, help='Runs per measurement (best is reported)')
+    args = ap.parse_args()
+
+    texts = corpus(args.labels)
+    parser = DataParser()
+    configs = parser.field_configs
+    compiled, locator = parser._compile_fields(configs)
+
+    def lexer_fields(text):
+        normalized = parser.normalize_text(text)
+        starts = [m.start() for m in locator.finditer(normalized)]
+        return {field: parser._match_field(normalized, compiled[field], starts) for field in configs}
+
+    def reference_fields(text):
+        normalized = parser.normalize_text(text)
+        return {field: parser._parse_field(normalized, text, config['patterns'], config['keywords'])
+                for field, config in configs.items()}
+
+    print(f"{len(texts)} labels, best of {args.repeat}")
+    for name, fn in (('parse (full)', parser.parse), ('fields: compiled lexer', lexer_fields),
+                     ('fields: re.search per field', reference_fields)):
+        print(f"  {name:30s} {best_rate(fn, texts, args.repeat):10.0f} labels/sec")
+
+
+if __name__ == '__main__':
+    main()
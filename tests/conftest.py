@@ -0,0 +1,9 @@
+"""
+Tests for the web app's backend modules: python -m pytest tests
+(test_app.py in the repo root is the desktop app's manual startup check, not part of this suite.)
+"""
+
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,33 @@
+"""
+Deterministic corpus of noisy OCR label texts for the parser equivalence test and bench_parser.py:
+headings in varied case / punctuation, values valid and invalid, line noise, LF and CRLF.
+"""
+
+import random
+
+HEADINGS = ['ITEM NUMBER', 'ITEM DESCRIPTION', 'BATCH NO', 'BATCH', 'QUANTITY', 'QTY', 'DATE', 'TIME',
+            'CUSTOMER ITEM NUMBER', 'EAN NUMBER', 'EAN', 'SSCC', '6SCC', '(00)', 'Item Number', 'batch no.',
+            'Date:', 'Time -', 'LOT', 'PALLET ID']
+VALUES = ['BRI023A250SM200BMHP', 'RASPBERRY LAGER 4.5% 330ML', '230415', '1200', '12/04/2024', '14:32',
+          '9300000123456', '000000000000222051', '(00)393000001234567890', '6SCC(00) 000000000000222051', 'N/A',
+          '', '7', '12.5', 'RECORP PTY LTD', '31/13/2024', '25:61', '"ABC 123"', 'X1-Y2']
+SEPARATORS = [': ', ' ', ':', ' : ', '\n']
+NOISE = 'ABCDE 0123456789:/-.,()#@!\t"\''
+
+
+def label(rng):
+    lines = []
+    for _ in range(rng.randint(0, 14)):
+        r = rng.random()
+        if r < 0.55:
+            lines.append(rng.choice(HEADINGS) + rng.choice(SEPARATORS) + rng.choice(VALUES))
+        elif r < 0.85:
+            lines.append(rng.choice(VALUES))
+        else:
+            lines.append(''.join(rng.choice(NOISE) for _ in range(rng.randint(1, 30))))
+    return rng.choice(['\n', '\r\n']).join(lines)
+
+
+def corpus(n, seed=21):
+    rng = random.Random(seed)
+    return [label(rng) for _ in range(n)] + ['', '   ', '\n\n']
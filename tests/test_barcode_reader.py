@@ -0,0 +1,59 @@
+import pytest
+
+import barcode_reader
+from barcode_reader import GS, fields_from_gs1, gs1_check_digit, parse_gs1, read_label, valid_sscc
+
+SSCC = '009501234567890126'
+GTIN = '05012345678900'
+
+
+def test_check_digit():
+    assert gs1_check_digit(SSCC[:-1]) == '6'
+    assert gs1_check_digit(GTIN[:-1]) == '0'
+    assert valid_sscc(SSCC)
+    assert not valid_sscc('009501234567890124') and not valid_sscc(SSCC[1:]) and not valid_sscc('')
+
+
+@pytest.mark.parametrize('data', [
+    f']C100{SSCC}02{GTIN}37120{GS}10230415{GS}11240412',
+    f'00{SSCC}02{GTIN}10230415{GS}37120{GS}11240412',
+    f'(00){SSCC}(02){GTIN}(10)230415(37)120(11)240412',
+])
+def test_parse_gs1_raw_and_human_readable(data):
+    assert parse_gs1(data) == {'00': SSCC, '02': GTIN, '10': '230415', '37': '120', '11': '240412'}
+
+
+def test_parse_gs1_measures_and_unknown_ais():
+    assert parse_gs1(f'02{GTIN}3102001250') == {'02': GTIN, '3102': '001250'}
+    assert parse_gs1(f'00{SSCC}99INTERNAL') == {'00': SSCC}  # Stops at the first unknown AI
+    assert parse_gs1('') == {}
+
+
+def test_fields_from_gs1():
+    elements = parse_gs1(f'00{SSCC}02{GTIN}3700000120{GS}10230415{GS}11240400')
+    assert fields_from_gs1(elements) == {
+        'sscc': SSCC,
+        'ean_number': GTIN[1:],  # GTIN-14 with a leading 0 is the EAN-13
+        'batch_no': '230415',
+        'quantity': '120',
+        'date': '30/04/2024',  # Day 00 = last day of the month
+    }
+
+
+def test_fields_from_gs1_drops_malformed_values():
+    elements = {'00': '009501234567890124', '01': '05012345678901', '37': '12O', '11': '241332'}
+    assert fields_from_gs1(elements) == {}
+
+
+def test_read_label_needs_a_valid_sscc(monkeypatch):
+    monkeypatch.setattr(barcode_reader, '_decoder', lambda img: [f']C100{SSCC}', f']C102{GTIN}10230415'])
+    fields, info = read_label(None)
+    assert fields == {'sscc': SSCC, 'ean_number': GTIN[1:], 'batch_no': '230415'}
+    assert info['barcodes'] == 2 and info['elements']['00'] == SSCC
+    monkeypatch.setattr(barcode_reader, '_decoder', lambda img: [f']C102{GTIN}10230415'])
+    assert read_label(None)[0] is None
+
+
+def test_read_label_without_a_decoder(monkeypatch):
+    monkeypatch.setattr(barcode_reader, '_decoder', False)
+    assert read_label(None) == (None, {'decode_ms': 0.0, 'barcodes': 0, 'elements': {}})
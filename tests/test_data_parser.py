@@ -0,0 +1,126 @@
+import re
+
+import pytest
+
+from barcode_reader import gs1_check_digit
+from data_parser import DataParser, _literal_prefix, check_gs1
+from label_corpus import corpus
+
+# Custom template style patterns: alternation, leading group / inline flag, lookahead
+EXTRA_PATTERNS = {
+    'batch_no': [r'LOT|BATCH[\s:]+(\d+)', r'(?:LOT|BATCH)\s*NO\.?[\s:]+(\d+)', r'(?i)lot[\s:]+(\d+)'],
+    'sscc': [r'PALLET ID[\s:]*([0-9]{18})|\(00\)\s*([0-9]{18})', r'(?=\d{18})(\d{18})'],
+    'quantity': [r'(QTY|QUANTITY)[\s:]+(\d+)', r'QTY[\s:]+(\d+)|\bQUANTITY[\s:]+(\d+)'],
+}
+
+
+@pytest.mark.parametrize('pattern, prefix', [
+    (r'ITEM\s*NUMBER[\s:]+([A-Z0-9\-]+)', 'ITEM'),
+    (r'\(00\)\s*([0-9]{16,22})', '(00)'),
+    (r'\bDATE[\s:]+(\d{1,2})', 'DATE'),
+    (r'BATCH\s*NO\.?[\s:]+(\d+)', 'BATCH'),
+    (r'AB?C', 'A'),
+    (r'LOT\|X', 'LOT|X'),
+    (r'LOT|BATCH[\s:]+(\d+)', ''),
+    (r'(?:LOT|BATCH)[\s:]+(\d+)', ''),
+    (r'(?i)lot[\s:]+(\d+)', ''),
+    (r'[A-Z]+(\d+)', ''),
+    (r'AB[]|]C', 'AB'),
+])
+def test_literal_prefix(pattern, prefix):
+    assert _literal_prefix(pattern) == prefix
+
+
+def field_results(parser, field_configs, texts):
+    """Per text and field: (compiled lexer result, reference _parse_field result)."""
+    compiled, locator = parser._compile_fields(field_configs)
+    for text in texts:
+        normalized = parser.normalize_text(text)
+        starts = [m.start() for m in locator.finditer(normalized)] if locator else []
+        for field, config in field_configs.items():
+            yield (text, field, parser._match_field(normalized, compiled[field], starts),
+                   parser._parse_field(normalized, text, config['patterns'], config['keywords']))
+
+
+@pytest.fixture(scope='module')
+def golden():
+    return corpus(5000)
+
+
+def test_compiled_lexer_matches_reference_on_golden_corpus(golden):
+    parser = DataParser()
+    mismatches = [(text, field, got, expected) for text, field, got, expected
+                  in field_results(parser, parser.field_configs, golden) if got != expected]
+    assert not mismatches[:5]
+
+
+def test_alternation_and_group_patterns_match_like_re_search(golden):
+    parser = DataParser()
+    configs = {field: {'keywords': list(config['keywords']),
+                       'patterns': list(config['patterns']) + EXTRA_PATTERNS.get(field, [])}
+               for field, config in parser.field_configs.items()}
+    texts = golden[:2000] + ['BATCH: 42', 'LOT 7\nBATCH 99', 'PALLET ID 000000000000222051', 'QTY 12', 'quantity: 5']
+    mismatches = [(text, field, got, expected) for text, field, got, expected
+                  in field_results(parser, configs, texts) if got != expected]
+    assert not mismatches[:5]
+
+
+def test_alternation_pattern_finds_the_second_branch():
+    parser = DataParser()
+    compiled, locator = parser._compile_fields({'batch_no': {'keywords': [], 'patterns': [r'LOT|BATCH[\s:]+(\d+)']}})
+    normalized = parser.normalize_text('ITEM X\nBATCH: 123456')
+    starts = [m.start() for m in locator.finditer(normalized)] if locator else []
+    assert parser._match_field(normalized, compiled['batch_no'], starts) == ('123456', 'high')
+    assert re.search(r'LOT|BATCH[\s:]+(\d+)', normalized).group(1) == '123456'
+
+
+def test_parse_label():
+    result = DataParser().parse('ITEM NUMBER: BRI023A250SM200BMHP\nBATCH NO: 230415\nQUANTITY: 1200\n'
+                                'DATE: 12/04/2024\nTIME: 14:32\n6SCC(00)000000000000222051')
+    parsed = result['parsed']
+    assert parsed['item_number'] == 'BRI023A250SM200BMHP'
+    assert parsed['batch_no'] == '230415'
+    assert parsed['quantity'] == '1200'
+    assert (parsed['date'], parsed['time']) == ('12/04/2024', '14:32')
+    assert result['template'] == 'brix_recorp'
+
+
+@pytest.mark.parametrize('read, true', [
+    ('291417776317866906', '291417776317066906'),  # 0 read as 8
+    ('996228303803685952', '996228303883685952'),  # 8 read as 0
+    ('042304714426942080', '042304114426942080'),  # 1 read as 7
+    ('291411776317066906', '291417776317066906'),  # 7 read as 1
+    ('0095O1234567890126', '009501234567890126'),  # letter O in a digit position
+])
+def test_check_gs1_corrects_single_confusions(read, true):
+    assert gs1_check_digit(true[:-1]) == true[-1]
+    assert check_gs1(read, (18,)) == (true, 'corrected')
+
+
+def test_check_gs1_valid_and_invalid():
+    assert check_gs1('009501234567890126', (18,)) == ('009501234567890126', 'valid')
+    assert check_gs1('5012345678900', (13, 14)) == ('5012345678900', 'valid')
+    assert check_gs1('00950123456789012', (18,)) == ('00950123456789012', 'invalid')  # wrong length
+    assert check_gs1('009501234567890124', (18,)) == ('009501234567890124', 'invalid')  # no confusable fix
+
+
+def test_check_gs1_rejects_ambiguous_corrections():
+    # Several single 0/8 and 1/7 changes fit the check digit - none is picked
+    assert check_gs1('088070810788000878', (18,)) == ('088070810788000878', 'invalid')
+
+
+def test_parse_sets_sscc_confidence_from_the_check_digit():
+    parser = DataParser()
+    result = parser.parse('6SCC(00)291417776317866906')
+    assert result['parsed']['sscc'] == '291417776317066906'
+    assert result['confidence']['sscc'] == 'medium'
+    assert any('corrected to a valid SSCC-18' in w for w in result['warnings'])
+    assert parser.parse('6SCC(00)009501234567890126')['confidence']['sscc'] == 'high'
+    assert parser.parse('6SCC(00)009501234567890124')['confidence']['sscc'] == 'low'
+
+
+def test_parse_keeps_the_stored_20_digit_sscc_form():
+    # AI (00) read into the number: checked without it, stored as before so duplicate checks still match
+    result = DataParser().parse('6SCC(00)00009501234567890126')
+    assert result['parsed']['sscc'] == '00009501234567890126'
+    assert result['confidence']['sscc'] == 'high'
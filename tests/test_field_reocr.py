@@ -0,0 +1,102 @@
+import io
+
+from PIL import Image
+import pytest
+
+from data_parser import DataParser
+from field_reocr import FieldReOCR
+
+
+def word(text, left, top, width=60, height=20):
+    return {'text': text, 'left': left, 'top': top, 'width': width, 'height': height}
+
+
+WORDS = [
+    word('CUSTOMER', 10, 10, 90), word('ITEM', 110, 10), word('NUMBER:', 180, 10, 80), word('C-100', 270, 10),
+    word('ITEM', 10, 50), word('NUMBER', 80, 52, 70),
+    word('BATCH', 10, 90), word('NO:', 80, 91, 30),
+    word('SSCC', 10, 200),
+    word('QUANTITY', 500, 300, 90),
+]
+
+
+class FakeOCR:
+    """Returns the next scripted text for each patch and keeps the patch sizes."""
+
+    def __init__(self, *texts):
+        self.texts = list(texts)
+        self.sizes = []
+
+    def process_image(self, image):
+        self.sizes.append(Image.open(io.BytesIO(image)).size)
+        text = self.texts.pop(0)
+        if isinstance(text, Exception):
+            raise text
+        return text
+
+
+@pytest.fixture
+def reocr():
+    return FieldReOCR(FakeOCR(), DataParser())
+
+
+@pytest.mark.parametrize('field, box', [
+    ('item_number', (10, 50, 150, 72)),  # Not the ITEM NUMBER inside CUSTOMER ITEM NUMBER
+    ('batch_no', (10, 90, 110, 111)),
+    ('sscc', (10, 200, 70, 220)),
+    ('quantity', (500, 300, 590, 320)),
+    ('date', None),
+])
+def test_locate_heading(reocr, field, box):
+    assert reocr.locate_heading(WORDS, field) == box
+
+
+def test_multi_word_heading_must_be_on_one_line(reocr):
+    words = [word('BATCH', 10, 90), word('NO', 80, 140)]
+    assert reocr.locate_heading(words, 'batch_no') is None
+
+
+def test_value_regions_right_then_below():
+    right_of, below = FieldReOCR.value_regions((10, 90, 110, 110), (800, 600))
+    assert right_of == (110, 82, 800, 118)
+    assert below == (0, 110, 610, 162)
+    assert FieldReOCR.value_regions((780, 90, 795, 110), (800, 600)) == [(760, 110, 800, 162)]  # No room on the right
+
+
+def run(reocr, *texts, missing=('sscc', 'batch_no')):
+    reocr.ocr = FakeOCR(*texts)
+    hires = Image.new('RGB', (1600, 1200), 'white')  # Twice the OCR image
+    return reocr.recover(hires, (800, 600), WORDS, missing)
+
+
+def test_recover_reads_the_value_patch(reocr):
+    found, info = run(reocr, '000000000000222051', '230415')
+    assert found == {'sscc': '000000000000222051', 'batch_no': '230415'}
+    assert info['calls'] == 2 and info['located'] == ['sscc', 'batch_no']
+    # The SSCC patch is 72 px high at 2x (40 px text): upscaled towards 48 px text, within max_patch_dim
+    width, height = reocr.ocr.sizes[0]
+    assert height > 72 and width == 1600
+    assert reocr.stats()['recovered'] == 2
+
+
+def test_recover_takes_a_check_digit_corrected_sscc(reocr):
+    found, _ = run(reocr, '291417776317866906', missing=('sscc',))
+    assert found == {'sscc': '291417776317066906'}
+
+
+def test_recover_tries_below_and_ignores_unreadable_patches(reocr):
+    # SSCC: unreadable, then a wrong check digit; batch: OCR error on the same line, then the line below
+    found, info = run(reocr, 'XX', '009501234567890124', RuntimeError('503'), '230415')
+    assert found == {'batch_no': '230415'}
+    assert info['calls'] == 4
+
+
+def test_recover_is_bounded_by_max_calls(reocr):
+    reocr.max_calls = 1
+    found, info = run(reocr, 'XX')
+    assert found == {} and info['calls'] == 1
+
+
+def test_recover_skips_fields_without_a_heading(reocr):
+    found, info = run(reocr, missing=('date', 'time'))
+    assert found == {} and info == dict(info, calls=0, located=[])
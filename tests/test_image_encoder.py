@@ -0,0 +1,67 @@
+import io
+import random
+
+from PIL import Image, ImageDraw
+import pytest
+
+from image_encoder import QUALITY_STEPS, _encode, _resize, decode_reduced, encode_under
+
+
+def label_image(size=(1200, 900), seed=3):
+    """Text-like noise: JPEG sizes vary with quality and resolution like a real label photo."""
+    rng = random.Random(seed)
+    img = Image.new('RGB', size, 'white')
+    draw = ImageDraw.Draw(img)
+    for _ in range(4000):
+        x, y = rng.randrange(size[0]), rng.randrange(size[1])
+        draw.rectangle((x, y, x + rng.randint(1, 12), y + rng.randint(1, 12)), fill=(rng.randrange(256),) * 3)
+    return img
+
+
+@pytest.fixture(scope='module')
+def img():
+    return label_image()
+
+
+def test_fits_at_the_top_quality_in_one_attempt(img):
+    data, info = encode_under(img, 10 * 1024 * 1024)
+    assert info == {'attempts': 1, 'quality': QUALITY_STEPS[-1], 'width': 800, 'height': 600, 'bytes': len(data)}
+
+
+def test_searches_down_to_the_highest_quality_that_fits(img):
+    resized = _resize(img, 800)
+    limit = len(_encode(resized, 65)) - 1  # 60 fits, 65 doesn't
+    data, info = encode_under(img, limit)
+    assert info['quality'] == 60 and (info['width'], info['height']) == (800, 600)
+    assert len(data) < limit
+    assert info['attempts'] <= 5  # Top quality once, then a binary search over the other steps
+
+
+def test_shrinks_when_the_lowest_quality_is_too_big(img):
+    limit = len(_encode(_resize(img, 800), QUALITY_STEPS[0])) // 2
+    data, info = encode_under(img, limit)
+    assert len(data) < limit and info['bytes'] == len(data)
+    assert 400 <= max(info['width'], info['height']) < 800
+    assert Image.open(io.BytesIO(data)).size == (info['width'], info['height'])
+
+
+def test_always_fits_a_tiny_limit(img):
+    data, info = encode_under(img, 2000, min_dim=400)
+    assert len(data) < 2000 and max(info['width'], info['height']) < 400
+
+
+def test_decode_reduced_scales_large_jpegs(img):
+    big = img.resize((3200, 2400))
+    buf = io.BytesIO()
+    big.save(buf, 'JPEG', quality=90)
+    decoded, info = decode_reduced(buf.getvalue(), target_dim=800)
+    assert decoded.mode == 'RGB' and 800 <= max(decoded.size) < 1600
+    assert info['source'] == '3200x2400' and info['decoded'] == f'{decoded.width}x{decoded.height}'
+
+
+def test_decode_reduced_converts_and_never_upscales():
+    buf = io.BytesIO()
+    Image.new('P', (300, 200)).save(buf, 'PNG')
+    buf.seek(0)
+    decoded, _ = decode_reduced(buf, target_dim=800)  # File object, like an uploaded part
+    assert decoded.mode == 'RGB' and decoded.size == (300, 200)
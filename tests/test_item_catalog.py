@@ -0,0 +1,96 @@
+import random
+
+import pytest
+
+from item_catalog import ItemCatalog, _BKTree, levenshtein
+
+ITEMS = [
+    {'item_number': 'BRI023A250SM200BMHP', 'item_description': 'BRIX APPLE JUICE 250ML CARTON',
+     'ean_number': '5012345678900', 'customer_item_number': 'C-100'},
+    {'item_number': 'BRI023A330SM200BMHP', 'item_description': 'BRIX APPLE JUICE 330ML CARTON'},
+    {'item_number': 'BRI031O250SM200BMHP', 'item_description': 'BRIX ORANGE JUICE 250ML CARTON'},
+    {'item_number': 'ABC12345', 'item_description': 'LID WHITE 38MM'},
+    {'item_number': 'ABC12347', 'item_description': 'LID BLACK 38MM'},
+]
+
+
+@pytest.fixture
+def catalog():
+    return ItemCatalog(ITEMS)
+
+
+def reference_levenshtein(a, b):
+    row = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        prev, row[0] = row[0], i
+        for j, cb in enumerate(b, 1):
+            prev, row[j] = row[j], min(row[j] + 1, row[j - 1] + 1, prev + (ca != cb))
+    return row[-1]
+
+
+def test_levenshtein_matches_the_dynamic_programming_table():
+    rng = random.Random(7)
+    for _ in range(500):
+        a = ''.join(rng.choice('AB01') for _ in range(rng.randint(0, 80)))
+        b = ''.join(rng.choice('AB01') for _ in range(rng.randint(0, 80)))
+        assert levenshtein(a, b) == reference_levenshtein(a, b)
+
+
+def test_bk_tree_returns_every_nearest_key():
+    tree = _BKTree()
+    for word in ('JUICE', 'JUICY', 'SAUCE', 'CARTON', 'CANTON', 'APPLE'):
+        tree.add(word)
+    assert tree.nearest('JULCE', 1) == (1, ['JUICE'])
+    assert tree.nearest('CARTON', 2) == (0, ['CARTON'])
+    assert sorted(tree.nearest('CAXTON', 1)[1]) == ['CANTON', 'CARTON']
+    assert tree.nearest('ZEBRA', 1) == (None, [])
+
+
+@pytest.mark.parametrize('code, item, method, distance', [
+    ('BRI023A250SM200BMHP', 'BRI023A250SM200BMHP', 'exact', 0),
+    ('bri023a-250sm200bmhp', 'BRI023A250SM200BMHP', 'exact', 0),
+    ('BRI023A250SM', 'BRI023A250SM200BMHP', 'prefix', 7),  # Cut off at the label edge
+    ('BRI023A25OSM200BMHP', 'BRI023A250SM200BMHP', 'fuzzy', 1),  # O for 0
+    ('BRI031O25SM200BMHP', 'BRI031O250SM200BMHP', 'fuzzy', 1),  # Dropped character
+])
+def test_match(catalog, code, item, method, distance):
+    entry, got_method, got_distance = catalog.match(code)
+    assert (entry['item_number'], got_method, got_distance) == (item, method, distance)
+
+
+def test_match_leaves_ties_and_strangers_alone(catalog):
+    assert catalog.match('ABC12346') == (None, 'ambiguous', None)  # One edit from ABC12345 and ABC12347
+    assert catalog.match('BRI023A') == (None, 'unknown', None)  # Prefix too short to complete
+    assert catalog.match('ZZZZ9999') == (None, 'unknown', None)
+    assert catalog.match('') == (None, 'unknown', None)
+    assert catalog.stats()['ambiguous'] == 1 and catalog.stats()['unknown'] == 2  # An empty code isn't counted
+
+
+def test_match_description(catalog):
+    entry = catalog.match_description('BRIX APPLE JUlCE 250ML CART0N')
+    assert entry['item_number'] == 'BRI023A250SM200BMHP'
+    assert catalog.match_description('brix orange juice 250ml carton')['item_number'] == 'BRI031O250SM200BMHP'
+
+
+def test_match_description_leaves_ties_and_strangers_alone(catalog):
+    # The size is missing: 250ML and 330ML are equally close
+    assert catalog.match_description('BRIX APPLE JUICE ML CARTON') is None
+    assert catalog.match_description('PALLET WRAP CLEAR') is None
+    assert catalog.match_description('LID') is None  # Too short to match
+    assert catalog.stats()['description'] == 0
+
+
+def test_by_ean_ignores_leading_zeros(catalog):
+    assert catalog.by_ean('05012345678900')['item_number'] == 'BRI023A250SM200BMHP'
+    assert catalog.by_ean('5012345678917') is None
+
+
+def test_load_csv_with_alternative_column_names(tmp_path):
+    path = tmp_path / 'items.csv'
+    path.write_text('\ufeffItem Code,Description,GTIN\nBRI023A250SM200BMHP,BRIX APPLE JUICE 250ML CARTON,5012345678900\n'
+                    ',NO CODE,\n', encoding='utf-8')
+    catalog = ItemCatalog.load(path)
+    assert len(catalog) == 1
+    assert catalog.match('BRI023A250SM200BMHP')[0] == {
+        'item_number': 'BRI023A250SM200BMHP', 'item_description': 'BRIX APPLE JUICE 250ML CARTON',
+        'ean_number': '5012345678900', 'customer_item_number': ''}
@@ -0,0 +1,56 @@
+import threading
+import time
+
+import pytest
+
+from job_queue import JobQueue, QueueFullError
+
+
+def wait_until_finished(queue, job_id, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = queue.get(job_id)
+        if job['status'] in ('done', 'error'):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f'job {job_id} did not finish')
+
+
+def test_job_result_and_error():
+    queue = JobQueue(max_workers=1)
+    done = queue.submit(lambda a, b=0: a + b, 2, b=3)
+    failed = queue.submit(lambda: 1 / 0)
+    assert wait_until_finished(queue, done)['result'] == 5
+    job = wait_until_finished(queue, failed)
+    assert job['status'] == 'error' and 'division' in job['error']
+    assert queue.get('unknown') is None
+
+
+def test_queue_full():
+    release = threading.Event()
+    queue = JobQueue(max_workers=1, max_pending=2)
+    queue.submit(release.wait)
+    queue.submit(release.wait)
+    with pytest.raises(QueueFullError):
+        queue.submit(release.wait)
+    release.set()
+
+
+def test_wait_for_changes_only_reports_the_requested_jobs():
+    queue = JobQueue(max_workers=2)
+    version, _ = queue.recent()
+    mine = queue.submit(lambda: 'mine')
+    other = queue.submit(lambda: 'other')
+    wait_until_finished(queue, mine)
+    wait_until_finished(queue, other)
+    _, changed = queue.wait_for_changes(version, timeout=0, job_ids={mine})
+    assert {job['id'] for job in changed} == {mine}
+
+
+def test_finished_jobs_expire():
+    queue = JobQueue(max_workers=1, keep_seconds=0)
+    job_id = queue.submit(lambda: None)
+    wait_until_finished(queue, job_id)
+    time.sleep(0.01)
+    queue.submit(lambda: None)  # submit prunes expired jobs
+    assert queue.get(job_id) is None
@@ -0,0 +1,76 @@
+import math
+
+import numpy as np
+from PIL import Image, ImageDraw
+import pytest
+
+from label_crop import _largest_component, _otsu, crop_label, find_label_quad
+
+
+def capture(label=None, size=(1000, 800), background=70):
+    """Dark pallet-wrap frame with a white label polygon carrying a few lines of black text."""
+    img = Image.new('RGB', size, (background,) * 3)
+    draw = ImageDraw.Draw(img)
+    if label:
+        draw.polygon(label, fill='white')
+        xs, ys = [x for x, _ in label], [y for _, y in label]
+        cx, cy = sum(xs) / 4, sum(ys) / 4
+        for n in range(4):
+            draw.rectangle((cx - 150, cy - 120 + n * 60, cx + 100, cy - 105 + n * 60), fill='black')
+    return img
+
+
+def test_otsu_splits_a_bimodal_histogram():
+    gray = np.array([[40] * 50 + [220] * 50] * 10, dtype=np.uint8)
+    assert 40 <= _otsu(gray) < 220
+
+
+def test_largest_component():
+    mask = np.zeros((20, 20), dtype=bool)
+    mask[1:4, 1:4] = True
+    mask[8:18, 5:15] = True
+    mask[18, 15] = True  # Diagonal neighbour: 8-connected to the big blob
+    largest = _largest_component(mask)
+    assert largest.sum() == 101 and not largest[1:4, 1:4].any()
+    assert _largest_component(np.zeros((5, 5), dtype=bool)) is None
+
+
+def test_crops_an_upright_label():
+    cropped, info = crop_label(capture([(200, 150), (200, 650), (800, 650), (800, 150)]))
+    assert cropped is not None
+    # 600 x 500 label plus the margin, within a thumbnail pixel or two
+    assert 600 <= cropped.width <= 660 and 500 <= cropped.height <= 550
+    assert info['cropped_px'] == f'{cropped.width}x{cropped.height}'
+    assert 0.3 <= info['label_area'] <= 0.45
+
+
+def test_straightens_a_rotated_label():
+    angle = math.radians(12)
+    cx, cy = 500, 400
+    corners = [(-300, -200), (-300, 200), (300, 200), (300, -200)]
+    label = [(cx + x * math.cos(angle) - y * math.sin(angle), cy + x * math.sin(angle) + y * math.cos(angle))
+             for x, y in corners]
+    cropped, _ = crop_label(capture(label))
+    assert cropped is not None
+    assert 600 <= cropped.width <= 660 and 400 <= cropped.height <= 450
+    # Straightened: the label's white reaches into the crop's corners (inside the margin)
+    gray = np.asarray(cropped.convert('L'))
+    assert min(gray[20, 20], gray[20, -21], gray[-21, 20], gray[-21, -21]) > 200
+
+
+@pytest.mark.parametrize('label', [
+    None,  # No label in frame
+    [(480, 380), (480, 420), (520, 420), (520, 380)],  # Too small to be the label
+    [(5, 5), (5, 795), (995, 795), (995, 5)],  # Already fills the frame
+])
+def test_keeps_the_full_image_when_unsure(label):
+    cropped, info = crop_label(capture(label))
+    assert cropped is None and 'cropped_px' not in info
+
+
+def test_rejects_a_blob_that_is_not_label_shaped():
+    img = capture()
+    draw = ImageDraw.Draw(img)
+    draw.rectangle((100, 100, 250, 700), fill='white')  # L-shaped: fills too little of its corner quad
+    draw.rectangle((100, 550, 900, 700), fill='white')
+    assert find_label_quad(img)[0] is None
@@ -0,0 +1,101 @@
+import json
+import random
+import re
+
+import pytest
+
+from data_parser import DataParser
+from label_templates import KeywordMatcher, LabelTemplate, TemplateRegistry
+
+ACME = {
+    'name': 'acme',
+    'fingerprints': ['ACME & SONS', 'PALLET ID', 'LOT CODE'],
+    'min_hits': 2,
+    'fields': {
+        'sscc': {'keywords': ['PALLET ID'], 'patterns': [r'PALLET ID[\s:]*([0-9]{18})']},
+        'batch_no': {'keywords': ['LOT CODE'], 'patterns': [r'LOT CODE[\s:]+(\d+)|BATCH[\s:]+(\d+)',
+                                                            r'(?:LOT CODE|BATCH)[\s:]+(\d+)']},
+        'quantity': {'keywords': [], 'patterns': [r'(?:CASES|UNITS)[\s:]+(\d+)']},
+    },
+}
+BEVCO = {
+    'name': 'bevco',
+    'fingerprints': ['BEVCO', 'CONSIGNMENT'],
+    'min_hits': 2,
+    'fields': {'batch_no': {'keywords': [], 'patterns': [r'CONSIGNMENT\s+(\d+)']}},
+}
+
+ACME_LABEL = 'ACME & SONS\nPALLET ID: 000000000000222051\nLOT\nCODE 77\nBATCH: 123456\nUNITS: 40'
+BRIX_LABEL = 'BRIX & CO\nITEM NUMBER: BRI023A250SM200BMHP\nBATCH NO: 230415\n6SCC(00)000000000000222051'
+
+
+@pytest.fixture
+def parser(tmp_path):
+    path = tmp_path / 'templates.json'
+    path.write_text(json.dumps([ACME, BEVCO]))
+    p = DataParser()
+    assert p.templates.load(path, fields=p.field_configs) == ['acme', 'bevco']
+    return p
+
+
+def test_keyword_matcher_finds_what_a_naive_search_finds():
+    rng = random.Random(25)
+    for _ in range(500):
+        keywords = {''.join(rng.choice('AB ') for _ in range(rng.randint(1, 4))) for _ in range(rng.randint(1, 6))}
+        text = ''.join(rng.choice('AB C') for _ in range(rng.randint(0, 40)))
+        assert KeywordMatcher(keywords).find(text) == {k for k in keywords if k in text}
+
+
+def test_classify_picks_the_template_with_most_fingerprints(parser):
+    assert parser.templates.classify(parser.normalize_text(ACME_LABEL)).name == 'acme'
+    assert parser.templates.classify(parser.normalize_text('BEVCO\nCONSIGNMENT 5')).name == 'bevco'
+    assert parser.templates.classify(parser.normalize_text(BRIX_LABEL)).name == 'brix_recorp'
+    # One fingerprint is below min_hits - default layout
+    assert parser.templates.classify(parser.normalize_text('ACME & SONS\nITEM NUMBER: X')).name == 'brix_recorp'
+
+
+def test_fingerprints_match_across_symbols_and_line_breaks(parser):
+    # "ACME & SONS" normalizes to a run of spaces, "LOT CODE" is split over two lines
+    assert parser.templates.classify(parser.normalize_text('ACME & SONS\nLOT\nCODE 7')).name == 'acme'
+
+
+def test_parse_runs_only_the_template_extractors(parser):
+    result = parser.parse(ACME_LABEL)
+    assert result['template'] == 'acme'
+    assert result['parsed']['sscc'] == '000000000000222051'
+    assert result['parsed']['batch_no'] == '123456'  # BATCH branch of the leading group
+    assert result['parsed']['quantity'] == '40'
+    assert result['parsed']['item_number'] == ''  # not an acme field
+    assert parser.parse(BRIX_LABEL)['parsed']['item_number'] == 'BRI023A250SM200BMHP'
+
+
+def test_custom_template_patterns_match_like_re_search(parser):
+    template = parser.templates.get('acme')
+    compiled, locator = parser._compiled_template(template)
+    texts = [ACME_LABEL, 'LOT CODE: 5\nBATCH 6', 'BATCH: 9', 'CASES 3 UNITS 4', 'UNITS: 8\nPALLET ID 12']
+    for text in texts:
+        normalized = parser.normalize_text(text)
+        starts = [m.start() for m in locator.finditer(normalized)] if locator else []
+        for field, config in template.field_configs.items():
+            expected = parser._parse_field(normalized, text, config['patterns'], config['keywords'])
+            assert parser._match_field(normalized, compiled[field], starts) == expected, (text, field)
+    # Top-level alternation: the BATCH branch is found (its value is group 2, so the next pattern reads it)
+    normalized = parser.normalize_text('BATCH: 9')
+    assert re.search(ACME['fields']['batch_no']['patterns'][0], normalized).group(2) == '9'
+    assert parser.parse('ACME & SONS PALLET ID\nBATCH: 9')['parsed']['batch_no'] == '9'
+
+
+def test_unknown_fields_are_rejected():
+    registry = TemplateRegistry()
+    with pytest.raises(ValueError, match='colour'):
+        registry.register(LabelTemplate('x', {'colour': {'keywords': [], 'patterns': []}}), fields={'sscc': {}})
+
+
+def test_stats_count_parsed_labels_per_template(parser):
+    parser.parse(ACME_LABEL)
+    parser.parse(BRIX_LABEL)
+    parser.parse(BRIX_LABEL, record_stats=False)
+    stats = parser.templates.stats()['templates']
+    assert stats['acme']['labels'] == 1
+    assert stats['brix_recorp']['labels'] == 1
+    assert stats['acme']['field_hits']['sscc'] == 1
@@ -0,0 +1,67 @@
+import io
+import time
+
+from PIL import Image, ImageDraw
+
+from ocr_cache import OCRCache, _distance, dhash
+
+SETTINGS = 'ocrspace:engine2:eng'
+
+
+def jpeg(quality=85, text='SSCC 000000000000222051', offset=0):
+    img = Image.new('RGB', (400, 300), 'white')
+    draw = ImageDraw.Draw(img)
+    draw.rectangle((20 + offset, 20, 200 + offset, 120), fill='black')
+    draw.text((30, 200), text, fill='black')
+    buf = io.BytesIO()
+    img.save(buf, 'JPEG', quality=quality)
+    return buf.getvalue()
+
+
+def test_exact_hits_are_per_image_and_settings(tmp_path):
+    cache = OCRCache(tmp_path)
+    image = jpeg()
+    assert cache.get(image, SETTINGS) == (None, None)
+    cache.put(image, SETTINGS, 'ITEM NUMBER: X')
+    assert cache.get(image, SETTINGS) == ('ITEM NUMBER: X', 'exact')
+    assert cache.get(image, 'ocrspace:engine1:eng') == (None, None)
+    assert cache.get(jpeg(quality=84), SETTINGS) == (None, None)  # Near-duplicates are off by default
+    assert OCRCache(tmp_path).get(image, SETTINGS)[0] == 'ITEM NUMBER: X'  # Persisted
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['entries'], stats['hit_rate']) == (1, 3, 1, 0.25)
+
+
+def test_near_duplicate_re_shot(tmp_path):
+    cache = OCRCache(tmp_path, near_duplicates=True)
+    cache.put(jpeg(), SETTINGS, 'TEXT')
+    assert cache.get(jpeg(quality=84), SETTINGS) == ('TEXT', 'near')  # Same frame, different bytes
+    assert cache.get(jpeg(offset=150), SETTINGS) == (None, None)  # A different label
+    assert cache.get(b'not an image', SETTINGS) == (None, None)
+
+
+def test_near_duplicates_expire_sooner_than_exact_hits(tmp_path):
+    cache = OCRCache(tmp_path, near_duplicates=True, near_max_age_seconds=60)
+    image = jpeg()
+    cache.put(image, SETTINGS, 'TEXT')
+    cache._conn().execute('UPDATE ocr_cache SET created = ?', (time.time() - 120,))
+    assert cache.get(jpeg(quality=84), SETTINGS) == (None, None)
+    assert cache.get(image, SETTINGS) == ('TEXT', 'exact')
+
+
+def test_evict_expired_then_least_recently_hit(tmp_path):
+    cache = OCRCache(tmp_path, max_entries=2, max_age_days=1)
+    images = [jpeg(text=str(n)) for n in range(4)]
+    for n, image in enumerate(images):
+        cache.put(image, SETTINGS, str(n))
+    conn = cache._conn()
+    conn.execute('UPDATE ocr_cache SET created = ? WHERE text = ?', (time.time() - 2 * 86400, '0'))
+    conn.execute('UPDATE ocr_cache SET last_hit = last_hit - 10 WHERE text = ?', ('2',))
+    conn.commit()
+    assert cache.evict() == 2
+    assert [cache.get(image, SETTINGS)[0] for image in images] == [None, '1', None, '3']
+
+
+def test_dhash_distance():
+    assert _distance(dhash(jpeg()), dhash(jpeg(quality=84))) <= 2
+    assert _distance(dhash(jpeg()), dhash(jpeg(offset=150))) > 2
+    assert _distance(-1, 0) == 64
@@ -0,0 +1,89 @@
+from datetime import timedelta
+import io
+
+from PIL import Image
+import pytest
+import requests
+
+from ocr_cache import OCRCache
+from ocr_processor import OCRProcessor, _image_bytes
+
+JPEG = b'\xff\xd8\xff\xe0 not really a jpeg'
+
+
+class FakeResponse:
+    def __init__(self, payload):
+        self.payload = payload
+        self.elapsed = timedelta(milliseconds=120)
+
+    def json(self):
+        return self.payload
+
+
+class FakeSession:
+    """Stands in for the provider's pooled requests.Session: scripted responses / exceptions."""
+
+    def __init__(self, *results):
+        self.results = list(results)
+        self.posts = []
+
+    def post(self, url, **kwargs):
+        self.posts.append(kwargs)
+        result = self.results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return FakeResponse(result)
+
+
+def ocrspace_result(text, words=()):
+    lines = [{'Words': [{'WordText': t, 'Left': x, 'Top': 10, 'Width': 40, 'Height': 12} for t, x in words]}]
+    return {'OCRExitCode': 1, 'ParsedResults': [{'ParsedText': text, 'TextOverlay': {'Lines': lines}}]}
+
+
+def processor(*results, **options):
+    ocr = OCRProcessor('ocrspace', **options)
+    ocr._sessions['ocrspace'] = session = FakeSession(*results)
+    return ocr, session
+
+
+def test_image_bytes_passes_buffers_through(tmp_path):
+    assert _image_bytes(JPEG)[0] is JPEG
+    assert _image_bytes(memoryview(JPEG))[0] is JPEG  # Whole-buffer view: no copy
+    assert _image_bytes(memoryview(JPEG)[4:])[0] == JPEG[4:]
+    path = tmp_path / 'capture.jpg'
+    path.write_bytes(JPEG)
+    assert _image_bytes(str(path)) == (JPEG, 'capture.jpg')
+    data, name = _image_bytes(Image.new('L', (20, 10)))
+    assert name == 'image.jpg' and Image.open(io.BytesIO(data)).size == (20, 10)
+
+
+def test_process_in_memory_image():
+    ocr, session = processor(ocrspace_result('BATCH NO: 230415', words=[('BATCH', 5), ('NO:', 50)]), overlay=True)
+    assert ocr.process_image(memoryview(JPEG)) == 'BATCH NO: 230415'
+    assert session.posts[0]['files']['image'] == ('image.jpg', JPEG, 'image/jpeg')
+    assert session.posts[0]['data']['isOverlayRequired'] is True
+    assert [w['text'] for w in ocr.last_words()] == ['BATCH', 'NO:']
+    assert ocr.last_timings()['provider'] == 'ocrspace'
+    assert ocr.http_stats()['requests'] == 1
+
+
+def test_read_timeouts_are_retried():
+    ocr, session = processor(requests.exceptions.ReadTimeout(), ocrspace_result('TEXT'), attempts=2)
+    assert ocr.process_image(JPEG) == 'TEXT'
+    ocr, _ = processor(requests.exceptions.ReadTimeout(), attempts=1)
+    with pytest.raises(Exception, match='Read timed out'):
+        ocr.process_image(JPEG)
+
+
+def test_provider_error():
+    ocr, _ = processor({'OCRExitCode': 3, 'ErrorMessage': 'File failed validation'})
+    with pytest.raises(Exception, match='OCR.space API error: File failed validation'):
+        ocr.process_image(JPEG)
+
+
+def test_cached_bytes_skip_the_provider(tmp_path):
+    ocr, session = processor(ocrspace_result('TEXT'), cache=OCRCache(tmp_path))
+    assert ocr.process_image(bytearray(JPEG)) == 'TEXT'
+    assert ocr.last_cache_hit() is None
+    assert ocr.process_image(JPEG) == 'TEXT'
+    assert ocr.last_cache_hit() == 'exact' and len(session.posts) == 1
@@ -0,0 +1,68 @@
+import pytest
+
+from ocr_quota import BACKGROUND, LIVE, QuotaExceeded, QuotaScheduler, TokenBucket
+
+
+@pytest.mark.parametrize('per_minute', [1, 6, 10, 11, 12, 60])
+def test_small_buckets_still_serve_background(per_minute):
+    bucket = TokenBucket(per_minute)
+    assert bucket.capacity - bucket.reserve >= 1
+    assert bucket.acquire(BACKGROUND, timeout=0)
+
+
+def test_background_leaves_the_reserve_to_live():
+    bucket = TokenBucket(60)  # 10 tokens, 5 reserved
+    assert sum(bucket.acquire(BACKGROUND, timeout=0) for _ in range(10)) == 5
+    assert sum(bucket.acquire(LIVE, timeout=0) for _ in range(10)) == 5
+
+
+def scheduler(tmp_path, used=0, monthly=100, register=('ocrspace',)):
+    q = QuotaScheduler(tmp_path, {'ocrspace': {'monthly': monthly, 'per_minute': None},
+                                  'google': {'monthly': 1000, 'per_minute': None}})
+    for provider in register:
+        q.register(provider)
+    if used:
+        q.ledger.record('ocrspace', used)
+    return q
+
+
+def test_live_uses_the_whole_budget_without_a_fallback(tmp_path):
+    q = scheduler(tmp_path, used=96)
+    q.acquire('ocrspace', LIVE)  # google has limits but no processor registered it
+    assert q.month_used('ocrspace') == 97
+
+
+def test_live_moves_to_a_registered_fallback_near_the_limit(tmp_path):
+    q = scheduler(tmp_path, used=96, register=('ocrspace', 'google'))
+    with pytest.raises(QuotaExceeded):
+        q.acquire('ocrspace', LIVE)
+    q.acquire('google', LIVE)
+
+
+def test_monthly_budget_is_a_hard_limit(tmp_path):
+    q = scheduler(tmp_path, used=100)
+    with pytest.raises(QuotaExceeded, match='quota exceeded'):
+        q.acquire('ocrspace', LIVE)
+
+
+def test_background_stops_at_its_fraction(tmp_path):
+    q = scheduler(tmp_path, used=80, monthly=10000)
+    q.acquire('ocrspace', BACKGROUND)  # 80 of 10000 - but 80/day for a month would not run out
+    q = scheduler(tmp_path / 'b', used=80)
+    with pytest.raises(QuotaExceeded):
+        q.acquire('ocrspace', BACKGROUND)
+    assert q.counters['refused_budget'] == 1
+
+
+def test_usage_survives_a_restart(tmp_path):
+    q = scheduler(tmp_path)
+    for _ in range(3):
+        q.acquire('ocrspace', LIVE)
+    assert scheduler(tmp_path).month_used('ocrspace') == 3
+
+
+def test_providers_without_limits_are_never_refused(tmp_path):
+    q = scheduler(tmp_path)
+    for _ in range(5):
+        q.acquire('local-pool', LIVE)
+    assert q.counters['granted'] == 0
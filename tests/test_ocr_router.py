@@ -0,0 +1,130 @@
+import threading
+import time
+
+import pytest
+
+from ocr_quota import QuotaExceeded
+from ocr_router import CircuitBreaker, OCRDeadlineExceeded, OCRRouter
+
+
+class FakeProcessor:
+    """OCRProcessor stand-in: returns text after a delay, or raises error."""
+
+    def __init__(self, name, text='TEXT', delay=0.0, error=None):
+        self.api_provider = name
+        self.text = text
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+
+    def process_image(self, image, priority='live'):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return f'{self.text} {self.api_provider}'
+
+    def last_timings(self):
+        return {'ocr_ms': round(self.delay * 1000)}
+
+
+def router(*processors, **kwargs):
+    kwargs.setdefault('hedge_min_seconds', 0)
+    return OCRRouter(processors, **kwargs)
+
+
+def test_primary_answers():
+    primary, backup = FakeProcessor('primary'), FakeProcessor('backup')
+    ocr = router(primary, backup)
+    assert ocr.process_image(b'jpeg') == 'TEXT primary'
+    assert backup.calls == 0
+    assert ocr.last_timings() == {'ocr_ms': 0, 'provider': 'primary', 'hedged': False}
+    assert ocr.router_stats()['fallbacks'] == 0
+
+
+def test_failed_primary_falls_back():
+    primary = FakeProcessor('primary', error=RuntimeError('503'))
+    ocr = router(primary, FakeProcessor('backup'), hedge_after_seconds=10)
+    assert ocr.process_image(b'jpeg') == 'TEXT backup'  # No hedge wait after a failure
+    assert ocr.last_timings()['provider'] == 'backup'
+    stats = ocr.router_stats()
+    assert stats['fallbacks'] == 1
+    assert stats['providers']['primary']['error_rate'] == 1.0
+
+
+def test_slow_primary_is_hedged():
+    ocr = router(FakeProcessor('primary', delay=1), FakeProcessor('backup'), hedge_after_seconds=0.05)
+    started = time.monotonic()
+    assert ocr.process_image(b'jpeg') == 'TEXT backup'
+    assert time.monotonic() - started < 0.5
+    assert ocr.last_timings()['hedged'] is True
+    assert ocr.router_stats()['hedged'] == 1
+
+
+def test_all_providers_failing_raises_the_last_error():
+    ocr = router(FakeProcessor('primary', error=RuntimeError('primary down')),
+                 FakeProcessor('backup', error=RuntimeError('backup down')))
+    with pytest.raises(RuntimeError, match='backup down'):
+        ocr.process_image(b'jpeg')
+
+
+def test_deadline():
+    ocr = router(FakeProcessor('primary', delay=1), deadline_seconds=0.1)
+    started = time.monotonic()
+    with pytest.raises(OCRDeadlineExceeded):
+        ocr.process_image(b'jpeg')
+    assert time.monotonic() - started < 0.5
+    assert ocr.router_stats()['deadline_exceeded'] == 1
+
+
+def test_open_breaker_skips_the_provider():
+    primary = FakeProcessor('primary', error=RuntimeError('503'))
+    ocr = router(primary, FakeProcessor('backup'), failure_threshold=2, cooldown_seconds=60)
+    for _ in range(3):
+        assert ocr.process_image(b'jpeg') == 'TEXT backup'
+    assert primary.calls == 2
+    assert ocr.router_stats()['providers']['primary']['breaker'] == 'open'
+
+
+def test_all_breakers_open_still_tries_the_primary():
+    primary = FakeProcessor('primary', error=RuntimeError('503'))
+    ocr = router(primary, failure_threshold=1)
+    with pytest.raises(RuntimeError):
+        ocr.process_image(b'jpeg')
+    primary.error = None
+    assert ocr.process_image(b'jpeg') == 'TEXT primary'
+    assert ocr.breakers['primary'].state == 'closed'
+
+
+def test_quota_refusal_leaves_the_breaker_closed():
+    primary = FakeProcessor('primary', error=QuotaExceeded('quota'))
+    ocr = router(primary, FakeProcessor('backup'), failure_threshold=1)
+    assert ocr.process_image(b'jpeg') == 'TEXT backup'
+    assert ocr.breakers['primary'].state == 'closed'
+    assert ocr.router_stats()['quota_skips'] == 1
+
+
+def test_breaker_half_open_allows_one_probe():
+    breaker = CircuitBreaker(failure_threshold=2, cooldown_seconds=0.05)
+    breaker.failure()
+    assert breaker.state == 'closed'
+    breaker.failure()
+    assert breaker.state == 'open' and not breaker.allow()
+    time.sleep(0.06)
+    assert breaker.allow() and not breaker.allow()  # Only one probe
+    breaker.failure()  # A failed probe opens it again at once
+    assert breaker.state == 'open'
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.success()
+    assert breaker.state == 'closed'
+
+
+def test_timings_are_per_thread():
+    ocr = router(FakeProcessor('primary'))
+    ocr.process_image(b'jpeg')
+    seen = []
+    thread = threading.Thread(target=lambda: seen.append(ocr.last_timings()))
+    thread.start()
+    thread.join()
+    assert seen == [None] and ocr.last_timings()['provider'] == 'primary'
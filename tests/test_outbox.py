@@ -0,0 +1,112 @@
+from datetime import datetime, timedelta
+import threading
+import time
+
+import pytest
+
+from outbox import Outbox, OutboxDispatcher, is_quota_error
+
+
+class QuotaError(Exception):
+    def __init__(self):
+        super().__init__('429 Too Many Requests: Quota exceeded for quota metric')
+
+
+@pytest.fixture
+def outbox(tmp_path):
+    return Outbox(tmp_path, max_attempts=3, base_backoff=10)
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_is_quota_error():
+    assert is_quota_error(QuotaError())
+    assert is_quota_error(Exception('rateLimitExceeded'))
+    assert not is_quota_error(Exception('File not found'))
+
+
+def test_dependent_task_waits_for_its_dependency(outbox):
+    upload = outbox.enqueue('drive_upload', 'record_1')
+    outbox.enqueue('sheets_append', 'record_1', depends_on=upload)
+    assert outbox.claim_ready('sheets_append') == []
+    outbox.mark_done(upload)
+    assert [t['record_key'] for t in outbox.claim_ready('sheets_append')] == ['record_1']
+
+
+def test_failed_task_backs_off_then_dies(outbox):
+    task_id = outbox.enqueue('drive_upload', 'record_1', {'filename': 'a.jpg'})
+    outbox.mark_failed(task_id, Exception('boom'))
+    assert outbox.claim_ready('drive_upload') == []  # backing off ~10 s
+    outbox.mark_failed(task_id, Exception('boom'), retry_after=0)
+    [task] = outbox.claim_ready('drive_upload')
+    assert task['attempts'] == 2 and task['payload'] == {'filename': 'a.jpg'}
+    outbox.mark_failed(task_id, Exception('boom'))
+    assert outbox.stats() == {'drive_upload': {'dead': 1}}
+
+
+def test_backoff_doubles_up_to_the_cap(tmp_path):
+    outbox = Outbox(tmp_path, base_backoff=5, max_backoff=60)
+    assert 4 <= outbox.backoff(1) <= 6
+    assert 16 <= outbox.backoff(3) <= 24
+    assert 48 <= outbox.backoff(10) <= 72
+
+
+def test_prune_deletes_old_done_tasks_only(outbox):
+    done = outbox.enqueue('drive_upload', 'record_1')
+    outbox.enqueue('sheets_append', 'record_1', depends_on=done)
+    dead = outbox.enqueue('drive_upload', 'record_2')
+    outbox.mark_done(done)
+    for _ in range(3):
+        outbox.mark_failed(dead, Exception('boom'))
+    assert outbox.prune() == 0  # Finished just now
+    assert outbox.prune(now=datetime.now() + timedelta(days=8)) == 1
+    assert outbox.stats() == {'drive_upload': {'dead': 1}, 'sheets_append': {'pending': 1}}
+    # The dependent task still runs once its (deleted) dependency is gone
+    assert len(outbox.claim_ready('sheets_append')) == 1
+
+
+def test_dispatcher_runs_batches_and_pauses_a_kind_on_quota_errors(outbox):
+    calls = []
+
+    def sheets_append(tasks):
+        calls.append([t['record_key'] for t in tasks])
+        return {t['id']: QuotaError() for t in tasks}
+
+    dispatcher = OutboxDispatcher(outbox, {'sheets_append': sheets_append}, poll_interval=0.05, quota_pause=60)
+    for i in range(3):
+        outbox.enqueue('sheets_append', f'record_{i}')
+    dispatcher.start()
+    try:
+        assert wait_for(lambda: 'sheets_append' in dispatcher.stats()['paused'])
+        time.sleep(0.2)
+    finally:
+        dispatcher.stop()
+    assert calls == [['record_0', 'record_1', 'record_2']]  # One batch, then paused
+    assert 55 <= dispatcher.stats()['paused']['sheets_append'] <= 60
+    assert outbox.stats() == {'sheets_append': {'pending': 3}}
+
+
+def test_slow_kind_does_not_hold_up_the_others(outbox):
+    release = threading.Event()
+
+    def ocr_fill(tasks):
+        release.wait(5)
+        return {}
+
+    dispatcher = OutboxDispatcher(outbox, {'ocr_fill': ocr_fill, 'drive_upload': lambda tasks: {}}, poll_interval=0.05)
+    outbox.enqueue('ocr_fill', 'record_1')
+    outbox.enqueue('drive_upload', 'record_2')
+    dispatcher.start()
+    try:
+        assert wait_for(lambda: outbox.stats().get('drive_upload') == {'done': 1})
+        assert outbox.stats()['ocr_fill'] == {'pending': 1}
+    finally:
+        release.set()
+        dispatcher.stop()
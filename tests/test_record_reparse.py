@@ -0,0 +1,66 @@
+import json
+
+import pytest
+
+from record_reparse import CHECKPOINT_KEY, Reparser, changed_fields
+from record_store import RecordStore
+
+LABEL = "ITEM NUMBER: BRI023A250SM200BMHP\nBATCH NO: {batch}\n6SCC(00)000000000000222051"
+
+
+class Killed(Exception):
+    pass
+
+
+@pytest.fixture
+def store(tmp_path):
+    s = RecordStore(tmp_path)
+    for i in range(40):
+        s.save({'timestamp': f'2026-01-01T10:{i // 60:02d}:{i % 60:02d}', 'item_number': '', 'batch_no': '',
+                'raw_ocr_text': LABEL.format(batch=100000 + i)}, key=f'record_{i:03d}')
+    return s
+
+
+def test_changed_fields_only_new_differing_values():
+    record = {'item_number': 'OLD', 'batch_no': '123456', 'quantity': '40'}
+    parsed = {'item_number': 'NEW', 'batch_no': '123456', 'quantity': ''}
+    assert changed_fields(record, parsed) == {'item_number': 'NEW'}
+
+
+def test_changed_fields_keeps_barcode_fields_of_gs1_captures():
+    record = {'notes': 'SSCC from GS1 barcode', 'sscc': '000000000000222051', 'batch_no': '123456',
+              'ean_number': '', 'item_number': ''}
+    parsed = {'sscc': '000000000000222099', 'batch_no': '654321', 'ean_number': '9501234567890',
+              'item_number': 'BRI023A250SM200BMHP'}
+    assert changed_fields(record, parsed) == {'item_number': 'BRI023A250SM200BMHP'}
+    # Without the barcode note the same values are written
+    del record['notes']
+    assert set(changed_fields(record, parsed)) == {'sscc', 'batch_no', 'ean_number', 'item_number'}
+
+
+def test_killed_run_resumes_from_checkpoint(store):
+    def kill_after_first_chunk(progress):
+        raise Killed()
+
+    with pytest.raises(Killed):
+        Reparser(store, workers=1, chunk_size=10).run(on_progress=kill_after_first_chunk)
+    assert json.loads(store.get_meta(CHECKPOINT_KEY))['after_id'] == 10
+    assert store.get('record_009')['batch_no'] == '100009'
+    assert store.get('record_010')['batch_no'] == ''
+
+    reparser = Reparser(store, workers=1, chunk_size=10)
+    assert reparser.checkpoint() == 10
+    result = reparser.run()
+    assert result['started_after_id'] == 10
+    assert result['scanned'] == 30
+    assert result['changed'] == 30
+    assert all(record['batch_no'] == str(100000 + i) for i, (_, _, record) in enumerate(store.iter_records()))
+    assert store.get_meta(CHECKPOINT_KEY) == ''  # Finished - next run starts over
+
+
+def test_dry_run_writes_nothing(store):
+    result = Reparser(store, workers=1, chunk_size=25, dry_run=True).run()
+    assert result['changed'] == 40
+    assert result['by_field']['batch_no'] == 40
+    assert store.get('record_000')['batch_no'] == ''
+    assert not store.get_meta(CHECKPOINT_KEY)
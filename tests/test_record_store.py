@@ -0,0 +1,65 @@
+from datetime import datetime
+import json
+
+from record_store import RecordStore, get_store, record_key_for
+
+
+def record(ts, sscc='', status='CAPTURED', **fields):
+    return dict({'timestamp': ts, 'sscc': sscc, 'status': status}, **fields)
+
+
+def test_same_second_captures_get_distinct_keys(tmp_path):
+    store = RecordStore(tmp_path)
+    key = record_key_for(datetime(2026, 3, 1, 10, 15, 30))
+    assert key == 'record_20260301_101530'
+    first = store.save(record('2026-03-01T10:15:30.100', sscc='1'), key=key)
+    second = store.save(record('2026-03-01T10:15:30.900', sscc='2'), key=key)
+    third = store.save(record('2026-03-01T10:15:30.950', sscc='3'))
+    assert (first, second, third) == (key, key + '_2', key + '_3')
+    assert [store.get(k)['sscc'] for k in (first, second, third)] == ['1', '2', '3']
+    assert store.count() == 3
+
+
+def test_update_and_update_many(tmp_path):
+    store = RecordStore(tmp_path)
+    a = store.save(record('2026-03-01T10:00:00', sscc='111'))
+    b = store.save(record('2026-03-01T11:00:00'))
+    assert store.update(a, {'status': 'APPROVED'})['status'] == 'APPROVED'
+    assert store.update('missing', {'status': 'X'}) is None
+    assert store.update_many({b: {'sscc': '222'}, 'missing': {'sscc': '3'}}, meta={'checkpoint': 7}) == 1
+    assert store.sscc_exists('222') and store.get_meta('checkpoint') == '7'
+    # Indexed columns follow the merged fields: a is approved now, b has an SSCC
+    assert store.get_pending(datetime(2026, 1, 1)) == [store.get(b)]
+
+
+def test_range_and_duplicate_lookups(tmp_path):
+    store = RecordStore(tmp_path)
+    store.save(record('2026-03-01T09:00:00', sscc='000000000000222051', date='01/03/2026', time='06:00'))
+    store.save(record('2026-03-02T09:00:00', sscc='000000000000222052'))
+    store.save(record('2026-03-03T09:00:00'))  # No SSCC - incomplete capture
+    in_range = store.get_in_range(datetime(2026, 3, 1), datetime(2026, 3, 3))
+    assert [r['sscc'] for _, r in in_range] == ['000000000000222051', '000000000000222052']
+    assert len(store.get_in_range(datetime(2026, 3, 1), datetime(2026, 3, 4), require_sscc=False)) == 3
+    by_label = store.get_in_range(datetime(2026, 3, 1, 5), datetime(2026, 3, 1, 7), filter_by='label')
+    assert [r['sscc'] for _, r in by_label] == ['000000000000222051']
+    assert store.sscc_exists(' 000000000000222051 ')
+    assert not store.sscc_exists('000000000000222053') and not store.sscc_exists('')
+    assert sorted(store.all_ssccs()) == ['000000000000222051', '000000000000222052']
+
+
+def test_iter_records_in_id_order(tmp_path):
+    store = RecordStore(tmp_path)
+    keys = [store.save(record(f'2026-03-01T10:00:{i:02d}')) for i in range(7)]
+    rows = list(store.iter_records(chunk_size=3))
+    assert [key for _, key, _ in rows] == keys
+    assert [key for _, key, _ in store.iter_records(after_id=rows[4][0])] == keys[5:]
+
+
+def test_legacy_json_records_are_imported_once(tmp_path):
+    (tmp_path / 'record_20260301_101530.json').write_text(json.dumps(record('2026-03-01T10:15:30', sscc='9')))
+    (tmp_path / 'record_broken.json').write_text('{')
+    store = get_store(tmp_path)
+    assert store.get('record_20260301_101530')['sscc'] == '9'
+    assert store.get_meta('json_migrated')
+    assert store.import_json_dir() == (0, 2)  # Already imported / unreadable
+    assert get_store(tmp_path) is store
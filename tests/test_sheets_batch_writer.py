@@ -0,0 +1,86 @@
+import threading
+
+import pytest
+
+pytest.importorskip('gspread')
+
+from sheets_integration import COLUMNS, SheetsBatchWriter, SheetsIntegration, _col_letter, _rows_from_append_response
+
+
+class FakeWorksheet:
+    """Records append_rows calls and answers like values.append (rows land after next_row)."""
+
+    def __init__(self, next_row=2):
+        self.next_row = next_row
+        self.appends = []
+
+    def append_rows(self, rows):
+        self.appends.append(rows)
+        first, self.next_row = self.next_row, self.next_row + len(rows)
+        return {'updates': {'updatedRange': f"'APPROVED_RECORDS'!A{first}:R{self.next_row - 1}"}}
+
+
+class FakeSheets:
+    """add_captured_records like SheetsIntegration, recording each batch."""
+
+    def __init__(self, fail=False):
+        self.batches = []
+        self.fail = fail
+        self.next_row = 2
+
+    def add_captured_records(self, records):
+        self.batches.append([r['sscc'] for r in records])
+        if self.fail:
+            return {'success': False, 'error': 'quota'}
+        first, self.next_row = self.next_row, self.next_row + len(records)
+        return {'success': True, 'row_nums': list(range(first, self.next_row))}
+
+
+def test_rows_from_append_response():
+    assert _rows_from_append_response({'updates': {'updatedRange': 'APPROVED_RECORDS!A101:R103'}}) == (101, 103)
+    assert _rows_from_append_response({'updates': {'updatedRange': "'PENDING_REVIEW'!A7:R7"}}) == (7, 7)
+    assert _rows_from_append_response({}) == (None, None)
+    assert _rows_from_append_response(None) == (None, None)
+
+
+def test_col_letter():
+    assert [_col_letter(n) for n in (1, 11, 26, 27, 52)] == ['A', 'K', 'Z', 'AA', 'AZ']
+
+
+def test_add_captured_records_in_one_append():
+    sheets = SheetsIntegration()
+    sheets.spreadsheet = object()
+    worksheet = FakeWorksheet(next_row=40)
+    sheets.get_or_create_sheet = lambda name: worksheet
+    result = sheets.add_captured_records([{'sscc': '1', 'status': 'PENDING'}, {'sscc': '2', 'notes': None}])
+    assert result == {'success': True, 'row_nums': [40, 41]}
+    [rows] = worksheet.appends
+    assert [row[COLUMNS.index('status')] for row in rows] == ['CAPTURED', 'CAPTURED']
+    assert rows[1][COLUMNS.index('notes')] == '' and len(rows[0]) == len(COLUMNS)
+    assert SheetsIntegration().add_captured_records([{}]) == {'success': False, 'error': 'No spreadsheet connected'}
+
+
+def test_batch_writer_coalesces_concurrent_submits():
+    sheets = FakeSheets()
+    writer = SheetsBatchWriter(sheets, window_seconds=0.2)
+    results = [None] * 5
+
+    def _submit(i):
+        results[i] = writer.add_captured_record({'sscc': str(i)}, timeout=5)
+
+    threads = [threading.Thread(target=_submit, args=(i,)) for i in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(sheets.batches) == 1 and sorted(sheets.batches[0]) == ['0', '1', '2', '3', '4']
+    # Each caller gets the row its own record landed on
+    assert sorted(r['row_num'] for r in results) == [2, 3, 4, 5, 6]
+    assert all(r['row_num'] == 2 + sheets.batches[0].index(str(i)) for i, r in enumerate(results))
+
+
+def test_batch_writer_flushes_at_max_batch_and_reports_errors():
+    sheets = FakeSheets(fail=True)
+    writer = SheetsBatchWriter(sheets, window_seconds=5, max_batch=2)
+    futures = [writer.submit({'sscc': str(i)}) for i in range(2)]
+    assert [f.result(timeout=2) for f in futures] == [{'success': False, 'error': 'quota'}] * 2
@@ -0,0 +1,81 @@
+import threading
+
+import pytest
+
+from sscc_index import BloomFilter, SSCCIndex
+
+
+class FakeSheets:
+    """SSCC columns per sheet; get_sscc_values reads from start_row like SheetsIntegration."""
+
+    def __init__(self, **columns):
+        self.columns = {name: list(values) for name, values in columns.items()}
+        self.reads = []
+
+    def get_sscc_values(self, sheet_name, start_row=2):
+        self.reads.append((sheet_name, start_row))
+        rows = self.columns.get(sheet_name, [])[start_row - 2:]
+        return [v.strip() for v in rows if v.strip()], start_row + len(rows)
+
+
+@pytest.mark.parametrize('use_bloom', [False, True])
+def test_duplicate_lookups(use_bloom):
+    index = SSCCIndex(use_bloom=use_bloom, bloom_capacity=100)
+    sheets = FakeSheets(PENDING_REVIEW=['000000000000222051', ''], APPROVED_RECORDS=['000000000000222052 '])
+    assert index.build(['000000000000222053', None, ' '], sheets) == 3
+    assert index.ready
+    for sscc in ('000000000000222051', ' 000000000000222052', '000000000000222053'):
+        assert sscc in index
+    assert '000000000000222054' not in index
+    assert '' not in index and None not in index
+    index.add('000000000000222054')
+    assert '000000000000222054' in index and len(index) == 4
+
+
+def test_empty_index_is_ready():
+    index = SSCCIndex()
+    assert not index.ready
+    assert index.build([], FakeSheets()) == 0
+    assert index.ready and '000000000000222051' not in index
+
+
+def test_refresh_reads_only_new_rows():
+    sheets = FakeSheets(PENDING_REVIEW=['000000000000222051'], APPROVED_RECORDS=[])
+    index = SSCCIndex()
+    index.build([], sheets)
+    sheets.columns['PENDING_REVIEW'] += ['000000000000222052', '000000000000222051']
+    sheets.reads.clear()
+    assert index.refresh_from_sheets(sheets) == 1  # The repeated SSCC isn't new
+    assert sheets.reads == [('PENDING_REVIEW', 3), ('APPROVED_RECORDS', 2)]
+    assert '000000000000222052' in index
+    assert index.refresh_from_sheets(sheets) == 0
+    assert index.stats()['size'] == 2
+
+
+def test_submits_during_a_build_are_kept():
+    started, release = threading.Event(), threading.Event()
+
+    class SlowSheets(FakeSheets):
+        def get_sscc_values(self, sheet_name, start_row=2):
+            started.set()
+            release.wait(5)
+            return super().get_sscc_values(sheet_name, start_row)
+
+    index = SSCCIndex()
+    builder = threading.Thread(target=index.build, args=([], SlowSheets(PENDING_REVIEW=['000000000000222051'])))
+    builder.start()
+    started.wait(5)
+    index.add('000000000000222059')  # Submitted while the sheets were being read
+    release.set()
+    builder.join()
+    assert '000000000000222059' in index and '000000000000222051' in index
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    items = [f'{n:018d}' for n in range(1000)]
+    for item in items:
+        bloom.add(item)
+    assert all(item in bloom for item in items)
+    false_positives = sum(f'{n:018d}' in bloom for n in range(1000, 11000))
+    assert false_positives < 300  # ~1% expected
@@ -3,13 +3,16 @@ Pallet Ticket Capture - Web Application
 Complete rewrite for online deployment
 """
 
-from flask import Flask, render_template, render_template_string, request, jsonify, send_from_directory, send_file
+from flask import Flask, Response, render_template, render_template_string, request, jsonify, send_from_directory, send_file, stream_with_context
 from flask_cors import CORS
 from jinja2 import TemplateNotFound
 import os
 import json
 import base64
 import io
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
 
@@ -20,18 +23,35 @@ import numpy as np
 
 # Import modules
 from ocr_processor import OCRProcessor
-from sheets_integration import SheetsIntegration
+from ocr_cache import OCRCache
+from ocr_router import OCRRouter
+from ocr_quota import QuotaScheduler
+from tesseract_pool import pool_stats as tesseract_pool_stats
+import barcode_reader
+from label_crop import crop_label
+from field_reocr import FieldReOCR, DEFAULT_FIELDS as REOCR_FIELDS
+from sheets_integration import SheetsIntegration, SheetsBatchWriter
 from data_parser import DataParser
+from item_catalog import ItemCatalog
+from label_templates import TemplateRegistry
+from record_store import get_store, record_key_for
+from record_reparse import Reparser
+from sscc_index import SSCCIndex
+from sheets_mirror import SheetsMirror
+from image_encoder import encode_under, decode_reduced
+from job_queue import JobQueue, QueueFullError
+from outbox import Outbox, OutboxDispatcher
 try:
-    from drive_integration import upload_to_drive, get_date_folder_name
+    from drive_integration import upload_to_drive, get_date_folder_name, get_drive_client
     _DRIVE_AVAILABLE = True
 except ImportError as e:
     _DRIVE_AVAILABLE = False
     def upload_to_drive(*a, **kw):
         return None, str(e)
-    def get_date_folder_name():
-        now = datetime.now(NZ_TZ)
+    def get_date_folder_name(when=None):
+        now = when or datetime.now(NZ_TZ)
         return now.strftime('%Y-%m-%d')
+    get_drive_client = None
 
 # Use paths relative to this file so templates are found on Render
 _BASE = Path(__file__).resolve().parent
@@ -81,12 +101,54 @@ CONFIG = {
     'smtp_user': os.getenv('SMTP_USER'),
     'smtp_password': os.getenv('SMTP_PASSWORD'),
     'report_secret': os.getenv('REPORT_SECRET'),  # Optional: require ?secret=X to trigger auto-report
+    'sscc_refresh_seconds': int(os.getenv('SSCC_REFRESH_SECONDS', '300')),  # Incremental Sheets refresh of SSCC index
+    'sscc_bloom': os.getenv('SSCC_BLOOM', 'false').lower() == 'true',
+    'ocr_cache': os.getenv('OCR_CACHE', 'true').lower() == 'true',  # Reuse OCR text for identical image bytes
+    'ocr_cache_near': os.getenv('OCR_CACHE_NEAR', 'false').lower() == 'true',  # Also near-identical re-shoots (dHash)
+    'ocr_cache_max_entries': int(os.getenv('OCR_CACHE_MAX_ENTRIES', '5000')),
+    'ocr_cache_days': int(os.getenv('OCR_CACHE_DAYS', '30')),
+    'ocr_workers': int(os.getenv('OCR_WORKERS', '2')),  # Background OCR jobs running at once (async submit)
+    'ocr_queue_max': int(os.getenv('OCR_QUEUE_MAX', '20')),  # Pending async jobs before /api/submit returns 503
+    'ocr_fallback_providers': [p.strip() for p in os.getenv('OCR_FALLBACK_PROVIDERS', '').split(',') if p.strip()],  # Hedge / fail over to these (key: OCR_API_KEY_<PROVIDER>)
+    'ocr_deadline_seconds': float(os.getenv('OCR_DEADLINE_SECONDS', '60')),  # Hard limit for one OCR call across all providers
+    'ocr_local_workers': int(os.getenv('OCR_LOCAL_WORKERS', '0')) or None,  # Warm Tesseract engines for 'local-pool' (default: CPU count)
+    'barcode_fast_path': os.getenv('BARCODE_FAST_PATH', 'true').lower() == 'true',  # GS1 barcode SSCC -> skip OCR (rest filled in background)
+    'label_crop': os.getenv('LABEL_CROP', 'true').lower() == 'true',  # Crop + straighten to the label before the OCR encode
+    'field_reocr': os.getenv('FIELD_REOCR', 'true').lower() == 'true',  # Re-OCR just the value region of missing fields
+    'field_reocr_fields': [f.strip() for f in os.getenv('FIELD_REOCR_FIELDS', ','.join(REOCR_FIELDS)).split(',') if f.strip()],
+    'ocr_quota': os.getenv('OCR_QUOTA', 'true').lower() == 'true',  # Monthly budget ledger + rate limiting per OCR provider
+    'ocr_quota_live_fraction': float(os.getenv('OCR_QUOTA_LIVE_FRACTION', '0.95')),  # Live captures move to a fallback past this share
+    'ocr_quota_background_fraction': float(os.getenv('OCR_QUOTA_BACKGROUND_FRACTION', '0.8')),  # Background OCR stops past this share
+    'label_templates': os.getenv('LABEL_TEMPLATES', ''),  # Other customers' label layouts: template JSON file or directory
+    'item_catalog': os.getenv('ITEM_CATALOG', ''),  # Item master CSV/JSON (item_number, item_description, ean_number, customer_item_number)
+    'ocr_hedge_seconds': float(os.getenv('OCR_HEDGE_SECONDS', '15')),  # Hedge delay until a provider has latency history (then its p95)
+    'sse_max_seconds': int(os.getenv('SSE_MAX_SECONDS', '300')),  # Close SSE streams after this; browser reconnects
+    'write_behind': os.getenv('WRITE_BEHIND', 'true').lower() == 'true',  # Queue Drive/Sheets writes in the outbox
+    'outbox_keep_days': int(os.getenv('OUTBOX_KEEP_DAYS', '7')),  # Finished outbox tasks are deleted after this
+    'sheets_batch_window': float(os.getenv('SHEETS_BATCH_WINDOW', '0.5')),  # Seconds to coalesce Sheets appends
+    'drive_upload_workers': int(os.getenv('DRIVE_UPLOAD_WORKERS', '4')),  # Parallel Drive uploads when draining the outbox
+    'drive_share_files': os.getenv('DRIVE_SHARE_FILES', 'false').lower() == 'true',  # Per-file link grants (batched) on top of the folder share
+    'sheets_mirror_seconds': int(os.getenv('SHEETS_MIRROR_SECONDS', '60')),  # Incremental Sheets mirror sync (0 = off)
+    'sheets_reconcile_seconds': int(os.getenv('SHEETS_RECONCILE_SECONDS', '1800')),  # Full checksum reconcile
 }
 
 # Initialize components
 ocr = None
+ocr_quota = None  # QuotaScheduler shared by all OCR providers
 parser = None
+item_catalog = None  # ItemCatalog - item code correction + item fields from the item master
+label_templates = None  # TemplateRegistry - label layouts the parser classifies OCR text into
+field_reocr = None  # FieldReOCR - second pass for fields the first OCR missed
 sheets = None
+store = None
+sscc_index = None
+jobs = None
+outbox = None
+outbox_dispatcher = None
+sheets_writer = None
+sheets_mirror = None
+reparser = None  # Reparser of the last /api/reparse run
+drive_client = None
 
 
 def _log(msg):
@@ -101,15 +163,70 @@ def _log(msg):
 
 def init_components():
     """Initialize OCR, parser, and Sheets"""
-    global ocr, parser, sheets
+    global ocr, ocr_quota, parser, item_catalog, label_templates, field_reocr, sheets, store, sscc_index, jobs, outbox, outbox_dispatcher, sheets_writer, sheets_mirror, drive_client
     
-    # Initialize parser
-    parser = DataParser()
+    # Item master catalog - optional, parsing works without it
+    if CONFIG['item_catalog']:
+        try:
+            item_catalog = ItemCatalog.load(CONFIG['item_catalog'])
+            print(f"[OK] Item catalog: {len(item_catalog)} items from {CONFIG['item_catalog']}")
+        except Exception as e:
+            print(f"[WARN] Item catalog disabled: {e}")
+    
+    # Initialize parser (built-in Brix & Co / Recorp layout plus any configured label templates)
+    label_templates = TemplateRegistry()
+    parser = DataParser(catalog=item_catalog, templates=label_templates)
+    if CONFIG['label_templates']:
+        try:
+            names = label_templates.load(CONFIG['label_templates'], fields=parser.field_configs)
+            print(f"[OK] Label templates: {', '.join(names) or 'none'} from {CONFIG['label_templates']}")
+        except Exception as e:
+            print(f"[WARN] Label templates not loaded: {e}")
+    
+    # OCR result cache (content-addressed) - optional, OCR works without it
+    ocr_cache = None
+    if CONFIG['ocr_cache']:
+        try:
+            ocr_cache = OCRCache(
+                CONFIG['local_records_dir'],
+                max_entries=CONFIG['ocr_cache_max_entries'],
+                max_age_days=CONFIG['ocr_cache_days'],
+                near_duplicates=CONFIG['ocr_cache_near'],
+            )
+        except Exception as e:
+            print(f"[WARN] OCR cache disabled: {e}")
+    
+    # OCR quota ledger / scheduler - optional, OCR works without it
+    if CONFIG['ocr_quota']:
+        try:
+            ocr_quota = QuotaScheduler(
+                CONFIG['local_records_dir'],
+                _ocr_quota_limits(),
+                live_fraction=CONFIG['ocr_quota_live_fraction'],
+                background_fraction=CONFIG['ocr_quota_background_fraction'],
+            )
+        except Exception as e:
+            print(f"[WARN] OCR quota scheduler disabled: {e}")
     
-    # Initialize OCR
+    # Initialize OCR - primary plus optional fallbacks behind the hedging router (bounded by the deadline)
     try:
-        ocr = OCRProcessor(api_provider=CONFIG['ocr_provider'], api_key=CONFIG['ocr_api_key'])
-        print(f"[OK] OCR initialized: {CONFIG['ocr_provider']}")
+        deadline = CONFIG['ocr_deadline_seconds']
+        processors = [OCRProcessor(api_provider=CONFIG['ocr_provider'], api_key=CONFIG['ocr_api_key'],
+                                   cache=ocr_cache, timeout=deadline, attempts=1,
+                                   local_workers=CONFIG['ocr_local_workers'], overlay=CONFIG['field_reocr'],
+                                   quota=ocr_quota)]
+        for provider in CONFIG['ocr_fallback_providers']:
+            if provider.lower() == processors[0].api_provider:
+                continue
+            api_key = os.getenv(f"OCR_API_KEY_{provider.upper()}", CONFIG['ocr_api_key'])
+            processors.append(OCRProcessor(api_provider=provider, api_key=api_key, cache=ocr_cache,
+                                           timeout=deadline, attempts=1, local_workers=CONFIG['ocr_local_workers'],
+                                           overlay=CONFIG['field_reocr'], quota=ocr_quota))
+        ocr = OCRRouter(processors, deadline_seconds=deadline, hedge_after_seconds=CONFIG['ocr_hedge_seconds'])
+        if CONFIG['field_reocr']:
+            field_reocr = FieldReOCR(ocr, parser, fields=CONFIG['field_reocr_fields'])
+        threading.Thread(target=_warm_up_ocr, daemon=True).start()
+        print(f"[OK] OCR initialized: {', '.join(p.api_provider for p in processors)} (deadline {deadline:g}s)")
     except Exception as e:
         print(f"[ERROR] OCR initialization error: {e}")
         ocr = None
@@ -144,54 +261,236 @@ def init_components():
             sheets = None
     else:
         print("[INFO] Google Sheets not configured - records will be saved locally only")
+    if sheets:
+        # Concurrent captures share one append_rows call instead of an append + full re-read each
+        sheets_writer = SheetsBatchWriter(sheets, window_seconds=CONFIG['sheets_batch_window'])
     
     # Create directories (use persistent paths when IMAGES_FOLDER/LOCAL_RECORDS_DIR set)
     Path(CONFIG['images_folder']).mkdir(parents=True, exist_ok=True)
     Path(CONFIG['local_records_dir']).mkdir(parents=True, exist_ok=True)
+    # Indexed local record store (imports legacy record_*.json files on first open)
+    store = get_store(CONFIG['local_records_dir'])
     img_resolved = str(Path(CONFIG['images_folder']).resolve())
     rec_resolved = str(Path(CONFIG['local_records_dir']).resolve())
-    _log(f"[Init] Storage: images={img_resolved}, records={rec_resolved}")
+    _log(f"[Init] Storage: images={img_resolved}, records={rec_resolved} ({store.count()} records in {store.db_path.name})")
+
+    # Drive client - cached credentials/service and date-folder ids; tomorrow's folder made ahead of 7am
+    if _DRIVE_AVAILABLE and _drive_creds_available():
+        drive_client = get_drive_client(
+            credentials_file=CONFIG.get('credentials_file'),
+            credentials_json=CONFIG.get('credentials_json'),
+            root_folder_id=CONFIG.get('drive_root_folder_id'),
+            cache_dir=CONFIG['local_records_dir'],
+            max_workers=CONFIG['drive_upload_workers'],
+            share_files=CONFIG['drive_share_files']
+        )
+        drive_client.start_prefetch_timer()
+
+    # Durable write-behind outbox for Drive uploads and Sheets appends (survives restarts)
+    if CONFIG['write_behind']:
+        outbox = Outbox(CONFIG['local_records_dir'], keep_done_days=CONFIG['outbox_keep_days'])
+        outbox_dispatcher = OutboxDispatcher(
+            outbox,
+            {
+                'ocr_fill': _outbox_ocr_fill,
+                'drive_upload': _outbox_drive_upload,
+                'sheets_append': _outbox_sheets_append,
+            },
+        )
+        outbox_dispatcher.start()
+        _log(f"[Init] Outbox: {outbox.db_path} {outbox.stats()}")
+
+    if CONFIG['barcode_fast_path']:
+        if barcode_reader.decoder_available():
+            _log("[Init] Barcode fast path on (GS1 SSCC barcode skips OCR)")
+        else:
+            _log("[Init] Barcode fast path off: install zxing-cpp (or pyzbar) to decode GS1 barcodes")
+
+    # Async submit worker pool (OCR + parse off the request thread)
+    jobs = JobQueue(max_workers=CONFIG['ocr_workers'], max_pending=CONFIG['ocr_queue_max'])
+
+    # SSCC duplicate index - built in background so a slow Sheets read doesn't block startup
+    sscc_index = SSCCIndex(use_bloom=CONFIG['sscc_bloom'])
+    threading.Thread(target=_build_sscc_index, daemon=True).start()
+
+    # Local mirror of the Sheets worksheets - /api/pending reads from it instead of get_all_values()
+    if sheets and CONFIG['sheets_mirror_seconds'] > 0:
+        sheets_mirror = SheetsMirror(CONFIG['local_records_dir'], sheets)
+        threading.Thread(target=_start_sheets_mirror, daemon=True).start()
+
+
+def _build_sscc_index():
+    try:
+        n = sscc_index.build(store.all_ssccs(), sheets)
+        _log(f"[Init] SSCC index ready: {n} SSCCs")
+        if sheets and CONFIG['sscc_refresh_seconds'] > 0:
+            sscc_index.start_refresh_timer(sheets, CONFIG['sscc_refresh_seconds'], local_ssccs_fn=store.all_ssccs)
+    except Exception as e:
+        _log(f"[Init] SSCC index build failed (falling back to direct lookups): {e}")
+
+
+# Provider budgets: OCR.space free tier 25,000/month (the shared 'helloworld' demo key is far
+# stricter), Google Vision free tier 1,000/month. Override with OCR_MONTHLY_LIMIT_<PROVIDER> /
+# OCR_RATE_PER_MINUTE_<PROVIDER> (0 = unlimited). Local Tesseract has no limits.
+_OCR_QUOTA_DEFAULTS = {
+    'ocrspace': {'monthly': 25000, 'per_minute': 60},
+    'google': {'monthly': 1000, 'per_minute': 60},
+    'tesseractspace': {'monthly': None, 'per_minute': None},
+}
+
+
+def _ocr_quota_limits():
+    limits = {}
+    for provider, defaults in _OCR_QUOTA_DEFAULTS.items():
+        if provider == 'ocrspace' and not CONFIG['ocr_api_key']:
+            defaults = dict(defaults, per_minute=10)  # Shared demo key - throttle hard
+        monthly = int(os.getenv(f"OCR_MONTHLY_LIMIT_{provider.upper()}", defaults['monthly'] or 0))
+        per_minute = int(os.getenv(f"OCR_RATE_PER_MINUTE_{provider.upper()}", defaults['per_minute'] or 0))
+        if monthly or per_minute:
+            limits[provider] = {'monthly': monthly or None, 'per_minute': per_minute or None}
+    return limits
+
+
+def _warm_up_ocr():
+    connect_ms = ocr.warm_up()
+    if connect_ms is not None:
+        _log(f"[Init] OCR connection warmed up ({CONFIG['ocr_provider']}, connect {connect_ms} ms)")
+
+
+def _start_sheets_mirror():
+    try:
+        added = sheets_mirror.sync()
+        _log(f"[Init] Sheets mirror ready (+{added} rows): {sheets_mirror.stats()['rows']}")
+    except Exception as e:
+        _log(f"[Init] Sheets mirror sync failed (reading Sheets directly until it succeeds): {e}")
+    sheets_mirror.start_sync_timer(CONFIG['sheets_mirror_seconds'], CONFIG['sheets_reconcile_seconds'])
+
+
+def _sheets_pending_records():
+    """Sheets records for display - from the local mirror when it has synced, else a direct read."""
+    if sheets_mirror is not None and sheets_mirror.ready:
+        return sheets_mirror.get_pending_records()
+    return sheets.get_pending_records()
+
+
+def _drive_creds_available():
+    return bool(
+        (CONFIG.get('credentials_json') and CONFIG['credentials_json'].strip()) or
+        (CONFIG.get('credentials_file') and os.path.exists(CONFIG.get('credentials_file', '')))
+    )
+
+
+def _outbox_ocr_fill(tasks):
+    """
+    Outbox batch handler: OCR barcode fast-path captures in the background and fill the fields the
+    barcode doesn't carry (item number, description, ...). Barcode values are never overwritten.
+    """
+    if not ocr:
+        err = Exception('OCR not initialized')
+        return {t['id']: err for t in tasks}
+
+    def _fill(task):
+        record = store.get(task['record_key'])
+        if record is None:
+            return None  # Deleted locally - nothing to fill
+        ocr_text = ocr.process_image(task['payload']['image_path'], priority='background')
+        parsed = parser.parse(ocr_text)['parsed']
+        fields = {k: v for k, v in parsed.items() if v and not record.get(k)}
+        fields['raw_ocr_text'] = ocr_text
+        fields['notes'] = (record.get('notes') or '').replace(' (OCR pending)', '')
+        store.update(task['record_key'], fields)
+        return fields
+
+    errors = {}
+    with ThreadPoolExecutor(max_workers=max(1, min(len(tasks), CONFIG['ocr_workers']))) as pool:
+        futures = [(task, pool.submit(_fill, task)) for task in tasks]
+    for task, future in futures:
+        try:
+            future.result()
+        except Exception as e:
+            errors[task['id']] = e
+    filled = len(tasks) - len(errors)
+    if filled:
+        _log(f"[Outbox] OCR filled {filled} barcode capture(s)")
+    return errors
+
+
+def _outbox_drive_upload(tasks):
+    """Outbox batch handler: upload the capture images in parallel, then point each local record at its Drive URL."""
+    if drive_client is None:
+        err = Exception('Drive not available')
+        return {t['id']: err for t in tasks}
+    results = drive_client.upload_many([{
+        'file_path': t['payload']['image_path'],
+        'filename': t['payload']['filename'],
+        'folder_name': t['payload'].get('folder'),
+        'check_existing': t['attempts'] > 0,  # An earlier attempt may have created the file
+    } for t in tasks])
+    errors = {}
+    for task, (drive_url, drive_err) in zip(tasks, results):
+        if not drive_url:
+            errors[task['id']] = drive_err if isinstance(drive_err, Exception) else Exception(drive_err or 'Drive upload failed')
+            continue
+        store.update(task['record_key'], {'image_drive_url': drive_url, 'image_path': drive_url})
+    uploaded = len(tasks) - len(errors)
+    if uploaded:
+        _log(f"[Outbox] Uploaded {uploaded} image(s) to Drive")
+    return errors
+
+
+def _outbox_sheets_append(tasks):
+    """Outbox batch handler: append the (latest) local records to APPROVED_RECORDS in one append_rows call."""
+    if not sheets:
+        err = Exception('Sheets not connected')
+        return {t['id']: err for t in tasks}
+    batch = [(t, store.get(t['record_key'])) for t in tasks]
+    batch = [(t, r) for t, r in batch if r is not None]  # Deleted locally - nothing to append
+    if not batch:
+        return {}
+    result = sheets.add_captured_records([r for _, r in batch])
+    if not result.get('success'):
+        err = Exception(result.get('error', 'Sheets append failed'))
+        return {t['id']: err for t, _ in batch}
+    _log(f"[Outbox] {len(batch)} record(s) submitted to Google Sheets (Rows {result['row_nums'][0]}-{result['row_nums'][-1]})")
+    return {}
+
+# Longest side sent to OCR; ingest decodes straight to about this size
+OCR_MAX_DIM = 800
+
+# Capture images are written here while OCR runs on the in-memory JPEG
+_image_writer = ThreadPoolExecutor(max_workers=2, thread_name_prefix='image-write')
+
 
 def resize_for_ocr(img, max_size_kb=900):
     """
     Resize and compress image to stay under OCR.space 1MB limit.
     img: PIL Image. Returns jpeg_bytes guaranteed under limit.
     """
-    target_bytes = max_size_kb * 1024
-    width, height = img.size
-    
-    for max_dim in [800, 720, 600, 480, 400]:
-        for quality in [85, 80, 75, 65, 55]:
-            if width > max_dim or height > max_dim:
-                scale = max_dim / max(width, height)
-                new_w = int(width * scale)
-                new_h = int(height * scale)
-                resized = img.resize((new_w, new_h), Image.Resampling.LANCZOS)
-            else:
-                resized = img
-            buf = io.BytesIO()
-            resized.convert('RGB').save(buf, 'JPEG', quality=quality, optimize=True)
-            buf_bytes = buf.getvalue()
-            if len(buf_bytes) < target_bytes:
-                return buf_bytes
-    
-    resized = img.resize((480, 360), Image.Resampling.LANCZOS)
-    buf = io.BytesIO()
-    resized.convert('RGB').save(buf, 'JPEG', quality=50)
-    return buf.getvalue()
+    return _encode_for_ocr(img, max_size_kb)[0]
 
 
-# Initialize on startup (wrap to avoid blocking deploy)
-try:
-    print("=" * 60)
-    print("Starting Pallet Ticket Capture Web Application")
-    print("=" * 60)
-    init_components()
-    print("=" * 60)
-except Exception as e:
-    print(f"[WARN] Init error (app will start anyway): {e}")
-    import traceback
-    traceback.print_exc()
+def _encode_for_ocr(img, max_size_kb=900):
+    """resize_for_ocr plus encoder info (attempts, quality, size)."""
+    jpeg_bytes, info = encode_under(img, max_size_kb * 1024, max_dim=OCR_MAX_DIM)
+    _log(f"[Submit] Encoded {info['width']}x{info['height']} q{info['quality']} "
+         f"{info['bytes'] // 1024}KB in {info['attempts']} attempt(s)")
+    return jpeg_bytes, info
+
+
+# Initialize on startup (wrap to avoid blocking deploy). Not in spawned worker processes (Tesseract
+# pool, reparse): started as `python web_app.py`, each worker re-imports this script as __mp_main__
+# and would otherwise run its own Sheets connection, outbox dispatcher, timers and OCR pools.
+if __name__ != '__mp_main__':
+    try:
+        print("=" * 60)
+        print("Starting Pallet Ticket Capture Web Application")
+        print("=" * 60)
+        init_components()
+        print("=" * 60)
+    except Exception as e:
+        print(f"[WARN] Init error (app will start anyway): {e}")
+        import traceback
+        traceback.print_exc()
 
 @app.route('/health')
 def health():
@@ -202,19 +501,64 @@ def health():
 @app.route('/diagnostics')  # Simpler URL in case /api/ has issues
 def diagnostics():
     """Check Google config (no secrets). Use this to see why Sheets/Drive might not work."""
-    has_creds = bool(
-        (CONFIG.get('credentials_json') and CONFIG['credentials_json'].strip()) or
-        (CONFIG.get('credentials_file') and os.path.exists(CONFIG.get('credentials_file', '')))
-    )
+    has_creds = _drive_creds_available()
     return jsonify({
         'sheets_connected': sheets is not None,
         'sheets_id_set': bool(CONFIG.get('sheets_id')),
         'drive_creds_available': has_creds,
         'drive_root_folder_id_set': bool(CONFIG.get('drive_root_folder_id')),
         'ocr_ready': ocr is not None,
+        'ocr_http': ocr.http_stats() if ocr is not None and hasattr(ocr, 'http_stats') else None,
+        'ocr_cache': ocr.cache.stats() if getattr(ocr, 'cache', None) is not None else None,
+        'ocr_router': ocr.router_stats() if ocr is not None and hasattr(ocr, 'router_stats') else None,
+        'ocr_local_pool': tesseract_pool_stats(),
+        'field_reocr': field_reocr.stats() if field_reocr is not None else None,
+        'item_catalog': item_catalog.stats() if item_catalog is not None else None,
+        'label_templates': label_templates.stats() if label_templates is not None else None,
+        'ocr_quota': ocr_quota.stats() if ocr_quota is not None else None,
+        'sscc_index': sscc_index.stats() if sscc_index is not None else None,
+        'jobs': jobs.stats() if jobs else None,
+        'outbox': outbox_dispatcher.stats() if outbox_dispatcher else None,
+        'sheets_mirror': sheets_mirror.stats() if sheets_mirror is not None else None,
+        'drive': drive_client.stats() if drive_client is not None else None,
     })
 
 
+def _run_reparse(restart):
+    try:
+        result = reparser.run(resume=not restart)
+        _log(f"[Reparse] {result['scanned']} records in {result['elapsed_s']}s ({result['records_per_sec']}/s), "
+             f"{result['changed']} changed {result['by_field']}")
+        if sscc_index is not None:
+            for sscc in store.all_ssccs():
+                sscc_index.add(sscc)  # Reparsed SSCCs count for duplicate checks
+    except Exception as e:
+        _log(f"[Reparse] ERROR {e}")
+        reparser.progress.update(running=False, error=str(e))
+
+
+@app.route('/api/reparse', methods=['GET', 'POST'])
+def reparse_records():
+    """
+    POST: re-derive parsed fields of all local records from raw_ocr_text in the background
+    (JSON: restart - ignore the checkpoint, dry_run, workers). GET: progress of the last run.
+    """
+    global reparser
+    if request.method == 'GET':
+        return jsonify(reparser.stats() if reparser is not None else {'running': False})
+    if store is None:
+        return jsonify({'success': False, 'error': 'Record store not initialized'}), 503
+    if reparser is not None and reparser.stats().get('running'):
+        return jsonify({'success': False, 'error': 'Reparse already running', 'progress': reparser.stats()}), 409
+    data = request.get_json(silent=True) or {}
+    reparser = Reparser(store, workers=data.get('workers'), dry_run=bool(data.get('dry_run')),
+                        catalog_path=CONFIG['item_catalog'] if item_catalog is not None else None,
+                        templates_path=CONFIG['label_templates'] or None)
+    reparser.progress = {'running': True}
+    threading.Thread(target=_run_reparse, args=(bool(data.get('restart')),), daemon=True).start()
+    return jsonify({'success': True, 'checkpoint': reparser.checkpoint(), 'dry_run': reparser.dry_run}), 202
+
+
 @app.route('/api/storage-diagnostics')
 @app.route('/storage-diagnostics')
 def storage_diagnostics():
@@ -236,7 +580,7 @@ def storage_diagnostics():
             return False
 
     n_images = len(list(images_dir.glob('*.jpg')) + list(images_dir.glob('*.jpeg')) + list(images_dir.glob('*.png'))) if images_exists else 0
-    n_records = len(list(records_dir.glob('record_*.json'))) if records_exists else 0
+    n_records = store.count() if store else 0
 
     cwd = str(Path.cwd())
     return jsonify({
@@ -248,6 +592,7 @@ def storage_diagnostics():
         'records_dir_writable': _writable(records_dir) if records_exists else False,
         'images_count': n_images,
         'records_count': n_records,
+        'records_db': str(store.db_path) if store else None,
         'cwd': cwd,
         'using_persistent_disk': str(images_dir).startswith('/data') or str(records_dir).startswith('/data'),
     })
@@ -267,173 +612,116 @@ def index():
     return _render_page('capture.html', CAPTURE_HTML if _HAS_EMBEDDED else None)
 
 def check_duplicate_sscc(sscc):
-    """Check if SSCC exists in Sheets or local records"""
+    """Check if SSCC exists in Sheets or local records (in-memory index once built)"""
     if not sscc or not str(sscc).strip():
         return False
     sscc_clean = str(sscc).strip()
+    if sscc_index is not None and sscc_index.ready:
+        return sscc_clean in sscc_index
     if sheets:
         if sheets.sscc_exists(sscc_clean):
             return True
-    records_dir = Path(CONFIG['local_records_dir'])
-    if records_dir.exists():
-        for json_file in records_dir.glob('record_*.json'):
-            try:
-                with open(json_file, 'r') as f:
-                    record = json.load(f)
-                    if str(record.get('sscc', '')).strip() == sscc_clean:
-                        return True
-            except Exception:
-                pass
-    return False
+    return bool(store and store.sscc_exists(sscc_clean))
+
+
+def _flag(value):
+    return str(value).lower() in ('1', 'true', 'yes', 'on')
+
+
+def _read_submit_image():
+    """
+    Image source and options for /api/submit. Accepts:
+      - multipart/form-data with an 'image' file part (+ test_mode / async form fields)
+      - a raw image/* body (options as ?test_mode=1&async=1)
+      - JSON {"image": "<data URL or base64>", "test_mode": bool, "async": bool} (original format)
+    Returns (image source - file object or bytes - or None, test_mode, run_async).
+    """
+    content_type = (request.mimetype or '').lower()
+    if content_type == 'multipart/form-data':
+        upload = request.files.get('image')
+        image = upload.stream if upload and upload.filename is not None else None
+        test_mode = _flag(request.form.get('test_mode', request.args.get('test_mode', '')))
+        run_async = _flag(request.form.get('async', request.args.get('async', '')))
+        return image, test_mode, run_async
+    if content_type.startswith('image/'):
+        # Non-seekable WSGI stream - one read into bytes, then straight to the decoder
+        image = request.get_data(cache=False) or None
+        return image, _flag(request.args.get('test_mode', '')), _flag(request.args.get('async', ''))
+    data = request.get_json(silent=True) or {}
+    image_data = data.get('image')
+    test_mode = data.get('test_mode', False)
+    run_async = bool(data.get('async')) or _flag(request.args.get('async', ''))
+    if not image_data:
+        return None, test_mode, run_async
+    # Decode base64 image
+    if ',' in image_data:
+        image_data = image_data.split(',')[1]
+    return base64.b64decode(image_data), test_mode, run_async
 
 
 @app.route('/api/submit', methods=['POST'])
 def submit_ticket():
-    """Submit captured ticket"""
+    """
+    Submit captured ticket (multipart, raw image/jpeg or base64 JSON - see _read_submit_image).
+    With async (form field, JSON "async": true or ?async=1) OCR runs in the background and a job id is returned.
+    """
     try:
         _log("[Submit] Request received")
-        data = request.json
-        image_data = data.get('image')
-        test_mode = data.get('test_mode', False)
+        image_source, test_mode, run_async = _read_submit_image()
         
-        if not image_data:
+        if not image_source:
             _log("[Submit] ERROR: No image data")
             return jsonify({'success': False, 'error': 'No image data'}), 400
         
-        # Decode base64 image
-        if ',' in image_data:
-            image_data = image_data.split(',')[1]
-        
-        image_bytes = base64.b64decode(image_data)
         try:
-            img = Image.open(io.BytesIO(image_bytes)).convert('RGB')
+            # Scale-on-decode: a 12 MP photo is decoded near OCR size, not into a ~36 MB buffer
+            # (twice that with label crop, so the cropped label still fills the OCR size)
+            img, decode_info = decode_reduced(image_source, target_dim=OCR_MAX_DIM * (2 if CONFIG['label_crop'] else 1))
         except Exception as e:
             _log(f"[Submit] ERROR: Invalid image: {e}")
             return jsonify({'success': False, 'error': f'Invalid image: {e}'}), 400
         
-        timestamp = datetime.now(NZ_TZ)  # Capture time in NZ Wellington
-        images_dir = Path(CONFIG['images_folder'])
-        records_dir = Path(CONFIG['local_records_dir'])
-        images_dir.mkdir(parents=True, exist_ok=True)
-        records_dir.mkdir(parents=True, exist_ok=True)
-        
-        filename = f"pallet_{timestamp.strftime('%Y%m%d_%H%M%S')}.jpg"
-        image_path = images_dir / filename
-        jpeg_bytes = resize_for_ocr(img, max_size_kb=900)
-        with open(image_path, 'wb') as f:
-            f.write(jpeg_bytes)
-        
-        _log(f"[Submit] Image saved: {filename} -> {image_path}")
-        
-        # Run OCR
         if not ocr:
             _log("[Submit] ERROR: OCR not initialized")
             return jsonify({'success': False, 'error': 'OCR not initialized'}), 500
-        
-        _log("[Submit] Running OCR...")
-        ocr_text = ocr.process_image(str(image_path))
-        _log(f"[Submit] OCR completed: {len(ocr_text)} characters")
-        
-        # Parse data
         if not parser:
             _log("[Submit] ERROR: Parser not initialized")
             return jsonify({'success': False, 'error': 'Parser not initialized'}), 500
-        parsed_data = parser.parse(ocr_text)
-        _log(f"[Submit] Parsed {len(parsed_data['parsed'])} fields")
         
-        # Upload to Google Drive (date folder YYYY-MM-DD, 7am-7am blocks)
-        image_drive_url = None
-        drive_error_msg = None
-        creds_available = (
-            (CONFIG.get('credentials_json') and CONFIG['credentials_json'].strip()) or
-            (CONFIG.get('credentials_file') and os.path.exists(CONFIG.get('credentials_file', '')))
-        )
-        if creds_available:
-            try:
-                drive_url, drive_err = upload_to_drive(
-                    str(image_path),
-                    filename,
-                    root_folder_id=CONFIG.get('drive_root_folder_id'),
-                    credentials_file=CONFIG.get('credentials_file'),
-                    credentials_json=CONFIG.get('credentials_json')
-                )
-                if drive_url:
-                    image_drive_url = drive_url
-                    _log(f"[Submit] Uploaded to Drive folder {get_date_folder_name()}")
-                elif drive_err:
-                    drive_error_msg = str(drive_err)
-                    _log(f"[Submit] WARN Drive upload skipped: {drive_err}")
-            except Exception as e:
-                drive_error_msg = str(e)
-                _log(f"[Submit] WARN Drive upload error: {e}")
-
-        # Create record - use Drive URL for display when available
-        display_url = image_drive_url or f'/captured_images/{filename}'
-        record = {
-            'timestamp': timestamp.isoformat(),
-            'status': 'CAPTURED',
-            'operator': 'Web-User',
-            'image_path': display_url,
-            'image_drive_url': image_drive_url or '',
-            'raw_ocr_text': ocr_text,
-            'test_mode': test_mode,  # Mark so list/report can show TEST badge
-            **parsed_data['parsed']
+        timestamp = datetime.now(NZ_TZ)  # Capture time in NZ Wellington
+        timings = {
+            'decode_ms': decode_info['decode_ms'],
+            'decode_mb': decode_info['decode_mb'],
+            'source_px': decode_info['source'],
+            'decoded_px': decode_info['decoded'],
         }
+        barcode = _read_barcode(img, timings)
+        img = _crop_label(img, timings)
+        filename, image_path, jpeg_bytes, saved = _save_capture_image(img, timestamp, timings)
+        # Kept only for the field re-OCR pass (crops value regions at this resolution); else released before OCR
+        hires = img if field_reocr is not None and barcode is None else None
+        del img
         
-        # Add confidence notes
-        confidence_notes = []
-        for field, level in parsed_data['confidence'].items():
-            if level != 'high':
-                confidence_notes.append(f"{field}:{level}")
-        
-        if confidence_notes:
-            record['notes'] = ' | Confidence: ' + ', '.join(confidence_notes)
-        if test_mode:
-            record['notes'] = (record.get('notes') or '') + ' | TEST MODE'
-        
-        # Duplication check (skip if test_mode)
-        sscc_val = record.get('sscc', '')
-        if not test_mode and sscc_val and check_duplicate_sscc(sscc_val):
-            return jsonify({
-                'success': False,
-                'duplicate': True,
-                'error': f'Duplicate label - SSCC {sscc_val} already captured',
-                'record': record
-            }), 200
-        
-        # Submit to Google Sheets (directly to APPROVED_RECORDS as CAPTURED - no review)
-        result = {'success': False}
-        if sheets:
+        if run_async and jobs:
+            if hires is not None:
+                hires = _encode_hires(hires)  # Queued jobs hold compressed bytes, not decoded pixels
             try:
-                result = sheets.add_captured_record(record)
-                if result.get('success'):
-                    _log(f"[Submit] Submitted to Google Sheets (Row {result.get('row_num')})")
-            except Exception as e:
-                _log(f"[Submit] ERROR Sheets: {e}")
-                result = {'success': False, 'error': str(e)}
-        
-        # Always save locally
-        record_file = records_dir / f"record_{timestamp.strftime('%Y%m%d_%H%M%S')}.json"
-        with open(record_file, 'w') as f:
-            json.dump(record, f, indent=2)
-        _log(f"[Submit] Saved locally: {record_file.name} -> {record_file}")
+                job_id = jobs.submit(_process_capture, image_path, filename, timestamp, test_mode, timings,
+                                     image_bytes=jpeg_bytes, saved=saved, barcode=barcode, hires=hires, kind='submit')
+            except QueueFullError as e:
+                _log(f"[Submit] Job queue full: {e}")
+                return jsonify({'success': False, 'error': 'Too many labels processing - try again shortly'}), 503
+            _log(f"[Submit] Queued OCR job {job_id} for {filename}")
+            return jsonify({
+                'success': True,
+                'queued': True,
+                'job_id': job_id,
+                'status_url': f'/api/jobs/{job_id}',
+                'message': 'Queued for OCR',
+            }), 202
         
-        # Build response with diagnostics so user can see what worked/failed
-        resp = {
-            'success': True,
-            'row_num': result.get('row_num'),
-            'record': record,
-            'drive_uploaded': bool(image_drive_url),
-            'sheets_submitted': result.get('success', False),
-        }
-        if result.get('success'):
-            resp['message'] = 'Submitted to Google Sheets successfully'
-            if image_drive_url:
-                resp['message'] += '; image uploaded to Drive.'
-        else:
-            resp['message'] = 'Saved locally.'
-            resp['sheets_error'] = result.get('error', 'Sheets not connected')
-        # Do not expose Drive errors to user (e.g. service account quota - requires Shared Drive)
+        resp = _process_capture(image_path, filename, timestamp, test_mode, timings,
+                                image_bytes=jpeg_bytes, saved=saved, barcode=barcode, hires=hires)
         return jsonify(resp)
             
     except Exception as e:
@@ -447,6 +735,357 @@ def submit_ticket():
             pass
         return jsonify({'success': False, 'error': str(e)}), 500
 
+
+def _save_capture_image(img, timestamp, timings=None):
+    """
+    Compress for OCR and start persisting the capture on the image writer pool, so the disk write
+    overlaps OCR. Returns (filename, image_path, jpeg_bytes, saved) - saved is a Future for the write.
+    Adds encode stats to timings.
+    """
+    images_dir = Path(CONFIG['images_folder'])
+    images_dir.mkdir(parents=True, exist_ok=True)
+    
+    filename = f"pallet_{timestamp.strftime('%Y%m%d_%H%M%S')}.jpg"
+    image_path = images_dir / filename
+    started = time.perf_counter()
+    jpeg_bytes, encode_info = _encode_for_ocr(img, max_size_kb=900)
+    if timings is not None:
+        timings['encode_ms'] = _ms_since(started)
+        timings['encode_attempts'] = encode_info['attempts']
+    saved = _image_writer.submit(_write_image, image_path, jpeg_bytes)
+    return filename, image_path, jpeg_bytes, saved
+
+
+def _encode_hires(img):
+    """JPEG bytes of the pre-encode image for a queued job (decoded again only if field re-OCR runs)."""
+    buf = io.BytesIO()
+    img.save(buf, 'JPEG', quality=92)
+    return buf.getvalue()
+
+
+def _write_image(image_path, jpeg_bytes):
+    started = time.perf_counter()
+    with open(image_path, 'wb') as f:
+        f.write(jpeg_bytes)
+    _log(f"[Submit] Image saved: {image_path.name} -> {image_path}")
+    return _ms_since(started)
+
+
+def _ms_since(started):
+    return round((time.perf_counter() - started) * 1000, 1)
+
+
+def _peak_rss_mb():
+    """Process peak resident memory (None where the resource module is unavailable, e.g. Windows)."""
+    try:
+        import resource
+        import sys
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+    except Exception:
+        return None
+
+
+def _read_barcode(img, timings):
+    """GS1 barcode fields of the label (valid SSCC required), or None. Adds barcode timings."""
+    if not CONFIG['barcode_fast_path']:
+        return None
+    fields, info = barcode_reader.read_label(img)
+    if info['barcodes']:
+        timings['barcode_ms'] = info['decode_ms']
+        _log(f"[Submit] Barcode: {info['barcodes']} decoded, AIs {sorted(info['elements'])}"
+             f"{'' if fields else ' - no valid SSCC, using OCR'}")
+    return fields
+
+
+def _crop_label(img, timings):
+    """The label cropped and straightened when one is found, else img unchanged. Adds crop timings."""
+    if not CONFIG['label_crop']:
+        return img
+    try:
+        cropped, info = crop_label(img)
+    except Exception as e:
+        _log(f"[Submit] WARN Label crop failed (using full image): {e}")
+        return img
+    timings['crop_ms'] = info['crop_ms']
+    timings['label_area'] = info['label_area']
+    if cropped is None:
+        return img
+    timings['cropped_px'] = info['cropped_px']
+    _log(f"[Submit] Cropped to label {info['cropped_px']} ({int(info['label_area'] * 100)}% of frame)")
+    return cropped
+
+
+def _reocr_missing_fields(parsed_data, hires, image_bytes, image_path, timings):
+    """
+    Second pass: re-OCR only the value regions of fields the first pass missed (updates parsed_data).
+    Low-confidence values (e.g. an SSCC failing its check digit) are retried too.
+    """
+    missing = [f for f in field_reocr.fields
+               if not parsed_data['parsed'].get(f) or parsed_data['confidence'].get(f) == 'low']
+    words = ocr.last_words() if hasattr(ocr, 'last_words') else None
+    if not missing or not words:
+        return
+    try:
+        with Image.open(io.BytesIO(image_bytes) if image_bytes is not None else str(image_path)) as sent:
+            ocr_size = sent.size  # Word boxes are in the uploaded image's pixels
+        if isinstance(hires, (bytes, bytearray)):
+            hires = Image.open(io.BytesIO(hires))  # Async job - see _encode_hires
+            hires.load()
+        found, info = field_reocr.recover(hires, ocr_size, words, missing, template=parsed_data.get('template'))
+    except Exception as e:
+        _log(f"[Submit] WARN Field re-OCR failed: {e}")
+        return
+    timings['reocr_ms'] = info['reocr_ms']
+    timings['reocr_calls'] = info['calls']
+    if found:
+        parsed_data['parsed'].update(found)
+        parsed_data['confidence'].update({field: 'medium' for field in found})
+        parsed_data['warnings'] = [w for w in parsed_data['warnings'] if not any(f"'{f}'" in w for f in found)]
+        timings['reocr_fields'] = sorted(found)
+    _log(f"[Submit] Field re-OCR: missing {missing}, recovered {sorted(found)} in {info['calls']} call(s)")
+
+
+def _process_capture(image_path, filename, timestamp, test_mode, timings=None, image_bytes=None, saved=None,
+                     barcode=None, hires=None):
+    """
+    OCR + parse + duplicate check + Drive/Sheets + local save for a capture.
+    Runs inline for sync submits and on the job queue for async ones. Returns the response dict
+    with per-stage timings (ms) and peak memory.
+    image_bytes: OCR straight from memory instead of reading image_path back.
+    saved: Future of the image write - awaited after OCR, before anything references the file.
+    barcode: GS1 barcode fields - with write-behind on, OCR is deferred to the outbox (ocr_fill).
+    hires: Pre-encode image (or its _encode_hires bytes) - missing fields are re-read from crops of it
+        (field re-OCR).
+    """
+    timings = dict(timings or {})
+    started = time.perf_counter()
+    resp = _run_capture(image_path, filename, timestamp, test_mode, timings, image_bytes, saved, barcode, hires)
+    timings['process_ms'] = _ms_since(started)
+    timings['peak_rss_mb'] = _peak_rss_mb()
+    resp['timings'] = timings
+    return resp
+
+
+def _run_capture(image_path, filename, timestamp, test_mode, timings, image_bytes=None, saved=None, barcode=None,
+                 hires=None):
+    # Barcode fast path: SSCC etc. from the GS1 barcode, OCR for the remaining fields runs in the outbox
+    defer_ocr = barcode is not None and outbox is not None
+    if defer_ocr:
+        ocr_text = ''
+        parsed_data = {
+            'parsed': {field: '' for field in parser.field_configs},
+            'confidence': {},  # Fields not on the barcode are filled by OCR - no confidence notes yet
+        }
+        timings['ocr_deferred'] = True
+        _log(f"[Submit] Barcode fast path: {sorted(barcode)} - OCR deferred")
+    else:
+        _log("[Submit] Running OCR...")
+        started = time.perf_counter()
+        ocr_text = ocr.process_image(image_bytes if image_bytes is not None else str(image_path))
+        timings['ocr_ms'] = _ms_since(started)
+        if hasattr(ocr, 'last_timings') and ocr.last_timings():
+            timings['ocr_http'] = ocr.last_timings()  # connect vs server time on the pooled session
+        if hasattr(ocr, 'last_cache_hit') and ocr.last_cache_hit():
+            timings['ocr_cache'] = ocr.last_cache_hit()
+        _log(f"[Submit] OCR completed: {len(ocr_text)} characters")
+        
+        # Parse data
+        started = time.perf_counter()
+        parsed_data = parser.parse(ocr_text)
+        timings['parse_ms'] = _ms_since(started)
+        timings['label_template'] = parsed_data['template']
+        _log(f"[Submit] Parsed {len(parsed_data['parsed'])} fields")
+        if hires is not None:
+            _reocr_missing_fields(parsed_data, hires, image_bytes, image_path, timings)
+    if barcode:
+        # Barcode values are check-digit verified - they win over OCR
+        parsed_data['parsed'].update(barcode)
+        parsed_data['confidence'].update({field: 'high' for field in barcode})
+    
+    if saved is not None:
+        timings['write_ms'] = saved.result()  # Raises if the image could not be written
+    
+    # Upload to Google Drive (date folder YYYY-MM-DD, 7am-7am blocks) - queued instead when write-behind is on
+    image_drive_url = None
+    drive_error_msg = None
+    if outbox is None and _drive_creds_available():
+        try:
+            drive_url, drive_err = upload_to_drive(
+                str(image_path),
+                filename,
+                root_folder_id=CONFIG.get('drive_root_folder_id'),
+                credentials_file=CONFIG.get('credentials_file'),
+                credentials_json=CONFIG.get('credentials_json'),
+                cache_dir=CONFIG['local_records_dir']
+            )
+            if drive_url:
+                image_drive_url = drive_url
+                _log(f"[Submit] Uploaded to Drive folder {get_date_folder_name()}")
+            elif drive_err:
+                drive_error_msg = str(drive_err)
+                _log(f"[Submit] WARN Drive upload skipped: {drive_err}")
+        except Exception as e:
+            drive_error_msg = str(e)
+            _log(f"[Submit] WARN Drive upload error: {e}")
+
+    # Create record - use Drive URL for display when available
+    display_url = image_drive_url or f'/captured_images/{filename}'
+    record = {
+        'timestamp': timestamp.isoformat(),
+        'status': 'CAPTURED',
+        'operator': 'Web-User',
+        'image_path': display_url,
+        'image_drive_url': image_drive_url or '',
+        'raw_ocr_text': ocr_text,
+        'test_mode': test_mode,  # Mark so list/report can show TEST badge
+        **parsed_data['parsed']
+    }
+    
+    # Add confidence notes
+    confidence_notes = []
+    for field, level in parsed_data['confidence'].items():
+        if level != 'high':
+            confidence_notes.append(f"{field}:{level}")
+    
+    if confidence_notes:
+        record['notes'] = ' | Confidence: ' + ', '.join(confidence_notes)
+    if barcode:
+        record['notes'] = (record.get('notes') or '') + ' | GS1 barcode' + (' (OCR pending)' if defer_ocr else '')
+    if test_mode:
+        record['notes'] = (record.get('notes') or '') + ' | TEST MODE'
+    
+    # Duplication check (skip if test_mode)
+    sscc_val = record.get('sscc', '')
+    if not test_mode and sscc_val and check_duplicate_sscc(sscc_val):
+        return {
+            'success': False,
+            'duplicate': True,
+            'error': f'Duplicate label - SSCC {sscc_val} already captured',
+            'record': record
+        }
+    
+    if outbox is not None:
+        return _save_and_enqueue(record, timestamp, image_path, filename, ocr_fill=defer_ocr)
+    
+    # Submit to Google Sheets (directly to APPROVED_RECORDS as CAPTURED - no review)
+    result = {'success': False}
+    if sheets:
+        try:
+            result = sheets_writer.add_captured_record(record)
+            if result.get('success'):
+                _log(f"[Submit] Submitted to Google Sheets (Row {result.get('row_num')})")
+        except Exception as e:
+            _log(f"[Submit] ERROR Sheets: {e}")
+            result = {'success': False, 'error': str(e)}
+    
+    # Always save locally
+    record_key = store.save(record, key=record_key_for(timestamp))
+    if sscc_index is not None:
+        sscc_index.add(record.get('sscc'))
+    _log(f"[Submit] Saved locally: {record_key} -> {store.db_path}")
+    
+    # Build response with diagnostics so user can see what worked/failed
+    resp = {
+        'success': True,
+        'row_num': result.get('row_num'),
+        'record': record,
+        'drive_uploaded': bool(image_drive_url),
+        'sheets_submitted': result.get('success', False),
+    }
+    if result.get('success'):
+        resp['message'] = 'Submitted to Google Sheets successfully'
+        if image_drive_url:
+            resp['message'] += '; image uploaded to Drive.'
+    else:
+        resp['message'] = 'Saved locally.'
+        resp['sheets_error'] = result.get('error', 'Sheets not connected')
+    # Do not expose Drive errors to user (e.g. service account quota - requires Shared Drive)
+    return resp
+
+
+def _save_and_enqueue(record, timestamp, image_path, filename, ocr_fill=False):
+    """
+    Write-behind path: save locally and queue the Drive upload + Sheets append for the dispatcher.
+    ocr_fill: barcode fast path - queue OCR of the remaining fields first (chained ahead of both).
+    """
+    record_key = store.save(record, key=record_key_for(timestamp))
+    if sscc_index is not None:
+        sscc_index.add(record.get('sscc'))
+    _log(f"[Submit] Saved locally: {record_key} -> {store.db_path}")
+    
+    last_task = None
+    if ocr_fill:
+        last_task = outbox.enqueue('ocr_fill', record_key, {'image_path': str(image_path)})
+    if _drive_creds_available():
+        last_task = outbox.enqueue('drive_upload', record_key, {
+            'image_path': str(image_path),
+            'filename': filename,
+            'folder': get_date_folder_name(timestamp),  # Folder of the capture's day block, even if retried later
+        }, depends_on=last_task)
+    if sheets:
+        # Appended after the upload (and OCR fill) so the row carries the Drive URL and OCR fields
+        outbox.enqueue('sheets_append', record_key, depends_on=last_task)
+    outbox_dispatcher.wake()
+    
+    queued = bool(last_task or sheets)
+    resp = {
+        'success': True,
+        'row_num': None,
+        'record': record,
+        'drive_uploaded': False,
+        'sheets_submitted': False,
+        'sync_queued': queued,
+        'message': 'Saved locally; Sheets/Drive sync queued.' if queued else 'Saved locally.',
+    }
+    if not sheets:
+        resp['sheets_error'] = 'Sheets not connected'
+    return resp
+
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Status of an async submit job; result holds the same body a sync /api/submit returns."""
+    job = jobs.get(job_id) if jobs else None
+    if not job:
+        return jsonify({'error': 'Not found', 'message': f'Unknown or expired job {job_id}'}), 404
+    return jsonify(job)
+
+
+@app.route('/api/jobs/stream')
+def stream_jobs():
+    """
+    Server-Sent Events: one 'job' event per state change of the jobs in ?ids=a,b (required - job
+    results carry the parsed record and raw OCR text, so a client only gets the jobs it submitted).
+    """
+    if not jobs:
+        return jsonify({'error': 'Job queue not available'}), 503
+    job_ids = set(i for i in request.args.get('ids', '').strip().split(',') if i)
+    if not job_ids:
+        return jsonify({'error': 'Missing ids', 'message': 'Pass the job ids to follow: ?ids=<job_id>,...'}), 400
+    max_seconds = CONFIG['sse_max_seconds']
+
+    def _event(job):
+        return f"event: job\nid: {job['version']}\ndata: {json.dumps(job)}\n\n"
+
+    def generate():
+        started = time.monotonic()
+        version, recent = jobs.recent()
+        for job in recent:
+            if job['id'] in job_ids:
+                yield _event(job)
+        while time.monotonic() - started < max_seconds:
+            new_version, changed = jobs.wait_for_changes(version, timeout=15, job_ids=job_ids)
+            if new_version == version:
+                yield ": keep-alive\n\n"
+                continue
+            version = new_version
+            for job in changed:
+                yield _event(job)
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 def _is_full_label(r):
     """True if record has SSCC - incomplete/bad captures lack this key field."""
     return bool(str(r.get('sscc') or '').strip())
@@ -515,25 +1154,18 @@ def get_pending():
         records = []
         
         # Load local records first (newest captures may be local-only before Sheets sync)
-        records_dir = Path(CONFIG['local_records_dir'])
-        if records_dir.exists():
-            for json_file in sorted(records_dir.glob('record_*.json')):
-                try:
-                    with open(json_file, 'r') as f:
-                        record = json.load(f)
-                        st = record.get('status', '')
-                        if st in ('CAPTURED', 'PENDING') and _is_full_label(record) and _in_last_24h(record):
-                            k = _record_key(record)
-                            if k not in seen:
-                                seen[k] = len(records)
-                                records.append(record)
-                except Exception:
-                    pass
+        if store:
+            since = datetime.now(NZ_TZ).replace(tzinfo=None) - timedelta(hours=24)
+            for record in store.get_pending(since, statuses=('CAPTURED', 'PENDING')):
+                k = _record_key(record)
+                if k not in seen:
+                    seen[k] = len(records)
+                    records.append(record)
         
         # Add Sheets records not already present
         if sheets:
             try:
-                for record in sheets.get_pending_records():
+                for record in _sheets_pending_records():
                     if not _is_full_label(record) or not _in_last_24h(record):
                         continue
                     k = _record_key(record)
@@ -570,6 +1202,8 @@ def approve_record():
             return jsonify({'success': False, 'error': 'Google Sheets not configured'}), 400
         
         result = sheets.approve_record(row_number)
+        if sheets_mirror is not None and result.get('success'):
+            sheets_mirror.reconcile_async()
         return jsonify(result)
     except Exception as e:
         print(f"[ERROR] Approve error: {e}")
@@ -587,6 +1221,8 @@ def reject_record():
             return jsonify({'success': False, 'error': 'Google Sheets not configured'}), 400
         
         result = sheets.reject_record(row_number, reason)
+        if sheets_mirror is not None and result.get('success'):
+            sheets_mirror.reconcile_async(['PENDING_REVIEW'])
         return jsonify(result)
     except Exception as e:
         print(f"[ERROR] Reject error: {e}")
@@ -673,7 +1309,7 @@ def generate_report():
         # Fallback: if local returns nothing and Sheets has data, use Sheets for last 24h
         if len(items) == 0 and sheets:
             try:
-                for rec in sheets.get_pending_records():
+                for rec in _sheets_pending_records():
                     if not _is_full_label(rec) or not _in_last_24h(rec):
                         continue
                     img_path = _resolve_report_image(rec, str(images_dir))
@@ -685,8 +1321,8 @@ def generate_report():
                 _log(f"[Report] Sheets fallback error: {e}")
 
         # Diagnostics (visible in server logs)
-        n_files = len(list(records_dir.glob('record_*.json'))) if records_dir.exists() else 0
-        print(f"[Report] records_dir={records_dir} exists={records_dir.exists()}, json_files={n_files}, "
+        n_files = store.count() if store else 0
+        print(f"[Report] records_dir={records_dir} exists={records_dir.exists()}, records={n_files}, "
               f"images_dir={images_dir} exists={images_dir.exists()}, items={len(items)}, filter_by={filter_by}")
 
         buf = io.BytesIO()